@@ -0,0 +1,13 @@
+"""Reproducible benchmarks for the OCR and document parsing pipeline.
+
+Synthetic contract pages are generated locally (see :mod:`.synthetic`) and
+every stage is timed in isolation, so runs are comparable across machines and
+commits without network access::
+
+    python -m benchmarks --pages 8 --out bench.json
+    python -m benchmarks --pages 8 --baseline bench.json
+
+Results are written as JSON: per-stage wall time, items/sec and peak RSS.
+``python -m benchmarks --imports`` instead reports the cold import time of
+each entry point (see :mod:`.imports`).
+"""
@@ -0,0 +1,87 @@
+"""Command line interface for :mod:`benchmarks`."""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def main() -> None:
+    try:  # pragma: no cover - import shim for direct execution
+        from .imports import ENTRY_POINTS, profile_imports
+        from .run import STAGES, compare, run_benchmarks
+    except ImportError:  # executed as a standalone script
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+        from benchmarks.imports import ENTRY_POINTS, profile_imports  # type: ignore
+        from benchmarks.run import STAGES, compare, run_benchmarks  # type: ignore
+
+    parser = argparse.ArgumentParser(description="Benchmark the OCR and parsing pipeline")
+    parser.add_argument("--pages", type=int, default=4, help="Pages in the synthetic contract")
+    parser.add_argument("--dpi", type=int, default=150, help="Scan and rasterization DPI")
+    parser.add_argument("--batch-size", type=int, default=4, help="Batch size for process_images")
+    parser.add_argument("--workers", type=int, default=1, help="OCR worker processes in pipeline stages")
+    parser.add_argument("--languages", default="ru,en", help="Comma-separated EasyOCR language codes")
+    parser.add_argument("--gpu", action="store_true", help="Run EasyOCR on GPU")
+    parser.add_argument(
+        "--llm-url",
+        default=None,
+        help="OpenAI-compatible base URL for extraction (default: built-in mock server)",
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Mock server delay per request, seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic document")
+    parser.add_argument("--workdir", default=None, help="Keep generated PDFs in this directory")
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help="Comma-separated stages to run",
+    )
+    parser.add_argument(
+        "--imports",
+        nargs="?",
+        const=",".join(ENTRY_POINTS),
+        default=None,
+        help="Only profile import time (python -X importtime) of these comma-separated modules",
+    )
+    parser.add_argument("--out", default=None, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    if args.imports:
+        report = profile_imports(args.imports.split(","))
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(data)
+        else:
+            print(data)
+        return
+
+    report = run_benchmarks(
+        pages=args.pages,
+        dpi=args.dpi,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        languages=args.languages.split(","),
+        gpu=args.gpu,
+        llm_url=args.llm_url,
+        llm_latency=args.llm_latency,
+        seed=args.seed,
+        workdir=args.workdir,
+        stages=args.stages.split(","),
+    )
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        print(data)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
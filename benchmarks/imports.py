@@ -0,0 +1,99 @@
+"""Import-time profile of the package entry points.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``
+and the stderr report is reduced to the total import time, the slowest
+top-level dependencies and which heavy libraries got loaded.  This keeps cold
+start regressions visible: ``import document_parser`` or an OCR-only
+``text_recognition`` run must not pull in PyMuPDF, EasyOCR or the LLM clients.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+import os
+import subprocess
+import sys
+
+ENTRY_POINTS = (
+    "tracing",
+    "llm.router",
+    "text_recognition",
+    "text_recognition.pipeline",
+    "document_parser",
+    "document_parser.pipeline",
+    "ocr_service",
+)
+
+# Libraries worth flagging when an entry point loads them eagerly
+HEAVY = ("fitz", "easyocr", "torch", "cv2", "numpy", "PIL", "openai", "httpx", "pandas", "streamlit")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(report: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` output into ``{module, depth, self_us, cumulative_us}`` rows."""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip(" ")
+        rows.append(
+            {
+                "module": stripped,
+                "depth": (len(name) - len(stripped) - 1) // 2,
+                "self_us": int(parts[0]),
+                "cumulative_us": int(parts[1]),
+            }
+        )
+    return rows
+
+
+def profile_import(module: str, python: Optional[str] = None, top: int = 10) -> Dict[str, Any]:
+    """Import ``module`` in a subprocess and summarize where the time went.
+
+    ``slowest`` lists the direct imports of ``module`` by cumulative time.
+    """
+    proc = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = parse_importtime(proc.stderr)
+    loaded = {row["module"] for row in rows}
+    # Nested imports are reported before the module importing them, one level deeper
+    end = next((i for i in range(len(rows) - 1, -1, -1) if rows[i]["module"] == module), None)
+    target = rows[end] if end is not None else None
+    children = []
+    if target is not None:
+        for row in reversed(rows[:end]):
+            if row["depth"] <= target["depth"]:
+                break
+            if row["depth"] == target["depth"] + 1:
+                children.append(row)
+    slowest = sorted(children, key=lambda row: -row["cumulative_us"])
+    result: Dict[str, Any] = {
+        "module": module,
+        "seconds": round(target["cumulative_us"] / 1e6, 4) if target else None,
+        "modules": len(rows),
+        "heavy": [name for name in HEAVY if name in loaded],
+        "slowest": [
+            {"module": row["module"], "seconds": round(row["cumulative_us"] / 1e6, 4)} for row in slowest[:top]
+        ],
+    }
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    return result
+
+
+def profile_imports(modules: Sequence[str] = ENTRY_POINTS, top: int = 10) -> Dict[str, Any]:
+    """:func:`profile_import` for each entry point, as a JSON-serializable report."""
+    return {
+        "python": sys.version.split()[0],
+        "imports": [profile_import(module, top=top) for module in modules],
+    }
+
+
+__all__ = ["ENTRY_POINTS", "HEAVY", "parse_importtime", "profile_import", "profile_imports"]
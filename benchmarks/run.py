@@ -0,0 +1,197 @@
+"""Stage-by-stage benchmark of the OCR and parsing pipeline.
+
+Each stage runs in isolation on the same synthetic document and records wall
+time, processed items, items/sec and the process' peak resident set size.
+LLM extraction goes through the ``local`` backend to :mod:`llm.mock_server`
+(or any OpenAI-compatible URL given as ``llm_url``), so no remote API is
+contacted.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+STAGES = (
+    "generate",
+    "reader_load",
+    "rasterize",
+    "encode",
+    "ocr_single",
+    "ocr_batched",
+    "layout",
+    "pipeline_text_layer",
+    "pipeline_scanned",
+    "extract",
+)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Recorder:
+    """Collects timings of named stages."""
+
+    def __init__(self, stages: Sequence[str] = STAGES) -> None:
+        self.enabled = set(stages)
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str, items: int = 1) -> Iterator[Dict[str, Any]]:
+        record: Dict[str, Any] = {"items": items}
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        yield record
+        seconds = time.perf_counter() - start
+        record.update(
+            seconds=round(seconds, 4),
+            items_per_sec=round(record["items"] / seconds, 3) if seconds else None,
+            peak_rss_mb=round(peak_rss_mb(), 1),
+            peak_rss_growth_mb=round(peak_rss_mb() - rss_before, 1),
+        )
+        self.stages[name] = record
+
+
+def run_benchmarks(
+    pages: int = 4,
+    dpi: int = 150,
+    batch_size: int = 4,
+    workers: int = 1,
+    languages: Optional[List[str]] = None,
+    gpu: bool = False,
+    llm_url: Optional[str] = None,
+    llm_latency: float = 0.0,
+    seed: int = 0,
+    workdir: Optional[str] = None,
+    stages: Sequence[str] = STAGES,
+) -> Dict[str, Any]:
+    """Run the enabled ``stages`` and return a JSON-serializable report."""
+    import fitz  # type: ignore
+    from PIL import Image
+
+    from document_parser import BASE_PROMPT, iter_pages
+    from document_parser.raster import render_page
+    from llm.chunking import prepare_image
+    from text_recognition import process_image, process_images, warm_up
+    from text_recognition.layout import layout_text, reconstruct_layout
+    from text_recognition.utils import pil_to_data_url
+
+    from .synthetic import make_scanned_pdf, make_text_pdf
+
+    rec = Recorder(stages)
+    workdir = workdir or tempfile.mkdtemp(prefix="ocr-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    text_pdf = os.path.join(workdir, "contract_text.pdf")
+    scanned_pdf = os.path.join(workdir, "contract_scanned.pdf")
+    ocr_options = {"languages": languages, "gpu": gpu, "render": "text"}
+
+    # Inputs are always generated; the stage is only recorded when enabled
+    with rec.stage("generate", pages) as r:
+        make_text_pdf(text_pdf, pages, seed)
+        make_scanned_pdf(text_pdf, scanned_pdf, dpi, seed)
+        r["bytes"] = os.path.getsize(text_pdf) + os.path.getsize(scanned_pdf)
+
+    if "reader_load" in rec.enabled:
+        with rec.stage("reader_load") as r:
+            r["load_seconds"] = warm_up(languages, gpu)
+
+    images = []
+    with rec.stage("rasterize", pages):
+        with fitz.open(scanned_pdf) as doc:
+            for page in doc:
+                pix, pixels, _ = render_page(page, dpi)
+                images.append(pixels.copy())
+
+    if "encode" in rec.enabled:
+        with rec.stage("encode", pages) as r:
+            urls = [pil_to_data_url(Image.fromarray(pixels)) for pixels in images]
+            jpegs = [prepare_image(url, "jpeg")[0] for url in urls]
+            r["png_bytes"] = sum(len(u) for u in urls)
+            r["jpeg_bytes"] = sum(len(u) for u in jpegs)
+
+    results: List[Dict[str, Any]] = []
+    if "ocr_single" in rec.enabled:
+        with rec.stage("ocr_single", pages) as r:
+            results = [process_image(pixels, **ocr_options) for pixels in images]
+            r["blocks"] = sum(len(res["blocks"]) for res in results)
+
+    if "ocr_batched" in rec.enabled:
+        with rec.stage("ocr_batched", pages) as r:
+            results = process_images(images, batch_size=batch_size, **ocr_options)
+            r["blocks"] = sum(len(res["blocks"]) for res in results)
+            r["batch_size"] = batch_size
+
+    if "layout" in rec.enabled and results:
+        with rec.stage("layout", sum(len(res["blocks"]) for res in results)) as r:
+            texts = [layout_text(reconstruct_layout(res["blocks"])) for res in results]
+            r["chars"] = sum(len(t) for t in texts)
+
+    page_options = {"workers": workers, "dpi": dpi, "batch_size": batch_size, **ocr_options}
+    llm_pages: List[Dict[str, Any]] = []
+    for name, pdf in (("pipeline_text_layer", text_pdf), ("pipeline_scanned", scanned_pdf)):
+        if name not in rec.enabled:
+            continue
+        with rec.stage(name, pages) as r:
+            out = list(iter_pages(pdf, **page_options))
+            r["paths"] = sorted({p["path"] for p in out})
+        llm_pages = [{"page": p["page"], "text": p["text"], "image_b64": p["image_b64"]} for p in out]
+
+    if "extract" in rec.enabled and llm_pages:
+        from llm.router import LLMRouter
+        from llm.mock_server import start_mock_server
+
+        server = None
+        if llm_url is None:
+            server, llm_url = start_mock_server(latency=llm_latency)
+        try:
+            llm = LLMRouter("local", base_url=llm_url)
+            with rec.stage("extract", len(llm_pages)) as r:
+                fields = llm.extract_fields(llm_pages, BASE_PROMPT, image_mode="jpeg")
+                r["fields"] = len(fields)
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "pages": pages,
+            "dpi": dpi,
+            "batch_size": batch_size,
+            "workers": workers,
+            "languages": languages,
+            "gpu": gpu,
+            "seed": seed,
+            "llm_url": llm_url,
+            "llm_latency": llm_latency,
+        },
+        "stages": {name: rec.stages[name] for name in STAGES if name in rec.stages and name in rec.enabled},
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Per-stage ``name: old -> new (ratio)`` lines for two reports."""
+    lines = []
+    for name, stage in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("seconds"):
+            lines.append(f"{name}: {stage['seconds']:.3f}s (no baseline)")
+            continue
+        ratio = stage["seconds"] / old["seconds"]
+        lines.append(f"{name}: {old['seconds']:.3f}s -> {stage['seconds']:.3f}s (x{ratio:.2f})")
+    return lines
+
+
+__all__ = ["STAGES", "Recorder", "run_benchmarks", "compare", "peak_rss_mb"]
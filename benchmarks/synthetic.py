@@ -0,0 +1,96 @@
+"""Synthetic Cyrillic/Latin contract documents for benchmarks.
+
+Two flavours of the same document are produced: a digital PDF with a text
+layer (written with PyMuPDF) and a "scanned" PDF whose pages are raster
+images, slightly rotated and speckled with PIL so that every page goes
+through EasyOCR.  Output is fully determined by ``seed``.
+"""
+
+from typing import List
+import io
+import random
+
+import fitz  # type: ignore
+from PIL import Image, ImageFilter
+
+_PARTIES = ["ООО «Альфа Трейд»", "АО «СеверСталь»", "Global Parts GmbH", "ИП Иванов И.И.", "Delta Logistics Ltd"]
+_COUNTRIES = ["Россия", "Германия", "Казахстан", "Китай", "Турция"]
+_CURRENCIES = ["RUB", "EUR", "USD", "CNY"]
+_SUBJECTS = [
+    "Поставщик обязуется поставить, а Покупатель принять и оплатить Товар",
+    "Исполнитель обязуется оказать услуги по перевозке грузов (freight forwarding services)",
+    "Стороны договорились о порядке приёмки продукции по количеству и качеству",
+    "Оплата производится банковским переводом на расчётный счёт (bank transfer, SWIFT)",
+    "Настоящий Договор вступает в силу с момента подписания обеими Сторонами",
+    "Все споры разрешаются в Арбитражном суде по месту нахождения ответчика",
+    "Товар поставляется на условиях Incoterms 2020 DAP, если иное не указано в Спецификации",
+]
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2019, 2026)}"
+
+
+def contract_paragraphs(rng: random.Random, page: int, clauses: int = 10) -> List[str]:
+    """Paragraphs of one contract page; the first page carries the header fields."""
+    out = []
+    if page == 1:
+        out += [
+            f"ДОГОВОР ПОСТАВКИ № {rng.randint(1, 999)}/{rng.randint(10, 99)}-К",
+            f"г. Москва                                                                 {_date(rng)}",
+            f"{rng.choice(_PARTIES)}, именуемое в дальнейшем «Поставщик», и {rng.choice(_PARTIES)}, "
+            f"страна регистрации {rng.choice(_COUNTRIES)}, именуемое в дальнейшем «Покупатель», "
+            "заключили настоящий Договор о нижеследующем:",
+        ]
+    for i in range(1, clauses + 1):
+        text = " ".join(rng.choice(_SUBJECTS) for _ in range(rng.randint(1, 3)))
+        out.append(f"{page}.{i}. {text}.")
+    if page == 1:
+        out.append(
+            f"Сумма договора составляет {rng.randint(10, 9999)} {rng.randint(100, 999)},00 "
+            f"({rng.choice(_CURRENCIES)}), валюта платежа {rng.choice(_CURRENCIES)}. "
+            f"Срок действия договора до {_date(rng)}."
+        )
+    return out
+
+
+def make_text_pdf(path: str, pages: int = 4, seed: int = 0) -> str:
+    """Write a digital contract PDF with a text layer to ``path``."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page(width=595, height=842)  # A4 in points
+        rect = fitz.Rect(56, 56, 539, 786)
+        page.insert_textbox(
+            rect,
+            "\n\n".join(contract_paragraphs(rng, number)),
+            fontname="helv",
+            fontsize=10,
+            encoding=fitz.TEXT_ENCODING_CYRILLIC,
+        )
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_scanned_pdf(source: str, path: str, dpi: int = 150, seed: int = 0) -> str:
+    """Rasterize ``source`` into an image-only PDF that imitates a scan."""
+    rng = random.Random(seed)
+    out = fitz.open()
+    with fitz.open(source) as doc:
+        for page in doc:
+            pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples).convert("L")
+            img = img.rotate(rng.uniform(-0.7, 0.7), resample=Image.BICUBIC, fillcolor=255)
+            noise = Image.effect_noise(img.size, 24).filter(ImageFilter.GaussianBlur(0.6))
+            img = Image.blend(img, noise, 0.08)
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", optimize=False)
+            target = out.new_page(width=page.rect.width, height=page.rect.height)
+            target.insert_image(target.rect, stream=buf.getvalue())
+    out.save(path)
+    out.close()
+    return path
+
+
+__all__ = ["contract_paragraphs", "make_text_pdf", "make_scanned_pdf"]
@@ -0,0 +1,136 @@
+"""Size-bounded on-disk LRU store shared by the OCR and LLM response caches.
+
+Entries are files named ``<key><SUFFIX>`` in one directory; reads bump the
+file's mtime and eviction removes the least recently used files.  The total
+size is scanned from disk once and then tracked in memory, so a ``put`` costs
+one ``stat`` instead of a directory listing.  The directory is rescanned every
+:attr:`DiskLRUCache.RESCAN_PUTS` writes (other processes may share it) and
+when the tracked size exceeds the bound; eviction then trims to
+:attr:`DiskLRUCache.LOW_WATER` of the bound so a full cache does not rescan on
+every write.
+"""
+
+from typing import IO, Any, Callable, Dict, Optional
+import os
+import tempfile
+import threading
+
+
+class DiskLRUCache:
+    """Base class: subclasses set :attr:`SUFFIX` and serialize values via :meth:`_write`."""
+
+    SUFFIX = ""
+    RESCAN_PUTS = 256
+    LOW_WATER = 0.9
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self._puts = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _touch(self, path: str) -> None:
+        """Bump recency of an entry that was just read."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _write(self, key: str, dump: Callable[[IO[Any]], None], binary: bool = False) -> None:
+        """Atomically write an entry with ``dump(file)`` and keep the size bound."""
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb" if binary else "w", **({} if binary else {"encoding": "utf-8"})) as f:
+            dump(f)
+        try:
+            old = os.stat(path).st_size
+        except OSError:
+            old = 0
+        size = os.stat(tmp).st_size
+        os.replace(tmp, path)
+        with self._lock:
+            self._puts += 1
+            rescan = self._size is None or self._puts % self.RESCAN_PUTS == 0
+            if not rescan:
+                self._size += size - old
+                rescan = self._size > self.max_bytes
+        if rescan:
+            self.evict()
+
+    def evict(self) -> int:
+        """Rescan the directory and remove least recently used entries over the bound."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * self.LOW_WATER
+            for _, size, name in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                os.remove(os.path.join(self.directory, name))
+        with self._lock:
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "directory": self.directory,
+        }
+
+
+__all__ = ["DiskLRUCache"]
@@ -24,19 +24,199 @@ def main() -> None:
         default="openrouter",
         help="LLM backend name",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of OCR worker processes (1 = sequential)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of the on-disk OCR result cache (disabled if omitted)",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=None,
+        help="Split field extraction into chunks of at most this many estimated tokens",
+    )
+    parser.add_argument(
+        "--image-mode",
+        choices=["png", "jpeg", "none"],
+        default="png",
+        help="How page images are sent to the LLM (none = text only)",
+    )
+    parser.add_argument(
+        "--image-max-side",
+        type=int,
+        default=None,
+        help="Downscale page images so the longer side is at most this many pixels",
+    )
+    parser.add_argument(
+        "--llm-cache-dir",
+        default=None,
+        help="Directory of the on-disk LLM response cache (disabled if omitted)",
+    )
+    parser.add_argument(
+        "--no-text-layer",
+        action="store_true",
+        help="OCR every page even if the PDF already contains extractable text",
+    )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        default=None,
+        help="Page rasterization DPI (default: document_parser.raster.DEFAULT_DPI)",
+    )
+    parser.add_argument(
+        "--refine-dpi",
+        type=int,
+        default=None,
+        help="Re-OCR low-confidence regions at this DPI (adaptive mode)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Number of pages recognised together in batched EasyOCR calls (default 1; whole page groups with --schedule)",
+    )
+    parser.add_argument(
+        "--no-layout",
+        action="store_true",
+        help="Send lines to the LLM in detection order instead of numbered paragraphs",
+    )
+    parser.add_argument(
+        "--schedule",
+        action="store_true",
+        help="Recognise pages in priority order and stop once all fields are found",
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=0.6,
+        help="Page confidence a field's source must reach to stop early (with --schedule)",
+    )
+    parser.add_argument(
+        "--version-dir",
+        default=None,
+        help=(
+            "Store of the previous version: reuse unchanged pages and fields, then save this version there "
+            "(with --batch, one subdirectory per document)"
+        ),
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Append per-stage span records to this JSON-lines file",
+    )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        help="Directory of PDFs or manifest file (JSON list / one path per line) for batch mode",
+    )
+    parser.add_argument(
+        "--out",
+        default="batch_results",
+        help="Output directory for batch results and checkpoint",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=2,
+        help="Number of documents processed concurrently in batch mode",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the batch checkpoint and reprocess every document",
+    )
     args = parser.parse_args()
+    if args.batch and args.workers > 1:
+        parser.error("--workers > 1 cannot be combined with --batch; use --jobs to process documents in parallel")
+    if args.schedule and args.workers > 1:
+        parser.error("--workers > 1 cannot be combined with --schedule")
 
     try:  # pragma: no cover - import shim for direct execution
         from . import parse_document
     except ImportError:  # executed as a standalone script
         sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
         from document_parser import parse_document  # type: ignore
+    import tracing
+    from llm.cache import ResponseCache
+    from text_recognition import OCRCache
+
+    if args.trace:
+        tracing.add_hook(tracing.JsonLinesExporter(args.trace))
 
-    result = parse_document(
-        pdf_path=args.pdf,
+    cache = OCRCache(args.cache_dir) if args.cache_dir else None
+    llm_cache = ResponseCache(args.llm_cache_dir) if args.llm_cache_dir else None
+
+    options = dict(
         llm_backend=args.backend,
+        workers=args.workers,
+        cache=cache,
+        llm_cache=llm_cache,
+        text_layer=not args.no_text_layer,
+        refine_dpi=args.refine_dpi,
+        layout=not args.no_layout,
+        render="text",
+        extract_options={
+            "chunk_tokens": args.chunk_tokens,
+            "image_mode": args.image_mode,
+            "image_max_side": args.image_max_side,
+        },
     )
+    if args.dpi is not None:
+        options.update(dpi=args.dpi)
+    if args.batch_size is not None:
+        options.update(batch_size=args.batch_size)
+    if args.schedule:
+        options.update(schedule=True, min_confidence=args.min_confidence)
+    if args.version_dir:
+        options.update(version_dir=args.version_dir)
+
+    if args.batch:
+        from document_parser.batch import discover_inputs, run_batch
+
+        summary = run_batch(
+            discover_inputs(args.batch),
+            args.out,
+            jobs=args.jobs,
+            resume=not args.no_resume,
+            progress=lambda msg: print(msg, file=sys.stderr),
+            **options,
+        )
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        print(
+            f"Документов: {summary['documents']} (ошибок {summary['failed']}), "
+            f"страниц: {summary['pages']}, {summary['seconds']:.1f} с — "
+            f"{summary['pages_per_sec']:.2f} стр/с, {summary['docs_per_sec']:.3f} док/с",
+            file=sys.stderr,
+        )
+        return
+
+    result = parse_document(pdf_path=args.pdf, **options)
     print(json.dumps(result["fields"], ensure_ascii=False, indent=2))
+    stats = result["stats"]
+    print(
+        f"Страниц из текстового слоя: {stats['text_layer_pages']}, через OCR: {stats['ocr_pages']}",
+        file=sys.stderr,
+    )
+    if "skipped_pages" in stats:
+        print(
+            f"Порядок страниц: {stats['order']}, пропущено: {stats['skipped_pages']}, "
+            f"запросов к LLM: {stats['extract_calls']}",
+            file=sys.stderr,
+        )
+    if "recomputed" in result:
+        recomputed = result["recomputed"]
+        print(
+            f"Пересчитаны страницы: {recomputed['pages'] or '-'}, поля: {', '.join(recomputed['fields']) or '-'}",
+            file=sys.stderr,
+        )
+    for name, stage in result["trace"].items():
+        print(f"⏱ {name}: {stage['count']}× {stage['seconds']:.2f} с", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+"""Batch processing of many PDFs with resumable checkpoints.
+
+Documents are parsed by a bounded pool of worker threads inside one process,
+so the EasyOCR readers, LLM transport and caches stay warm across documents.
+Each finished document is written to ``<output_dir>/<doc_id>.json`` and
+recorded in ``<output_dir>/checkpoint.json``; re-running the same batch skips
+documents that already completed successfully.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .files import write_json
+
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+def discover_inputs(source: str) -> List[str]:
+    """Resolve ``source`` to a list of PDF paths.
+
+    ``source`` is either a directory (searched recursively for ``*.pdf``) or a
+    manifest file: a JSON list of paths or a text file with one path per line.
+    Relative manifest entries are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        found = []
+        for root, _, files in os.walk(source):
+            found.extend(os.path.join(root, f) for f in files if f.lower().endswith(".pdf"))
+        return sorted(found)
+
+    with open(source, encoding="utf-8") as f:
+        raw = f.read()
+    if source.endswith(".json"):
+        entries = json.loads(raw)
+    else:
+        entries = [line.strip() for line in raw.splitlines()]
+    base = os.path.dirname(os.path.abspath(source))
+    return [
+        e if os.path.isabs(e) else os.path.join(base, e)
+        for e in entries
+        if e and not e.startswith("#")
+    ]
+
+
+def doc_id(path: str) -> str:
+    """Stable, collision-free output name for ``path``."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}-{digest}"
+
+
+class Checkpoint:
+    """Thread-safe record of finished documents, persisted after every update."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f).get("documents", {})
+
+    def is_done(self, key: str) -> bool:
+        return self.entries.get(key, {}).get("status") == "ok"
+
+    def record(self, key: str, entry: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[key] = entry
+            write_json(self.path, {"documents": self.entries})
+
+
+def run_batch(
+    inputs: List[str],
+    output_dir: str,
+    jobs: int = 2,
+    resume: bool = True,
+    progress: Optional[Callable[[str], None]] = None,
+    **parse_kwargs: Any,
+) -> Dict[str, Any]:
+    """Parse every PDF in ``inputs`` and write per-document JSON results.
+
+    ``jobs`` documents are processed concurrently by threads of this process,
+    which share its warm EasyOCR readers; ``parse_kwargs`` are passed to
+    :func:`document_parser.parse_document`.  ``workers > 1`` is rejected: it
+    would start a process pool, and reload the readers, for every document.
+    With ``version_dir`` each document keeps its versions in
+    ``<version_dir>/<doc_id>``.  Returns a summary with document/page counts,
+    failures and pages/sec and docs/sec throughput.
+    """
+    from . import parse_document
+
+    if parse_kwargs.get("workers", 1) > 1:
+        raise ValueError("workers > 1 is not supported in batch mode; use jobs to parallelise documents")
+    version_dir = parse_kwargs.pop("version_dir", None)
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, CHECKPOINT_NAME))
+    parse_kwargs.setdefault("render", "text")
+    say = progress or (lambda msg: None)
+
+    todo = [p for p in inputs if not (resume and checkpoint.is_done(doc_id(p)))]
+    skipped = len(inputs) - len(todo)
+    if skipped:
+        say(f"Пропущено по чекпоинту: {skipped}")
+
+    totals = {"docs": 0, "pages": 0, "failed": 0}
+    totals_lock = threading.Lock()
+
+    def process(path: str) -> None:
+        key = doc_id(path)
+        start = time.perf_counter()
+        try:
+            if version_dir is not None:
+                doc_kwargs = {**parse_kwargs, "version_dir": os.path.join(version_dir, key)}
+            else:
+                doc_kwargs = parse_kwargs
+            result = parse_document(
+                pdf_path=path,
+                log_path=os.path.join(output_dir, f"{key}.log"),
+                **doc_kwargs,
+            )
+        except Exception as e:  # one broken PDF must not stop the batch
+            checkpoint.record(key, {"path": path, "status": "error", "error": str(e)})
+            with totals_lock:
+                totals["failed"] += 1
+            say(f"❌ {path}: {e}")
+            return
+        seconds = time.perf_counter() - start
+        pages = len(result["pages"])
+        write_json(
+            os.path.join(output_dir, f"{key}.json"),
+            {
+                "path": path,
+                "fields": result["fields"],
+                "stats": result.get("stats", {}),
+                "trace": result.get("trace", {}),
+                "pages": [
+                    {"page": p["page"], "verified_lines": p["info"].get("verified_lines", [])}
+                    for p in result["pages"]
+                ],
+            },
+        )
+        checkpoint.record(
+            key, {"path": path, "status": "ok", "pages": pages, "seconds": round(seconds, 3)}
+        )
+        with totals_lock:
+            totals["docs"] += 1
+            totals["pages"] += pages
+            done = totals["docs"] + totals["failed"]
+        say(f"✅ [{done}/{len(todo)}] {path}: {pages} стр., {seconds:.1f} с")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        list(pool.map(process, todo))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "documents": totals["docs"],
+        "pages": totals["pages"],
+        "failed": totals["failed"],
+        "skipped": skipped,
+        "seconds": elapsed,
+        "pages_per_sec": totals["pages"] / elapsed if elapsed else 0.0,
+        "docs_per_sec": totals["docs"] / elapsed if elapsed else 0.0,
+    }
+
+
+__all__ = ["discover_inputs", "run_batch", "Checkpoint", "doc_id"]
@@ -0,0 +1,17 @@
+"""File helpers shared by the parser stages."""
+
+from typing import Any
+import json
+import os
+import tempfile
+
+
+def write_json(path: str, data: Any) -> None:
+    """Write ``data`` to ``path`` atomically, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+__all__ = ["write_json"]
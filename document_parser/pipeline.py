@@ -0,0 +1,488 @@
+"""OCR and field extraction for PDF documents.
+
+The heavy half of :mod:`document_parser`: importing it loads PyMuPDF, PIL,
+numpy and :mod:`text_recognition`.  The package re-exports its entry points
+lazily.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Callable, Optional, Set, TextIO, Tuple
+import contextlib
+import inspect
+import multiprocessing
+import os
+
+import fitz  # type: ignore
+from PIL import Image
+
+import tracing
+from llm.cache import ResponseCache
+from text_recognition import process_images, reader_stats, warm_up
+from text_recognition.layout import layout_text, reconstruct_layout
+from text_recognition.pipeline import build_result, render_overlay
+from text_recognition.utils import pil_to_data_url
+
+from . import BASE_PROMPT
+from .raster import DEFAULT_DPI, render_page
+from .refine import refine_low_confidence
+from .text_layer import has_text_layer, text_layer_lines
+
+
+# process_image options that also apply to text-layer pages
+_BUILD_PARAMS = set(inspect.signature(build_result).parameters) - {
+    "pixels", "detections", "llm_backend", "source", "use_llm",
+}
+
+
+def _ocr_pages(
+    pages: List["fitz.Page"],
+    llm_backend: str,
+    ocr_kwargs: Dict[str, Any],
+    text_layer: bool = True,
+    dpis: Optional[List[int]] = None,
+    refine_dpi: Optional[int] = None,
+    refine_conf: float = 0.5,
+    batch_size: int = 1,
+    use_llm: bool = False,
+    boxes: Optional[List[Optional[list]]] = None,
+) -> List[Tuple[Dict[str, Any], str]]:
+    """Rasterize and recognise a group of pages, returning ``(info, image_b64)`` per page.
+
+    Each page is rendered at its entry in ``dpis`` (``DEFAULT_DPI`` if
+    omitted).  Pages with a usable text layer take the PyMuPDF extraction path
+    when ``text_layer`` is enabled; the remaining pages of the group are
+    recognised together by :func:`text_recognition.process_images` in batches
+    of ``batch_size``.  ``info["path"]`` records which path was used.  On
+    OCR'd pages, ``refine_dpi`` re-renders blocks below ``refine_conf`` at that
+    resolution and recognises them again (see :mod:`.refine`).
+
+    ``use_llm`` enables LLM verification of low-confidence blocks on OCR'd
+    pages.  ``boxes`` may hold, per page, text boxes already detected at that
+    page's resolution; such pages only run the recognizer.
+    """
+    dpis = dpis or [DEFAULT_DPI] * len(pages)
+    rendered = [render_page(page, dpi) for page, dpi in zip(pages, dpis)]
+    infos: List[Optional[Dict[str, Any]]] = [None] * len(pages)
+    ocr_positions = []
+    for pos, (page, (pix, pixels, zoom)) in enumerate(zip(pages, rendered)):
+        lines = []
+        usable = False
+        if text_layer:
+            with tracing.span("pdf.text_layer") as s:
+                lines = text_layer_lines(page, page.rotation_matrix * fitz.Matrix(zoom, zoom))
+                usable = bool(lines) and has_text_layer(page, lines)
+                s.set(lines=len(lines))
+        if usable:
+            build_kwargs = {k: v for k, v in ocr_kwargs.items() if k in _BUILD_PARAMS}
+            infos[pos] = build_result(pixels, lines, llm_backend=llm_backend, source="TEXT", **build_kwargs)
+            infos[pos]["path"] = "text_layer"
+        else:
+            ocr_positions.append(pos)
+
+    if ocr_positions:
+        results = process_images(
+            [rendered[pos][1] for pos in ocr_positions],
+            batch_size=batch_size,
+            llm_backend=llm_backend,
+            use_llm=use_llm,
+            boxes=[boxes[pos] for pos in ocr_positions] if boxes else None,
+            **ocr_kwargs,
+        )
+        for pos, info in zip(ocr_positions, results):
+            infos[pos] = info
+            info["path"] = "ocr"
+            if not (refine_dpi and refine_dpi > dpis[pos]):
+                continue
+            pixels, zoom = rendered[pos][1], rendered[pos][2]
+            with tracing.span("ocr.refine", dpi=refine_dpi) as s:
+                improved = refine_low_confidence(
+                    pages[pos],
+                    info,
+                    fitz.Matrix(zoom, zoom),
+                    refine_dpi=refine_dpi,
+                    refine_conf=refine_conf,
+                    languages=ocr_kwargs.get("languages"),
+                    gpu=ocr_kwargs.get("gpu", False),
+                )
+                s.set(improved=improved)
+            info["refined"] = improved
+            if improved and ocr_kwargs.get("render") == "full":
+                info["overlay"] = render_overlay(
+                    Image.fromarray(pixels).convert("RGBA"),
+                    info["blocks"],
+                    ocr_kwargs.get("label_max_chars", 30),
+                    ocr_kwargs.get("font_size", 8),
+                )
+    with tracing.span("pdf.page_encode", pages=len(pages)) as s:
+        encoded = [pil_to_data_url(Image.fromarray(pixels)) for _, pixels, _ in rendered]
+        s.set(bytes=sum(len(url) for url in encoded))
+    return list(zip(infos, encoded))
+
+
+def _finish_page(
+    page_index: int, total_pages: int, info: Dict[str, Any], image_b64: str, layout: bool = True
+) -> Dict[str, Any]:
+    """Build the page record yielded by :func:`iter_pages` from a recognised page."""
+    if layout:
+        with tracing.span("layout", blocks=len(info["blocks"])):
+            paragraphs = reconstruct_layout(info["blocks"])
+            info["paragraphs"] = [p.to_dict() for p in paragraphs]
+            text = layout_text(paragraphs)
+    else:
+        text = "\n".join(info.get("verified_lines", []))
+    return {
+        "page": page_index,
+        "total": total_pages,
+        "info": info,
+        "text": text,
+        "image_b64": image_b64,
+        "path": info["path"],
+    }
+
+
+def _init_worker(languages: Optional[List[str]], gpu: bool, threads: int) -> None:
+    """Process-pool initializer: pin torch threads and load the reader once."""
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:  # pragma: no cover - torch ships with easyocr
+        pass
+    warm_up(languages, gpu)
+
+
+def _ocr_pages_worker(
+    pdf_path: str,
+    page_indices: List[int],
+    llm_backend: str,
+    ocr_kwargs: Dict[str, Any],
+    page_opts: Dict[str, Any],
+    trace: bool = False,
+) -> Tuple[List[Tuple[int, Dict[str, Any], str]], List[Dict[str, Any]]]:
+    """Worker entry point: open ``pdf_path`` and OCR a group of pages.
+
+    Returns the pages and, when ``trace`` is set, the records of the spans
+    ended in the worker so the parent can :func:`tracing.replay` them.
+    """
+    records: List[Dict[str, Any]] = []
+    with tracing.capture() if trace else contextlib.nullcontext(records) as records:
+        with fitz.open(pdf_path) as doc:
+            results = _ocr_pages([doc[i - 1] for i in page_indices], llm_backend, ocr_kwargs, **page_opts)
+    return [(i, info, image_b64) for i, (info, image_b64) in zip(page_indices, results)], records
+
+
+def iter_pages(
+    pdf_path: str,
+    llm_backend: str = "openrouter",
+    progress_cb: Optional[Callable[[float, str], None]] = None,
+    workers: int = 1,
+    log_file: Optional[TextIO] = None,
+    text_layer: bool = True,
+    dpi: int = DEFAULT_DPI,
+    page_dpi: Optional[Dict[int, int]] = None,
+    refine_dpi: Optional[int] = None,
+    refine_conf: float = 0.5,
+    batch_size: int = 1,
+    layout: bool = True,
+    **ocr_kwargs: Any,
+) -> Iterator[Dict[str, Any]]:
+    """Yield OCR results for each page of ``pdf_path`` as soon as it is ready.
+
+    Pages are yielded in order as dictionaries with ``page``, ``total``,
+    ``info`` (the :func:`text_recognition.process_image` result), ``text``,
+    ``image_b64`` and ``path``.  With ``text_layer`` enabled, pages that
+    already contain extractable text skip EasyOCR and are built from the PDF
+    text layer (``path == "text_layer"``); the rest are OCR'd (``"ocr"``).
+
+    Pages are rendered at ``dpi`` unless ``page_dpi`` maps a 1-based page
+    number to its own resolution.  Setting ``refine_dpi`` enables adaptive
+    mode: pages are OCR'd at the low ``dpi`` and only blocks below
+    ``refine_conf`` are re-rendered at ``refine_dpi`` and recognised again.
+
+    Pages are recognised with ``render="text"`` unless another mode is given:
+    the yielded ``info`` then holds no page image, so memory stays bounded by
+    the records the consumer retains.  ``render="lazy"`` or ``"full"`` keeps
+    an RGBA copy of the page in every ``info`` for the overlay and crops;
+    consumers asking for them should drop each record once it is displayed.
+
+    Pages are processed in groups of ``batch_size``: the OCR'd pages of a
+    group share batched EasyOCR calls (see
+    :func:`text_recognition.process_images`) and the group is yielded once all
+    of its pages are done.  With ``workers > 1`` groups are OCR'd in a process
+    pool; at most ``2 * workers`` groups are in flight and out-of-order
+    completions are buffered until the preceding pages are done.
+    ``progress_cb`` is called on every page completion, in completion order.
+
+    With ``layout`` enabled, ``text`` is the page in reading order as numbered
+    paragraphs (``[N] ...``, see :mod:`text_recognition.layout`) and
+    ``info["paragraphs"]`` maps each paragraph to its block positions;
+    otherwise ``text`` is ``verified_lines`` joined in detection order.
+    """
+    ocr_kwargs.pop("use_llm", None)
+    ocr_kwargs.setdefault("render", "text")
+    page_dpi = page_dpi or {}
+    batch_size = max(1, batch_size)
+
+    def page_opts(page_indices: List[int]) -> Dict[str, Any]:
+        return {
+            "text_layer": text_layer,
+            "dpis": [page_dpi.get(i, dpi) for i in page_indices],
+            "refine_dpi": refine_dpi,
+            "refine_conf": refine_conf,
+            "batch_size": batch_size,
+        }
+
+    def log(line: str) -> None:
+        if log_file is not None:
+            log_file.write(line + "\n")
+
+    with fitz.open(pdf_path) as doc:
+        total_pages = len(doc)
+    groups = [
+        list(range(start, min(start + batch_size, total_pages + 1)))
+        for start in range(1, total_pages + 1, batch_size)
+    ]
+    workers = max(1, min(workers, len(groups)))
+    done = 0
+
+    def page_done(page_index: int, info: Dict[str, Any], image_b64: str) -> Dict[str, Any]:
+        nonlocal done
+        done += 1
+        log(f"Page {page_index}: {len(info.get('verified_lines', []))} lines ({info['path']})")
+        if progress_cb:
+            progress_cb(done / (total_pages + 1), f"Обработка страницы {done}/{total_pages}")
+        return _finish_page(page_index, total_pages, info, image_b64, layout)
+
+    if workers == 1:
+        # The reader is loaded on the first OCR'd page, so text-only documents never pay for it
+        with fitz.open(pdf_path) as doc:
+            for indices in groups:
+                log(f"Processing pages {indices[0]}-{indices[-1]}")
+                results = _ocr_pages([doc[i - 1] for i in indices], llm_backend, ocr_kwargs, **page_opts(indices))
+                for page_index, (info, image_b64) in zip(indices, results):
+                    yield page_done(page_index, info, image_b64)
+        return
+
+    log(f"Processing {total_pages} pages with {workers} workers")
+    trace = tracing.enabled()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(ocr_kwargs.get("languages"), ocr_kwargs.get("gpu", False), threads),
+    ) as pool:
+        pending: Set[Future] = set()
+        ready: Dict[int, Dict[str, Any]] = {}
+        next_group, next_yield = 0, 1
+        while next_yield <= total_pages:
+            while next_group < len(groups) and len(pending) < 2 * workers:
+                indices = groups[next_group]
+                pending.add(
+                    pool.submit(
+                        _ocr_pages_worker,
+                        pdf_path,
+                        indices,
+                        llm_backend,
+                        ocr_kwargs,
+                        page_opts(indices),
+                        trace,
+                    )
+                )
+                next_group += 1
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results, records = future.result()
+                tracing.replay(records)
+                for page_index, info, image_b64 in results:
+                    ready[page_index] = page_done(page_index, info, image_b64)
+            while next_yield in ready:
+                yield ready.pop(next_yield)
+                next_yield += 1
+
+
+def extract_document_fields(
+    pages: Iterable[Dict[str, Any]],
+    llm_backend: str = "openrouter",
+    prompt: Optional[str] = None,
+    llm_cache: Optional[ResponseCache] = None,
+    **extract_options: Any,
+) -> Dict[str, Any]:
+    """Final pipeline stage: consume a page stream and extract fields via the LLM.
+
+    Only ``page``, ``text`` and ``image_b64`` are retained from each page, so
+    OCR blocks and overlays can be released by the producer as it goes.
+    ``extract_options`` (``chunk_tokens``, ``image_mode``, ...) are passed to
+    :meth:`llm.router.LLMRouter.extract_fields`; with ``llm_cache`` an
+    unchanged prompt and page set is answered from the response cache.
+    """
+    pages_for_llm = [
+        {"page": page["page"], "text": page["text"], "image_b64": page["image_b64"]}
+        for page in pages
+    ]
+
+    from llm.router import LLMRouter
+
+    llm = LLMRouter(backend=llm_backend, cache=llm_cache)
+    with tracing.span("llm.extract", pages=len(pages_for_llm)):
+        return llm.extract_fields(pages_for_llm, prompt or BASE_PROMPT, **extract_options)
+
+
+def parse_document(
+    pdf_path: str,
+    llm_backend: str = "openrouter",
+    log_path: str = "process.log",
+    prompt: Optional[str] = None,
+    progress_cb: Optional[Callable[[float, str], None]] = None,
+    workers: int = 1,
+    extract_options: Optional[Dict[str, Any]] = None,
+    llm_cache: Optional[ResponseCache] = None,
+    text_layer: bool = True,
+    schedule: bool = False,
+    version_dir: Optional[str] = None,
+    **ocr_kwargs: Any,
+) -> Dict[str, Any]:
+    """Run OCR on each PDF page and extract structured fields using an LLM.
+
+    This is a convenience wrapper around :func:`iter_pages` and
+    :func:`extract_document_fields` that keeps every page's OCR info.
+
+    Parameters
+    ----------
+    pdf_path:
+        Path to the input PDF to parse.
+    llm_backend:
+        Backend name for :class:`llm.router.LLMRouter`.
+    log_path:
+        Where to save the processing log.
+    prompt:
+        Custom prompt for field extraction.  If ``None`` the built-in
+        :data:`BASE_PROMPT` is used.
+    progress_cb:
+        Optional callback receiving ``(progress, description)`` updates where
+        ``progress`` is a float from 0 to 1.
+    workers:
+        Number of worker processes used for OCR.  With ``1`` pages are
+        processed sequentially in the current process; otherwise each worker
+        keeps its own warm EasyOCR reader and pages are distributed among them.
+    extract_options:
+        Options for the field extraction call, e.g. ``chunk_tokens`` to split
+        large documents into budgeted chunks or ``image_mode="jpeg"`` /
+        ``"none"`` to shrink the request payload.
+    llm_cache:
+        Optional :class:`llm.cache.ResponseCache` for the extraction call.
+    text_layer:
+        Take text directly from the PDF text layer on pages that have a
+        usable one and reserve EasyOCR for image-only pages.
+    schedule:
+        Process pages in priority order and stop once every field is found
+        with enough confidence (see :func:`.scheduler.parse_scheduled`, which
+        also takes ``min_confidence``, ``group_size`` and ``detect_dpi``).
+        Pages are then recognised in-process, so ``workers`` must be ``1``;
+        ``batch_size`` splits each page group into batched OCR calls and
+        defaults to the whole group.
+    version_dir:
+        Directory of a stored earlier version of the document: unchanged
+        pages reuse its OCR, only fields located on changed pages are
+        extracted again and the new version is stored there (see
+        :func:`.versioning.parse_revision`).
+    **ocr_kwargs:
+        Rasterization, grouping and layout options of :func:`iter_pages`
+        (``dpi``, ``page_dpi``, ``refine_dpi``, ``refine_conf``,
+        ``batch_size``, ``layout``) and
+        additional keyword arguments forwarded to
+        :func:`text_recognition.process_images`.  Every page's info is kept
+        in the result, so page crops and overlays are skipped
+        (``render="text"``) unless another mode is given.
+
+    Returns
+    -------
+    dict
+        A dictionary containing ``pages`` with OCR info for each page, the
+        extracted ``fields`` from the LLM, ``stats`` with the number of
+        pages that took each recognition path and ``trace``, a per-stage
+        timing summary (see :func:`tracing.collect`).
+    """
+    if version_dir is not None:
+        from .versioning import parse_revision
+
+        return parse_revision(
+            pdf_path,
+            version_dir,
+            llm_backend,
+            log_path,
+            prompt,
+            progress_cb,
+            extract_options,
+            llm_cache,
+            text_layer,
+            **ocr_kwargs,
+        )
+    if schedule:
+        from .scheduler import parse_scheduled
+
+        return parse_scheduled(
+            pdf_path,
+            llm_backend,
+            log_path,
+            prompt,
+            progress_cb,
+            extract_options,
+            llm_cache,
+            text_layer,
+            workers=workers,
+            **ocr_kwargs,
+        )
+
+    pages_info: List[Dict[str, Any]] = []
+    stats = {"text_layer_pages": 0, "ocr_pages": 0}
+
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        log_file.write(f"PDF: {pdf_path}\n")
+        if progress_cb:
+            progress_cb(0.0, "Начало")
+
+        def stream() -> Iterator[Dict[str, Any]]:
+            for page in iter_pages(
+                pdf_path,
+                llm_backend=llm_backend,
+                progress_cb=progress_cb,
+                workers=workers,
+                log_file=log_file,
+                text_layer=text_layer,
+                **ocr_kwargs,
+            ):
+                pages_info.append({"page": page["page"], "info": page["info"]})
+                stats[f"{page['path']}_pages"] += 1
+                yield page
+            if progress_cb:
+                progress_cb(len(pages_info) / (len(pages_info) + 1), "Извлечение полей LLM")
+
+        with tracing.collect() as summary, tracing.span("document.parse"):
+            fields = extract_document_fields(
+                stream(), llm_backend, prompt, llm_cache=llm_cache, **(extract_options or {})
+            )
+        trace = summary.as_dict()
+
+        log_file.write(
+            f"Pages: {stats['text_layer_pages']} from text layer, {stats['ocr_pages']} OCR\n"
+        )
+        for name, reader in reader_stats().items():
+            log_file.write(f"OCR reader {name}: {reader['load_seconds']:.2f}s load\n")
+        cache = ocr_kwargs.get("cache")
+        if cache is not None and workers == 1:
+            cache_stats = cache.stats()
+            log_file.write(f"OCR cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses\n")
+        if llm_cache is not None:
+            cache_stats = llm_cache.stats()
+            log_file.write(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses\n")
+        for name, stage in trace.items():
+            log_file.write(f"Stage {name}: {stage['count']}x, {stage['seconds']:.3f}s\n")
+        log_file.write("LLM extraction complete\n")
+        if progress_cb:
+            progress_cb(1.0, "Готово")
+
+    return {"pages": pages_info, "fields": fields, "stats": stats, "trace": trace}
+
+
+__all__ = ["parse_document", "iter_pages", "extract_document_fields"]
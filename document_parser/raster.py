@@ -0,0 +1,33 @@
+"""Page rasterization helpers shared by the parser stages."""
+
+from typing import Tuple
+
+import fitz  # type: ignore
+import numpy as np
+
+import tracing
+
+DEFAULT_DPI = 72
+
+
+def pixmap_to_array(pix: "fitz.Pixmap") -> np.ndarray:
+    """Return an ``(h, w, n)`` view over the pixmap samples without copying."""
+    samples = getattr(pix, "samples_mv", None) or pix.samples
+    arr = np.frombuffer(samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return arr[:, : pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+
+
+def render_page(page: "fitz.Page", dpi: int = DEFAULT_DPI) -> Tuple["fitz.Pixmap", np.ndarray, float]:
+    """Rasterize ``page`` at ``dpi`` and return ``(pixmap, pixels, zoom)``.
+
+    ``zoom`` is the factor between page points and pixmap pixels; the pixmap
+    must stay referenced for as long as ``pixels`` is used.
+    """
+    zoom = dpi / 72
+    with tracing.span("pdf.rasterize", dpi=dpi) as s:
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        s.set(bytes=pix.stride * pix.height)
+    return pix, pixmap_to_array(pix), zoom
+
+
+__all__ = ["DEFAULT_DPI", "pixmap_to_array", "render_page"]
@@ -0,0 +1,72 @@
+"""Region-of-interest re-OCR of low-confidence blocks at a higher DPI.
+
+Pages are first rasterized and recognised at a low resolution.  Only blocks
+whose confidence is below a threshold are re-rendered from the PDF at a
+higher DPI (via a ``clip`` rectangle) and recognised again, so compute is
+spent on the regions where accuracy needs it rather than on whole pages.
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import fitz  # type: ignore
+import numpy as np
+
+from text_recognition.readers import readtext
+
+from .raster import pixmap_to_array
+
+# Padding (in PDF points) added around a block before re-rendering it
+CLIP_PADDING = 2.0
+
+
+def refine_low_confidence(
+    page: "fitz.Page",
+    info: Dict[str, Any],
+    matrix: "fitz.Matrix",
+    refine_dpi: int = 300,
+    refine_conf: float = 0.5,
+    languages: Optional[Sequence[str]] = None,
+    gpu: bool = False,
+) -> int:
+    """Re-OCR blocks of ``info`` below ``refine_conf`` at ``refine_dpi``.
+
+    ``matrix`` is the page-to-pixmap transform used for the initial render
+    (``fitz.Matrix(zoom, zoom)``); its inverse maps block coordinates back to
+    page space.  ``get_pixmap`` renders the page with its ``/Rotate`` applied
+    and takes ``clip`` in that same rotated space (the one of ``page.rect``),
+    so on rotated pages the clip is not passed through
+    ``page.derotation_matrix``.  Candidates are selected from the block
+    table's columns.  A block is updated only if the high-resolution pass is
+    more confident, counting only detections with text; its ``final`` entry
+    and the matching ``verified_lines`` item are replaced and the attempt is
+    recorded under ``refined``.  Returns the number of improved blocks.
+    """
+    inverse = ~matrix
+    scale = refine_dpi / 72
+    improved = 0
+    blocks = info["blocks"]
+    if "EASY" not in blocks.source_names:
+        return 0
+    weak = (blocks.source == blocks.source_names.index("EASY")) & (blocks.final_conf < refine_conf)
+    for pos in np.flatnonzero(weak).tolist():
+        points = blocks.coords[pos].reshape(4, 2)
+        clip = fitz.Rect(*points.min(axis=0), *points.max(axis=0)) * inverse
+        clip = (clip + (-CLIP_PADDING, -CLIP_PADDING, CLIP_PADDING, CLIP_PADDING)) & page.rect
+        if clip.is_empty:
+            continue
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+        found = readtext(pixmap_to_array(pix), languages=languages, gpu=gpu, detail=1)
+        found = [r for r in found if r[1].strip()]
+        if not found:
+            continue
+        text = " ".join(r[1] for r in found)
+        conf = sum(float(r[2] or 0.0) for r in found) / len(found)
+        blocks.set_field(pos, "refined", {"text": text, "confidence": conf, "dpi": refine_dpi})
+        if conf > blocks.final_conf[pos]:
+            blocks.set_final(pos, text, conf, "EASY")
+            info["verified_lines"][pos] = text
+            improved += 1
+    return improved
+
+
+__all__ = ["refine_low_confidence"]
@@ -0,0 +1,341 @@
+"""Priority scheduling of page recognition and field extraction.
+
+:func:`document_parser.parse_document` normally recognises every page and
+extracts the fields in one call at the end, although contract fields usually
+sit on the first pages and on the requisites/signature page.  The scheduler
+instead:
+
+1. surveys every page cheaply: pages with a usable text layer give their text
+   directly, image-only pages get a detection-only EasyOCR pass at low
+   resolution (see :func:`text_recognition.readers.detect`), whose boxes are
+   later reused so recognition skips a second detection pass;
+2. ranks the pages by keyword hits for the prompt's fields, their position in
+   the document (first and last pages) and where their text sits;
+3. recognises the pages in that order, ``group_size`` at a time, extracts the
+   fields from each group and merges them into the running result;
+4. stops as soon as every field of the prompt's schema has a value whose
+   source page was recognised with at least ``min_confidence``.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Pattern
+import re
+
+import fitz  # type: ignore
+
+import tracing
+from llm.cache import ResponseCache
+from llm.chunking import is_filled, location_pages, part_prompt, schema_fields, unite_lists
+from text_recognition import reader_stats
+from text_recognition.readers import detect
+
+from . import BASE_PROMPT
+from .pipeline import _finish_page, _ocr_pages
+from .raster import DEFAULT_DPI, render_page
+from .text_layer import has_text_layer, text_layer_lines
+
+# Keyword patterns of the BASE_PROMPT fields; other fields fall back to the
+# stems of the words in their names (see field_patterns)
+FIELD_KEYWORDS: Dict[str, str] = {
+    "№ контракта": r"контракт\w*\s*№|договор\w*\s*№|№\s*\S*\d",
+    "дата заключения": r"\b\d{1,2}[./]\d{1,2}[./]\d{2,4}\b|заключ\w*|«\s*\d{1,2}\s*»",
+    "дата окончания": r"действ\w*\s+до|срок\w*\s+действ|оконч\w*|по\s+\d{1,2}[./]\d{1,2}[./]\d{2,4}",
+    "контрагент": r"именуем\w*|продав\w*|покупат\w*|поставщ\w*|заказчик\w*|исполнит\w*|\bИНН\b|реквизит\w*",
+    "страна": r"стран\w*|росси\w*|кита\w*|республик\w*|country",
+    "сумма контракта": r"сумм\w*|стоимост\w*|цен\w*\s+договор|\d[\d\s]*[.,]\d{2}\s*(?:руб|usd|eur|cny)",
+    "валюта контракта": r"валют\w*|рубл\w*|доллар\w*|евро|юан\w*|\b(?:RUB|USD|EUR|CNY)\b",
+    "валюта платежа": r"платеж\w*|оплат\w*|валют\w*|\b(?:RUB|USD|EUR|CNY)\b",
+}
+
+FIRST_PAGE_BONUS = 2.0
+LAST_PAGE_BONUS = 1.5
+# Prior of an image-only page, whose text is unknown until it is recognised
+UNKNOWN_TEXT_SCORE = 1.0
+# Share of the page height treated as the header band (title, number, date)
+HEADER_BAND = 0.25
+
+def field_patterns(fields: List[str]) -> Dict[str, Pattern[str]]:
+    """Compile a keyword pattern per field name."""
+    patterns = {}
+    for name in fields:
+        pattern = FIELD_KEYWORDS.get(name)
+        if pattern is None:
+            stems = [word[:5] for word in re.findall(r"\w{4,}", name)]
+            pattern = "|".join(re.escape(stem) + r"\w*" for stem in stems) or re.escape(name)
+        patterns[name] = re.compile(pattern, re.IGNORECASE)
+    return patterns
+
+
+def survey_page(
+    page: "fitz.Page",
+    patterns: Dict[str, Pattern[str]],
+    text_layer: bool = True,
+    detect_dpi: int = DEFAULT_DPI,
+    languages: Optional[List[str]] = None,
+    gpu: bool = False,
+) -> Dict[str, Any]:
+    """Cheap look at one page: keyword hits from its text layer or text boxes from detection.
+
+    For image pages the detected boxes are kept in ``detections`` (pixels at
+    ``detect_dpi``) so recognition can reuse them (see :func:`survey_boxes`).
+    """
+    survey: Dict[str, Any] = {"page": page.number + 1, "text_layer": False, "hits": {}, "boxes": 0, "header": 0.0}
+    if text_layer:
+        lines = text_layer_lines(page, page.rotation_matrix)
+        if lines and has_text_layer(page, lines):
+            text = "\n".join(t for _, t, _ in lines)
+            survey["text_layer"] = True
+            survey["hits"] = {name: len(p.findall(text)) for name, p in patterns.items() if p.search(text)}
+            return survey
+    pix, pixels, _ = render_page(page, detect_dpi)
+    boxes = detect(pixels, languages, gpu)
+    survey["detections"] = boxes
+    survey["detect_dpi"] = detect_dpi
+    if boxes:
+        tops = [min(y for _, y in box) for box in boxes]
+        survey["boxes"] = len(boxes)
+        survey["header"] = sum(1 for top in tops if top < HEADER_BAND * pix.height) / len(boxes)
+    return survey
+
+
+def survey_boxes(survey: Dict[str, Any], dpi: int) -> Optional[List[List[List[float]]]]:
+    """Survey detections scaled to a render at ``dpi``; ``None`` if the page was not detected."""
+    boxes = survey.get("detections")
+    if boxes is None:
+        return None
+    scale = dpi / survey["detect_dpi"]
+    return [[[x * scale, y * scale] for x, y in box] for box in boxes]
+
+
+def page_priority(survey: Dict[str, Any], total_pages: int) -> float:
+    """Score of a surveyed page; higher-scoring pages are recognised first."""
+    if not survey["text_layer"] and not survey["boxes"]:
+        return -1.0  # blank page
+    if survey["text_layer"]:
+        hits = survey["hits"]
+        score = 3.0 * len(hits) + 0.1 * min(sum(hits.values()), 20)
+    else:
+        score = UNKNOWN_TEXT_SCORE + survey["header"]
+    if survey["page"] == 1:
+        score += FIRST_PAGE_BONUS
+    if survey["page"] == total_pages and total_pages > 1:
+        score += LAST_PAGE_BONUS  # requisites and signatures of the parties
+    return score
+
+
+def page_confidence(info: Dict[str, Any]) -> float:
+    """Mean final confidence of a recognised page; text-layer pages count as exact."""
+    if info["path"] == "text_layer":
+        return 1.0
+    conf = info["blocks"].final_conf
+    return float(conf.mean()) if len(conf) else 0.0
+
+
+def merge_fields(
+    fields: Dict[str, Any],
+    confidence: Dict[str, float],
+    partial: Dict[str, Any],
+    page_conf: Dict[int, float],
+) -> List[str]:
+    """Merge the ``partial`` result of one page group into ``fields`` in place.
+
+    Each new value is scored by the confidence of the page its ``location``
+    names (the weakest page of the group if it names none).  A field is
+    replaced only by a value from a more confident page; list values are
+    united and keep the confidence of their best source.  Returns the names of the fields that changed.
+    """
+    changed = []
+    fallback = min(page_conf.values()) if page_conf else 0.0
+    for name, entry in partial.items():
+        if name == "error" or not is_filled(entry):
+            continue
+        pages = location_pages(entry.get("location"))
+        conf = page_conf.get(pages[0] if pages else None, fallback)
+        old = fields.get(name)
+        if is_filled(old) and isinstance(old["value"], list) and isinstance(entry["value"], list):
+            before = len(old["value"])
+            unite_lists(old, entry)
+            if len(old["value"]) == before:
+                continue
+            confidence[name] = max(confidence[name], conf)
+        elif not is_filled(old) or conf > confidence.get(name, 0.0):
+            fields[name] = dict(entry)
+            confidence[name] = conf
+        else:
+            continue
+        changed.append(name)
+    return changed
+
+
+def parse_scheduled(
+    pdf_path: str,
+    llm_backend: str = "openrouter",
+    log_path: str = "process.log",
+    prompt: Optional[str] = None,
+    progress_cb: Optional[Callable[[float, str], None]] = None,
+    extract_options: Optional[Dict[str, Any]] = None,
+    llm_cache: Optional[ResponseCache] = None,
+    text_layer: bool = True,
+    min_confidence: float = 0.6,
+    group_size: int = 2,
+    batch_size: Optional[int] = None,
+    detect_dpi: int = DEFAULT_DPI,
+    dpi: int = DEFAULT_DPI,
+    page_dpi: Optional[Dict[int, int]] = None,
+    refine_dpi: Optional[int] = None,
+    refine_conf: float = 0.5,
+    layout: bool = True,
+    **ocr_kwargs: Any,
+) -> Dict[str, Any]:
+    """Parse ``pdf_path`` page group by page group in priority order, stopping early.
+
+    Takes the options of :func:`document_parser.parse_document` plus the ones
+    below.  Groups are recognised in this process, so ``workers > 1`` raises
+    :class:`ValueError`.  Unlike ``parse_document``, ``use_llm``
+    verifies low-confidence blocks of OCR'd pages, which raises the page
+    confidence the stopping rule relies on.
+
+    min_confidence:
+        A field is final once its value comes from a page whose mean OCR
+        confidence is at least this (text-layer pages count as ``1.0``).
+    group_size:
+        Pages recognised and sent to the LLM per step.
+    batch_size:
+        Pages of a group recognised together in one batched EasyOCR call;
+        ``None`` batches the whole group.
+    detect_dpi:
+        Resolution of the detection-only survey of image pages.
+
+    Returns the :func:`~document_parser.parse_document` result for the pages
+    that were processed; ``stats`` additionally holds the processing
+    ``order``, ``skipped_pages``, ``extract_calls`` and whether the run
+    ``stopped_early``, and ``confidence`` maps each field to the confidence
+    of its source page.
+    """
+    from llm.router import LLMRouter
+
+    prompt = prompt or BASE_PROMPT
+    fields_wanted = schema_fields(prompt)
+    patterns = field_patterns(fields_wanted)
+    use_llm = ocr_kwargs.pop("use_llm", False)
+    if ocr_kwargs.pop("workers", 1) > 1:
+        raise ValueError("workers > 1 is not supported with schedule; pages are recognised in priority order in-process")
+    ocr_kwargs.setdefault("render", "text")
+    page_dpi = page_dpi or {}
+    group_size = max(1, group_size)
+    llm = LLMRouter(backend=llm_backend, cache=llm_cache)
+
+    pages_info: List[Dict[str, Any]] = []
+    fields: Dict[str, Any] = {}
+    confidence: Dict[str, float] = {}
+    errors: List[str] = []
+    stats: Dict[str, Any] = {"text_layer_pages": 0, "ocr_pages": 0, "extract_calls": 0}
+
+    with open(log_path, "w", encoding="utf-8") as log_file, tracing.collect() as summary:
+        log_file.write(f"PDF: {pdf_path} (scheduled)\n")
+        if progress_cb:
+            progress_cb(0.0, "Обзор страниц")
+
+        with tracing.span("document.parse"), fitz.open(pdf_path) as doc:
+            total_pages = len(doc)
+            with tracing.span("schedule.survey", pages=total_pages):
+                surveys = [
+                    survey_page(
+                        page,
+                        patterns,
+                        text_layer,
+                        detect_dpi,
+                        ocr_kwargs.get("languages"),
+                        ocr_kwargs.get("gpu", False),
+                    )
+                    for page in doc
+                ]
+            scores = {s["page"]: page_priority(s, total_pages) for s in surveys}
+            order = sorted(scores, key=lambda p: (-scores[p], p))
+            stats["order"] = order
+            log_file.write("Priority: " + ", ".join(f"{p} ({scores[p]:.1f})" for p in order) + "\n")
+
+            done: List[int] = []
+            for start in range(0, total_pages, group_size):
+                group = order[start:start + group_size]
+                results = _ocr_pages(
+                    [doc[i - 1] for i in group],
+                    llm_backend,
+                    ocr_kwargs,
+                    text_layer=text_layer,
+                    dpis=[page_dpi.get(i, dpi) for i in group],
+                    refine_dpi=refine_dpi,
+                    refine_conf=refine_conf,
+                    batch_size=min(batch_size or len(group), len(group)),
+                    use_llm=use_llm,
+                    boxes=[survey_boxes(surveys[i - 1], page_dpi.get(i, dpi)) for i in group],
+                )
+                group_pages = []
+                page_conf: Dict[int, float] = {}
+                for page_index, (info, image_b64) in zip(group, results):
+                    page = _finish_page(page_index, total_pages, info, image_b64, layout)
+                    group_pages.append({"page": page_index, "text": page["text"], "image_b64": image_b64})
+                    pages_info.append({"page": page_index, "info": info})
+                    stats[f"{page['path']}_pages"] += 1
+                    page_conf[page_index] = page_confidence(info)
+                    log_file.write(
+                        f"Page {page_index}: {len(info.get('verified_lines', []))} lines "
+                        f"({info['path']}, conf {page_conf[page_index]:.2f})\n"
+                    )
+                done.extend(group)
+                if progress_cb:
+                    progress_cb(len(done) / (total_pages + 1), f"Страницы {', '.join(map(str, group))}")
+
+                with tracing.span("llm.extract", pages=len(group_pages)):
+                    partial = llm.extract_fields(group_pages, part_prompt(prompt, group), **(extract_options or {}))
+                stats["extract_calls"] += 1
+                if "error" in partial:
+                    errors.append(str(partial["error"]))
+                changed = merge_fields(fields, confidence, partial, page_conf)
+                log_file.write(f"Fields from pages {group}: {', '.join(changed) or '-'}\n")
+
+                missing = [
+                    name for name in fields_wanted
+                    if not is_filled(fields.get(name)) or confidence[name] < min_confidence
+                ]
+                if not missing:
+                    break
+
+        pages_info.sort(key=lambda p: p["page"])
+        stats["skipped_pages"] = total_pages - len(done)
+        stats["stopped_early"] = len(done) < total_pages
+        merged = {name: fields.get(name) or {"value": "", "location": ""} for name in fields_wanted}
+        if errors:
+            merged["error"] = "; ".join(errors)
+        trace = summary.as_dict()
+
+        log_file.write(
+            f"Pages: {stats['text_layer_pages']} from text layer, {stats['ocr_pages']} OCR, "
+            f"{stats['skipped_pages']} skipped after {stats['extract_calls']} extraction calls\n"
+        )
+        for name, reader in reader_stats().items():
+            log_file.write(f"OCR reader {name}: {reader['load_seconds']:.2f}s load\n")
+        for name, stage in trace.items():
+            log_file.write(f"Stage {name}: {stage['count']}x, {stage['seconds']:.3f}s\n")
+        log_file.write("LLM extraction complete\n")
+        if progress_cb:
+            progress_cb(1.0, "Готово")
+
+    return {
+        "pages": pages_info,
+        "fields": merged,
+        "confidence": {name: round(confidence.get(name, 0.0), 4) for name in fields_wanted},
+        "stats": stats,
+        "trace": trace,
+    }
+
+
+__all__ = [
+    "FIELD_KEYWORDS",
+    "field_patterns",
+    "survey_page",
+    "survey_boxes",
+    "page_priority",
+    "page_confidence",
+    "merge_fields",
+    "parse_scheduled",
+]
@@ -0,0 +1,74 @@
+"""Fast path for PDF pages that already carry an extractable text layer.
+
+Born-digital pages do not need OCR: PyMuPDF returns exact words and their
+boxes almost instantly.  The helpers below turn the text layer into
+EasyOCR-style ``(box, text, confidence)`` detections in pixmap coordinates so
+that :func:`text_recognition.pipeline.build_result` can produce the same
+``blocks`` / ``verified_lines`` structure as :func:`process_image`.
+"""
+
+from typing import List, Tuple
+
+import fitz  # type: ignore
+
+# Pages with fewer extractable characters are treated as image-only
+MIN_TEXT_CHARS = 20
+# Upper bound on replacement/control characters in a usable text layer
+MAX_BAD_CHAR_RATIO = 0.1
+
+Detection = Tuple[List[List[float]], str, float]
+
+
+def text_layer_lines(page: "fitz.Page", matrix: "fitz.Matrix") -> List[Detection]:
+    """Return one detection per text line, with boxes transformed by ``matrix``.
+
+    ``matrix`` maps page coordinates to pixmap pixels, typically
+    ``page.rotation_matrix * fitz.Matrix(zoom, zoom)``.
+    """
+    lines: dict = {}
+    for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words"):
+        key = (block_no, line_no)
+        rect = fitz.Rect(x0, y0, x1, y1)
+        if key in lines:
+            lines[key][0] |= rect
+            lines[key][1].append(word)
+        else:
+            lines[key] = [rect, [word]]
+
+    detections: List[Detection] = []
+    for rect, words in lines.values():
+        r = rect * matrix
+        box = [[r.x0, r.y0], [r.x1, r.y0], [r.x1, r.y1], [r.x0, r.y1]]
+        detections.append((box, " ".join(words), 1.0))
+    return detections
+
+
+def _image_coverage(page: "fitz.Page") -> float:
+    area = abs(page.rect) or 1.0
+    covered = 0.0
+    for info in page.get_image_info():
+        covered += abs(fitz.Rect(info["bbox"]) & page.rect)
+    return min(1.0, covered / area)
+
+
+def has_text_layer(page: "fitz.Page", lines: List[Detection], min_chars: int = MIN_TEXT_CHARS) -> bool:
+    """Decide whether ``lines`` extracted from ``page`` can replace OCR.
+
+    The layer must contain at least ``min_chars`` characters, must not be
+    dominated by replacement or control characters (broken font encodings),
+    and a page mostly covered by images needs substantially more text, since a
+    scanned page may carry only a stray digital header or stamp.
+    """
+    text = "".join(t for _, t, _ in lines)
+    chars = len(text.strip())
+    if chars < min_chars:
+        return False
+    bad = sum(1 for c in text if c == "�" or (ord(c) < 32 and c not in "\t\n"))
+    if bad / chars > MAX_BAD_CHAR_RATIO:
+        return False
+    if _image_coverage(page) > 0.5 and chars < 10 * min_chars:
+        return False
+    return True
+
+
+__all__ = ["text_layer_lines", "has_text_layer", "MIN_TEXT_CHARS"]
@@ -0,0 +1,386 @@
+"""Incremental re-parsing of revised versions of a document.
+
+A parse can be stored in a version directory: a ``manifest.json`` with a
+fingerprint of every page (hashes of the low-resolution render and of the
+text layer), the page texts and the extracted fields, plus the OCR blocks of
+each page as ``page-<hash>.npz`` (see :meth:`text_recognition.result.BlockTable.save_npz`),
+named by the page fingerprint and OCR options.
+
+When a revision of the document is parsed against that directory:
+
+- pages whose fingerprint matches a stored page (at any position, so inserted
+  or removed pages are handled) reuse its OCR blocks and text;
+- only the remaining, changed pages are rendered and recognised;
+- fields whose ``location`` points to an unchanged page keep their value,
+  with the page number rewritten if the page moved; the other fields are
+  extracted again from the changed pages only (the whole document is sent
+  only without a stored version or after a prompt change);
+- the result lists which pages and fields were recomputed.
+
+Changing the OCR options or the prompt invalidates the stored pages or fields
+respectively.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import fitz  # type: ignore
+from PIL import Image
+
+import tracing
+from llm.cache import ResponseCache
+from llm.chunking import PAGE_REF_RE, is_filled, location_pages, part_prompt, schema_fields
+from text_recognition.result import BlockTable
+from text_recognition.utils import pil_to_data_url
+
+from . import BASE_PROMPT
+from .files import write_json
+from .pipeline import _finish_page, _ocr_pages
+from .raster import DEFAULT_DPI, render_page
+
+MANIFEST = "manifest.json"
+# Resolution of the render that is hashed into a page fingerprint
+FINGERPRINT_DPI = 36
+# OCR options that change recognised blocks; the rest (cache, render, ...) do not
+_OCR_PARAMS = (
+    "text_layer", "dpi", "page_dpi", "refine_dpi", "refine_conf", "layout",
+    "languages", "gpu", "conf_min",
+)
+
+def _sha256(data: Any) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_fingerprint(page: "fitz.Page", dpi: int = FINGERPRINT_DPI) -> Dict[str, str]:
+    """Hashes of the page's rendered pixels and of its text layer."""
+    pix, pixels, _ = render_page(page, dpi)
+    return {
+        "pixels": _sha256(memoryview(pixels.copy()).cast("B")),
+        "text": _sha256(" ".join(page.get_text("text").split()).encode("utf-8")),
+    }
+
+
+def fingerprint_pages(pdf_path: str, dpi: int = FINGERPRINT_DPI) -> List[Dict[str, str]]:
+    """:func:`page_fingerprint` of every page of ``pdf_path``."""
+    with tracing.span("version.fingerprint") as s, fitz.open(pdf_path) as doc:
+        fingerprints = [page_fingerprint(page, dpi) for page in doc]
+        s.set(pages=len(fingerprints))
+    return fingerprints
+
+
+def load_version(directory: str) -> Optional[Dict[str, Any]]:
+    """The stored manifest of ``directory``, or ``None`` if there is none."""
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _ocr_params(options: Dict[str, Any]) -> Dict[str, Any]:
+    return json.loads(json.dumps({k: options.get(k) for k in _OCR_PARAMS}, sort_keys=True, default=str))
+
+
+def _prompt_hash(prompt: str) -> str:
+    return _sha256(prompt.encode("utf-8"))
+
+
+def match_pages(
+    fingerprints: List[Dict[str, str]], previous: List[Dict[str, Any]]
+) -> Dict[int, int]:
+    """Map new 1-based page numbers to identical stored pages."""
+    stored: Dict[Tuple[str, str], int] = {}
+    for entry in previous:
+        fp = entry["fingerprint"]
+        stored.setdefault((fp["pixels"], fp["text"]), entry["page"])
+    matches = {}
+    for page, fp in enumerate(fingerprints, start=1):
+        old = stored.get((fp["pixels"], fp["text"]))
+        if old is not None:
+            matches[page] = old
+    return matches
+
+
+def stale_fields(previous_fields: Dict[str, Any], fields: List[str], moved: Dict[int, int]) -> List[str]:
+    """Fields to extract again: empty before, or located on a page not in ``moved``.
+
+    ``moved`` maps stored page numbers of unchanged pages to their new numbers.
+    Emptiness follows :func:`llm.chunking.is_empty`, so placeholders such as
+    ``"..."`` or ``["", ""]`` count as empty.
+    """
+    stale = []
+    for name in fields:
+        entry = previous_fields.get(name)
+        pages = location_pages(entry.get("location")) if isinstance(entry, dict) else []
+        if not pages or not is_filled(entry) or any(p not in moved for p in pages):
+            stale.append(name)
+    return stale
+
+
+def _renumber(entry: Dict[str, Any], moved: Dict[int, int]) -> Dict[str, Any]:
+    location = PAGE_REF_RE.sub(
+        lambda m: f"{m.group(1)} {moved.get(int(m.group(2)), int(m.group(2)))}", str(entry.get("location", ""))
+    )
+    return {**entry, "location": location}
+
+
+def _fields_prompt(prompt: str, pages: Optional[List[int]], fields: List[str], all_fields: List[str]) -> str:
+    lines = [prompt if pages is None else part_prompt(prompt, pages)]
+    if len(fields) < len(all_fields):
+        lines.append(f"Верни только поля: {', '.join(fields)}.")
+    return "\n".join(lines)
+
+
+def save_version(
+    directory: str,
+    pdf_path: str,
+    fingerprints: List[Dict[str, str]],
+    pages: List[Dict[str, Any]],
+    fields: Dict[str, Any],
+    prompt: str,
+    ocr_params: Dict[str, Any],
+) -> None:
+    """Store a parse of ``pdf_path`` in ``directory`` for later revisions.
+
+    ``pages`` are page records as yielded by :func:`document_parser.iter_pages`.
+    Block files are named by page content and written atomically, so files the
+    stored manifest points to are never overwritten; the manifest is swapped
+    next and unreferenced block files are removed last.  A crash at any point
+    leaves a consistent stored version.
+    """
+    os.makedirs(directory, exist_ok=True)
+    params_hash = _sha256(json.dumps(ocr_params, sort_keys=True).encode("utf-8"))
+    entries = []
+    for page, fp in zip(pages, fingerprints):
+        info = page["info"]
+        digest = _sha256(f"{fp['pixels']}|{fp['text']}|{params_hash}".encode("utf-8"))
+        blocks_file = f"page-{digest[:24]}.npz"
+        path = os.path.join(directory, blocks_file)
+        if not os.path.exists(path):  # same page and options: already stored
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix="page-", suffix=".tmp.npz")
+            os.close(fd)
+            info["blocks"].save_npz(tmp)
+            os.replace(tmp, path)
+        entries.append(
+            {
+                "page": page["page"],
+                "fingerprint": fp,
+                "path": page["path"],
+                "text": page["text"],
+                "verified_lines": list(info.get("verified_lines", [])),
+                "paragraphs": info.get("paragraphs"),
+                "blocks": blocks_file,
+            }
+        )
+    write_json(
+        os.path.join(directory, MANIFEST),
+        {
+            "pdf": os.path.basename(pdf_path),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "prompt": _prompt_hash(prompt),
+            "ocr_params": ocr_params,
+            "pages": entries,
+            "fields": fields,
+        },
+    )
+    keep = {entry["blocks"] for entry in entries}
+    for name in os.listdir(directory):
+        if name.startswith("page-") and name.endswith(".npz") and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+def _reused_page(directory: str, entry: Dict[str, Any], page_index: int, total_pages: int) -> Dict[str, Any]:
+    info: Dict[str, Any] = {
+        "blocks": BlockTable.load(os.path.join(directory, entry["blocks"])),
+        "verified_lines": entry["verified_lines"],
+        "path": entry["path"],
+        "reused_from": entry["page"],
+    }
+    if entry.get("paragraphs") is not None:
+        info["paragraphs"] = entry["paragraphs"]
+    return {
+        "page": page_index,
+        "total": total_pages,
+        "info": info,
+        "text": entry["text"],
+        "image_b64": None,
+        "path": entry["path"],
+    }
+
+
+def parse_revision(
+    pdf_path: str,
+    version_dir: str,
+    llm_backend: str = "openrouter",
+    log_path: str = "process.log",
+    prompt: Optional[str] = None,
+    progress_cb: Optional[Callable[[float, str], None]] = None,
+    extract_options: Optional[Dict[str, Any]] = None,
+    llm_cache: Optional[ResponseCache] = None,
+    text_layer: bool = True,
+    dpi: int = DEFAULT_DPI,
+    page_dpi: Optional[Dict[int, int]] = None,
+    refine_dpi: Optional[int] = None,
+    refine_conf: float = 0.5,
+    batch_size: int = 1,
+    layout: bool = True,
+    save: bool = True,
+    **ocr_kwargs: Any,
+) -> Dict[str, Any]:
+    """Parse ``pdf_path`` reusing the stored version in ``version_dir``.
+
+    Takes the options of :func:`document_parser.parse_document` (``workers``
+    is ignored: changed pages are recognised in-process in batches of
+    ``batch_size``).  Without a stored version every page and field is
+    computed.  With ``save`` the new version replaces the stored one.
+
+    Returns the :func:`~document_parser.parse_document` result; reused pages
+    carry ``info["reused_from"]`` (their stored page number) and no crops or
+    overlay.  ``recomputed`` lists the ``pages`` that were recognised, the
+    ``fields`` that were extracted again and ``reused`` pages as
+    ``{new: stored}``.
+    """
+    from llm.router import LLMRouter
+
+    prompt = prompt or BASE_PROMPT
+    all_fields = schema_fields(prompt)
+    ocr_kwargs.pop("use_llm", None)
+    ocr_kwargs.pop("workers", None)
+    ocr_kwargs.setdefault("render", "text")
+    page_dpi = page_dpi or {}
+    batch_size = max(1, batch_size)
+    params = _ocr_params(
+        {**ocr_kwargs, "text_layer": text_layer, "dpi": dpi, "page_dpi": page_dpi,
+         "refine_dpi": refine_dpi, "refine_conf": refine_conf, "layout": layout}
+    )
+
+    previous = load_version(version_dir)
+    if previous is not None and previous.get("ocr_params") != params:
+        previous = {**previous, "pages": []}  # blocks were recognised with other options
+    stats: Dict[str, Any] = {"text_layer_pages": 0, "ocr_pages": 0, "reused_pages": 0}
+
+    with open(log_path, "w", encoding="utf-8") as log_file, tracing.collect() as summary:
+        log_file.write(f"PDF: {pdf_path} (version store {version_dir})\n")
+        if progress_cb:
+            progress_cb(0.0, "Сравнение с предыдущей версией")
+
+        with tracing.span("document.parse"):
+            fingerprints = fingerprint_pages(pdf_path)
+            total_pages = len(fingerprints)
+            reused = match_pages(fingerprints, previous["pages"]) if previous else {}
+            stored = {entry["page"]: entry for entry in previous["pages"]} if previous else {}
+            changed = [p for p in range(1, total_pages + 1) if p not in reused]
+            log_file.write(f"Reused pages: {reused or '-'}; changed pages: {changed or '-'}\n")
+
+            pages: Dict[int, Dict[str, Any]] = {}
+            for new, old in reused.items():
+                pages[new] = _reused_page(version_dir, stored[old], new, total_pages)
+                stats["reused_pages"] += 1
+
+            with fitz.open(pdf_path) as doc:
+                for start in range(0, len(changed), batch_size):
+                    group = changed[start:start + batch_size]
+                    results = _ocr_pages(
+                        [doc[i - 1] for i in group],
+                        llm_backend,
+                        ocr_kwargs,
+                        text_layer=text_layer,
+                        dpis=[page_dpi.get(i, dpi) for i in group],
+                        refine_dpi=refine_dpi,
+                        refine_conf=refine_conf,
+                        batch_size=batch_size,
+                    )
+                    for page_index, (info, image_b64) in zip(group, results):
+                        pages[page_index] = _finish_page(page_index, total_pages, info, image_b64, layout)
+                        stats[f"{info['path']}_pages"] += 1
+                        log_file.write(f"Page {page_index}: {len(info.get('verified_lines', []))} lines ({info['path']})\n")
+                    if progress_cb:
+                        progress_cb((start + len(group)) / (len(changed) + 1), f"Обработка страниц {group}")
+
+                # Fields on unchanged pages are kept, the rest are extracted again
+                full = previous is None or previous.get("prompt") != _prompt_hash(prompt)
+                if full:
+                    fields: Dict[str, Any] = {}
+                    stale = list(all_fields)
+                    scope = list(range(1, total_pages + 1))
+                else:
+                    moved = {old: new for new, old in reused.items()}
+                    stale = stale_fields(previous["fields"], all_fields, moved)
+                    fields = {
+                        name: _renumber(previous["fields"][name], moved)
+                        for name in all_fields
+                        if name not in stale
+                    }
+                    # A stale field can only have changed if a changed page holds it
+                    scope = changed
+                    for name in stale:
+                        entry = previous["fields"].get(name)
+                        if is_filled(entry) and not location_pages(entry.get("location")):
+                            fields[name] = _renumber(entry, moved)  # kept unless a changed page supplies it
+                asked = stale if scope else []
+                if progress_cb and asked:
+                    progress_cb(len(changed) / (len(changed) + 1), "Извлечение полей LLM")
+
+                errors = []
+                if asked:
+                    llm = LLMRouter(backend=llm_backend, cache=llm_cache)
+                    llm_pages = []
+                    for i in scope:
+                        page = pages[i]
+                        if page["image_b64"] is None:
+                            pix, pixels, _ = render_page(doc[i - 1], page_dpi.get(i, dpi))
+                            page["image_b64"] = pil_to_data_url(Image.fromarray(pixels))
+                        llm_pages.append({"page": i, "text": page["text"], "image_b64": page["image_b64"]})
+                    part = None if len(scope) == total_pages else scope
+                    with tracing.span("llm.extract", pages=len(llm_pages), fields=len(asked)):
+                        partial = llm.extract_fields(
+                            llm_pages, _fields_prompt(prompt, part, asked, all_fields), **(extract_options or {})
+                        )
+                    if "error" in partial:
+                        errors.append(str(partial["error"]))
+                    for name in asked:
+                        entry = partial.get(name)
+                        if is_filled(entry):
+                            fields[name] = entry
+
+        ordered = [pages[i] for i in range(1, total_pages + 1)]
+        result_fields = {name: fields.get(name) or {"value": "", "location": ""} for name in all_fields}
+        if errors:
+            result_fields["error"] = "; ".join(errors)
+        if save:
+            with tracing.span("version.save", pages=total_pages):
+                save_version(version_dir, pdf_path, fingerprints, ordered, result_fields, prompt, params)
+        trace = summary.as_dict()
+
+        log_file.write(
+            f"Pages: {stats['reused_pages']} reused, {stats['text_layer_pages']} from text layer, "
+            f"{stats['ocr_pages']} OCR; fields recomputed: {', '.join(asked) or '-'}\n"
+        )
+        for name, stage in trace.items():
+            log_file.write(f"Stage {name}: {stage['count']}x, {stage['seconds']:.3f}s\n")
+        if progress_cb:
+            progress_cb(1.0, "Готово")
+
+    return {
+        "pages": [{"page": p["page"], "info": p["info"]} for p in ordered],
+        "fields": result_fields,
+        "stats": stats,
+        "trace": trace,
+        "recomputed": {"pages": changed, "fields": asked, "reused": reused},
+    }
+
+
+__all__ = [
+    "MANIFEST",
+    "page_fingerprint",
+    "fingerprint_pages",
+    "load_version",
+    "match_pages",
+    "stale_fields",
+    "save_version",
+    "parse_revision",
+]
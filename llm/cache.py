@@ -0,0 +1,72 @@
+# llm/cache.py
+"""
+Дисковый кэш ответов LLM для LLMRouter.
+
+Ключ — хэш от бэкенда, модели, метода, промпта и содержимого (текст и хэши
+изображений), поэтому повторяющиеся кропы (колонтитулы, печати) и повторные
+запуски извлечения с тем же промптом не стоят ни времени, ни денег.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from disk_cache import DiskLRUCache
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ocr-mvp", "llm")
+
+
+def content_hash(data: str) -> str:
+    """Короткий хэш для больших строк (data URL изображений)."""
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(DiskLRUCache):
+    """
+    JSON-файлы в каталоге, срок жизни ttl секунд, не более max_bytes на диске
+    (вытесняются давно не использованные записи, см. disk_cache.py). Ответы с "error" не кэшируются.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        super().__init__(directory or os.environ.get("LLM_CACHE_DIR", DEFAULT_CACHE_DIR), max_bytes)
+        self.ttl = ttl
+        self.expired = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        if self.ttl is not None and time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            self._count("expired")
+            self._count("misses")
+            return None
+        self._touch(path)
+        self._count("hits")
+        return entry.get("value")
+
+    def put(self, key: str, value: Any) -> None:
+        if isinstance(value, dict) and "error" in value:
+            return
+        entry = {"created": time.time(), "value": value}
+        self._write(key, lambda f: json.dump(entry, f, ensure_ascii=False))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "expired": self.expired}
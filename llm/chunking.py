@@ -0,0 +1,176 @@
+# llm/chunking.py
+"""
+Разбиение документа на чанки с бюджетом токенов/байтов для извлечения полей
+(map-reduce) и слияние частичных результатов.
+"""
+import base64
+import io
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Грубая оценка: кириллица в BPE-токенизаторах занимает ~3 символа на токен
+CHARS_PER_TOKEN = 3
+
+_FIELD_RE = re.compile(r'"([^"]+)":\s*\{\s*"value"')
+# Ссылка на страницу в location поля: "страница 2", "стр. 3"
+PAGE_REF_RE = re.compile(r"(страниц\w*|стр\.)\s*(\d+)", re.IGNORECASE)
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Оценка стоимости изображения в токенах (схема detail=high у OpenAI)."""
+    if width <= 0 or height <= 0:
+        return 0
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def _png_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    return None
+
+
+def prepare_image(
+    data_url: str,
+    image_mode: str = "png",
+    max_side: Optional[int] = None,
+    jpeg_quality: int = 80,
+) -> Tuple[str, Tuple[int, int]]:
+    """
+    Подготовка изображения страницы к отправке.
+    image_mode: "png" — как есть, "jpeg" — перекодировать в JPEG, "none" — без изображения.
+    max_side — уменьшить, чтобы большая сторона не превышала значение.
+    Возвращает (data_url, (ширина, высота)).
+    """
+    if image_mode == "none" or not data_url:
+        return "", (0, 0)
+    header, _, b64 = data_url.partition(",")
+    # Размер PNG лежит в первых 24 байтах (32 символа base64) — всю страницу не декодируем
+    size = _png_size(base64.b64decode(b64[:32]))
+    if image_mode == "png" and size and (not max_side or max(size) <= max_side):
+        return data_url, size
+
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side))
+    buf = io.BytesIO()
+    if image_mode == "jpeg":
+        img.save(buf, format="JPEG", quality=jpeg_quality, optimize=True)
+        mime = "image/jpeg"
+    else:
+        img.save(buf, format="PNG")
+        mime = "image/png"
+    url = f"data:{mime};base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"
+    return url, img.size
+
+
+def page_cost(page: Dict[str, Any]) -> Tuple[int, int]:
+    """Оценка (токены, байты) для подготовленной страницы."""
+    text = page.get("text", "")
+    url = page.get("image_b64", "")
+    tokens = len(text) // CHARS_PER_TOKEN + image_tokens(*page.get("image_size", (0, 0)))
+    return tokens, len(text.encode("utf-8")) + len(url)
+
+
+def plan_chunks(
+    pages: List[Dict[str, Any]],
+    max_tokens: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Жадная группировка страниц по порядку в чанки с бюджетом токенов и байтов."""
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    tokens = size = 0
+    for page in pages:
+        t, b = page_cost(page)
+        over = (max_tokens and tokens + t > max_tokens) or (max_bytes and size + b > max_bytes)
+        if current and over:
+            chunks.append(current)
+            current, tokens, size = [], 0, 0
+        current.append(page)
+        tokens += t
+        size += b
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def schema_fields(prompt: str) -> List[str]:
+    """Имена полей из JSON-схемы в промпте (например, BASE_PROMPT)."""
+    return _FIELD_RE.findall(prompt)
+
+
+def location_pages(location: Any) -> List[int]:
+    """Номера страниц, на которые ссылается location поля ("страница 2, п. 3.1")."""
+    return [int(m.group(2)) for m in PAGE_REF_RE.finditer(str(location or ""))]
+
+
+def part_prompt(prompt: str, pages: List[int]) -> str:
+    """Промпт для части документа из страниц pages (подряд идущие записываются диапазоном)."""
+    pages = sorted(pages)
+    if len(pages) > 2 and pages[-1] - pages[0] == len(pages) - 1:
+        listed = f"{pages[0]}–{pages[-1]}"
+    else:
+        listed = ", ".join(map(str, pages))
+    return (
+        f"{prompt}\n"
+        f"Это часть документа: страницы {listed}. "
+        "Если поле на этих страницах отсутствует, верни для него пустые value и location."
+    )
+
+
+def is_empty(value: Any) -> bool:
+    """Пустое значение поля: None, "", заглушка "..." или список из таких значений."""
+    if isinstance(value, (list, tuple)):
+        return all(is_empty(v) for v in value)
+    return value is None or str(value).strip() in ("", "...")
+
+
+def is_filled(entry: Any) -> bool:
+    """Поле ответа ({"value", "location"}) с непустым value."""
+    return isinstance(entry, dict) and not is_empty(entry.get("value"))
+
+
+def unite_lists(found: Dict[str, Any], entry: Dict[str, Any]) -> bool:
+    """
+    Дописывает в списочное поле found новые элементы entry (без дублей) и его location.
+    Возвращает False, если хотя бы одно из значений не список.
+    """
+    if not (isinstance(found.get("value"), list) and isinstance(entry.get("value"), list)):
+        return False
+    extra = [v for v in entry["value"] if v not in found["value"]]
+    if extra:
+        found["value"] = found["value"] + extra
+        found["location"] = f"{found.get('location', '')}; {entry.get('location', '')}"
+    return True
+
+
+def merge_partials(partials: List[Dict[str, Any]], fields: List[str]) -> Dict[str, Any]:
+    """
+    Слияние частичных результатов чанков (в порядке страниц).
+    Для строковых полей берётся первое непустое значение, списки объединяются без дублей.
+    """
+    merged: Dict[str, Any] = {}
+    errors = [p["error"] for p in partials if "error" in p]
+    for name in fields or [k for p in partials for k in p if k != "error"]:
+        if name in merged:
+            continue
+        found: Optional[Dict[str, Any]] = None
+        for part in partials:
+            entry = part.get(name)
+            if not is_filled(entry):
+                continue
+            if found is None:
+                found = dict(entry)
+            elif not unite_lists(found, entry):
+                break
+        merged[name] = found or {"value": "", "location": ""}
+    if errors:
+        merged["error"] = "; ".join(errors)
+    return merged
@@ -1,15 +1,202 @@
 # llm/local_llm.py
-class LocalLLM:
+"""
+Бэкенд для локального OpenAI-совместимого сервера (llama.cpp server, vLLM, Ollama).
+
+Запросы идут через общий транспорт (llm/transport.py): пул соединений, повторы, таймауты.
+Сверх OpenRouterLLM:
+- одновременные verify_text (например, из потоков verify_crops) собираются за короткое
+  окно в один запрос verify_batch — сервер получает меньше, но более крупных запросов;
+- extract_fields читает ответ потоком и прекращает генерацию, как только получен
+  полный JSON-объект, не дожидаясь хвостовых пояснений модели.
+
+Адрес по умолчанию берётся из LOCAL_LLM_BASE_URL (иначе http://localhost:8080/v1),
+модель — из LOCAL_LLM_MODEL, ключ — из LOCAL_LLM_API_KEY (большинству серверов не нужен).
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .openrouter_llm import EXTRACT_SYSTEM, OpenRouterLLM
+
+LOCAL_LLM_BASE_URL = "http://localhost:8080/v1"
+
+
+class JsonObjectScanner:
     """
-    Заглушка для локальной LLM.
-    В будущем можно подключить Ollama, llama.cpp или vLLM.
+    Инкрементальный поиск первого полного JSON-объекта в потоке текста.
+    feed() возвращает текст объекта, как только закрывается его внешняя скобка.
     """
 
-    def __init__(self, **kwargs):
-        pass
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, delta: str) -> Optional[str]:
+        self.buffer += delta
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            self.pos += 1
+            if self.start == -1:
+                if ch == "{":
+                    self.start, self.depth = self.pos - 1, 1
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return self.buffer[self.start:self.pos]
+        return None
+
+
+class _VerifyBatcher:
+    """Собирает одновременные запросы проверки в пакеты по max_batch за окно window секунд."""
+
+    def __init__(self, llm: "LocalLLM", max_batch: int, window: float):
+        self.llm = llm
+        self.max_batch = max_batch
+        self.window = window
+        self.queue: "queue.Queue[Tuple[str, str, Future]]" = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0}
+        self.stats_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="local-llm-verify", daemon=True)
+        self.thread.start()
+
+    def submit(self, image_b64: str, candidate_text: str) -> Future:
+        future: Future = Future()
+        self.queue.put((image_b64, candidate_text, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            with self.stats_lock:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+            items = [(image_b64, text) for image_b64, text, _ in batch]
+            try:
+                if len(items) == 1:
+                    results = [self.llm._verify_one(*items[0])]
+                else:
+                    results = self.llm.verify_batch(items)
+            except Exception as e:  # ответ нужен каждому ожидающему
+                results = [{"corrected": text, "confidence": 0.0, "error": str(e)} for _, text in items]
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+# (base_url, api_key, model, vision, batch_size, batch_window) -> пакетировщик
+_batchers: Dict[Tuple[str, str, str, bool, int, float], _VerifyBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+class LocalLLM(OpenRouterLLM):
+    """
+    Локальная LLM за OpenAI-совместимым API.
+    batch_size/batch_window — пакетирование одновременных verify_text (1 — без пакетов),
+    stream — потоковое извлечение полей с остановкой на первом полном JSON,
+    vision=False — не отправлять изображения (для текстовых моделей).
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        model: str = None,
+        api_key: str = None,
+        timeout: float = 120.0,
+        max_retries: int = 2,
+        rate_limit: float = None,
+        batch_size: int = 8,
+        batch_window: float = 0.02,
+        stream: bool = True,
+        vision: bool = None,
+    ):
+        base_url = base_url or os.environ.get("LOCAL_LLM_BASE_URL") or LOCAL_LLM_BASE_URL
+        super().__init__(
+            api_key=api_key or os.environ.get("LOCAL_LLM_API_KEY") or "local",
+            model=model or os.environ.get("LOCAL_LLM_MODEL") or "local-model",
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limit=rate_limit,
+        )
+        if vision is None:
+            vision = os.environ.get("LOCAL_LLM_VISION", "1").lower() not in ("0", "false", "no")
+        self.base_url = base_url
+        self.vision = vision
+        self.stream = stream
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+    def _messages(self, system: str, content: list):
+        if not self.vision:
+            content = [part for part in content if part.get("type") != "image_url"]
+        return super()._messages(system, content)
+
+    def _batcher(self) -> _VerifyBatcher:
+        # Роутер создаётся на каждую страницу, поэтому пакетировщик общий для экземпляров
+        # с одинаковыми сервером, ключом, моделью и настройками пакетирования
+        key = (self.base_url, self.api_key, self.model, self.vision, self.batch_size, self.batch_window)
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                batcher = _batchers[key] = _VerifyBatcher(self, self.batch_size, self.batch_window)
+        return batcher
+
+    def _verify_one(self, image_b64: str, candidate_text: str):
+        return super().verify_text(image_b64, candidate_text)
 
     def verify_text(self, image_b64: str, candidate_text: str):
-        return {"corrected": candidate_text, "confidence": 0.5, "note": "Local LLM not implemented"}
+        if self.batch_size <= 1:
+            return self._verify_one(image_b64, candidate_text)
+        return self._batcher().submit(image_b64, candidate_text).result()
+
+    def _stream_json(self, system: str, content: list) -> Dict[str, Any]:
+        """Читает ответ потоком и возвращает первый полный JSON-объект."""
+        scanner = JsonObjectScanner()
+        with self.transport.stream(model=self.model, messages=self._messages(system, content)) as deltas:
+            for delta in deltas:
+                text = scanner.feed(delta)
+                if text is not None:
+                    return json.loads(text)
+        raise ValueError("ответ модели не содержит полного JSON-объекта")
+
+    def _extract_once(self, pages, prompt: str):
+        if not self.stream:
+            return super()._extract_once(pages, prompt)
+        return self._stream_json(EXTRACT_SYSTEM, self._extract_content(pages, prompt))
+
 
-    def extract_fields(self, pages, prompt: str):
-        return {"note": "Local LLM not implemented"}
+def verify_batch_stats() -> List[Dict[str, Any]]:
+    """Статистика пакетирования verify_text по каждому локальному серверу."""
+    out = []
+    with _batchers_lock:
+        for (url, _, model, _, batch_size, window), batcher in _batchers.items():
+            with batcher.stats_lock:
+                out.append(
+                    {"base_url": url, "model": model, "batch_size": batch_size, "window": window, **batcher.stats}
+                )
+    return out
@@ -0,0 +1,203 @@
+# llm/mock_server.py
+"""
+Локальный OpenAI-совместимый сервер-заглушка для разработки, тестов и бенчмарков.
+
+    python -m llm.mock_server --port 8765 --latency 0.2 --fail-every 5
+
+Отвечает на POST /v1/chat/completions детерминированными JSON-ответами:
+проверка OCR возвращает кандидата, извлечение полей — пустую схему из промпта.
+Умеет имитировать задержку и временные ошибки (429/503) для проверки повторов.
+Запросы с "stream": true получают ответ в формате SSE по кускам; --stream-tail
+добавляет после JSON «болтливый» хвост, который клиент может не дочитывать.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .chunking import schema_fields
+
+_CANDIDATE_RE = re.compile(r"Возможный кандидат: (.*)")
+
+
+def _texts(messages: List[Dict[str, Any]]) -> List[str]:
+    out = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            out.append(content)
+        elif isinstance(content, list):
+            out.extend(part.get("text", "") for part in content if part.get("type") == "text")
+    return out
+
+
+def mock_reply(body: Dict[str, Any]) -> str:
+    """Содержимое ответа ассистента для запроса body."""
+    texts = _texts(body.get("messages", []))
+    joined = "\n".join(texts)
+    if "OCR verifier" in joined:
+        candidates = [m.group(1) for t in texts for m in [_CANDIDATE_RE.search(t)] if m]
+        if '"results"' in joined:
+            results = [
+                {"index": i, "corrected": c, "confidence": 0.9}
+                for i, c in enumerate(candidates, 1)
+            ]
+            return json.dumps({"results": results}, ensure_ascii=False)
+        return json.dumps({"corrected": candidates[0] if candidates else "", "confidence": 0.9}, ensure_ascii=False)
+    fields = schema_fields(joined)
+    return json.dumps({name: {"value": "", "location": ""} for name in fields}, ensure_ascii=False)
+
+
+class MockState:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        fail_every: int = 0,
+        fail_status: int = 503,
+        chunk_size: int = 16,
+        chunk_delay: float = 0.0,
+        stream_tail: int = 0,
+    ):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.stream_tail = stream_tail
+        self.requests = 0
+        self.batched_items = 0
+        self.streams_aborted = 0
+        self.lock = threading.Lock()
+
+
+def _make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: Any) -> None:  # тихий режим
+            pass
+
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, n: int, model: str, content: str) -> None:
+            """Ответ в формате SSE: content кусками по chunk_size, затем хвост и [DONE]."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            tail = " Пояснение модели." * state.stream_tail
+            pieces = [content[i:i + state.chunk_size] for i in range(0, len(content), state.chunk_size)]
+            pieces += [tail[i:i + state.chunk_size] for i in range(0, len(tail), state.chunk_size)]
+            try:
+                for piece in pieces:
+                    chunk = {
+                        "id": f"mock-{n}",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if state.chunk_delay:
+                        time.sleep(state.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):  # клиент дочитал JSON и закрыл поток
+                with state.lock:
+                    state.streams_aborted += 1
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            with state.lock:
+                state.requests += 1
+                n = state.requests
+            if state.latency:
+                time.sleep(state.latency)
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            if state.fail_every and n % state.fail_every == 0:
+                self._send(state.fail_status, {"error": {"message": "mock transient failure"}})
+                return
+            content = mock_reply(body)
+            if '"results"' in content:
+                with state.lock:
+                    state.batched_items += len(json.loads(content)["results"])
+            if body.get("stream"):
+                self._stream(n, body.get("model", "mock"), content)
+                return
+            self._send(
+                200,
+                {
+                    "id": f"mock-{n}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                },
+            )
+
+    return Handler
+
+
+def start_mock_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency: float = 0.0,
+    fail_every: int = 0,
+    fail_status: int = 503,
+    chunk_size: int = 16,
+    chunk_delay: float = 0.0,
+    stream_tail: int = 0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Запустить сервер в фоновом потоке. Возвращает (server, base_url)."""
+    state = MockState(latency, fail_every, fail_status, chunk_size, chunk_delay, stream_tail)
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.state = state  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per request, seconds")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every N-th request")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--chunk-size", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Delay between streamed chunks, seconds")
+    parser.add_argument("--stream-tail", type=int, default=0, help="Filler sentences streamed after the JSON")
+    args = parser.parse_args(argv)
+
+    state = MockState(
+        args.latency, args.fail_every, args.fail_status, args.chunk_size, args.chunk_delay, args.stream_tail
+    )
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(state))
+    print(f"Mock LLM server: http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,63 @@
 # llm/openrouter_llm.py
 import json
-from openai import OpenAI
-from config import OPENROUTER_API_KEY, OPENROUTER_MODEL
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+from .chunking import merge_partials, part_prompt, plan_chunks, prepare_image, schema_fields
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+EXTRACT_SYSTEM = "You are a contract parser. JSON only."
 
 class OpenRouterLLM:
     """
     Обертка для OpenRouter API (через openai клиент).
     """
 
-    def __init__(self, api_key: str = None, model: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = None,
+        base_url: str = None,
+        timeout: float = 60.0,
+        max_retries: int = 4,
+        rate_limit: float = None,
+    ):
+        # config и клиент openai/httpx (transport) грузятся только при создании бэкенда
+        from config import OPENROUTER_API_KEY, OPENROUTER_MODEL
+        from .transport import get_transport
+
         self.api_key = api_key or OPENROUTER_API_KEY
         if not self.api_key:
             raise ValueError("❌ API-ключ OpenRouter не найден! Установи его в config.py или через переменную окружения.")
 
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.api_key,
+        # Транспорт общий для всех экземпляров с тем же ключом: пул соединений,
+        # лимит частоты и повтор временных ошибок (429/5xx) — см. llm/transport.py
+        self.transport = get_transport(
+            base_url or OPENROUTER_BASE_URL,
+            self.api_key,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limit=rate_limit,
         )
+        self.client = self.transport.client
         self.model = model or OPENROUTER_MODEL
 
+    def _messages(self, system: str, content: list):
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": content},
+        ]
+
+    def _complete_json(self, system: str, content: list):
+        """Один запрос к чату; возвращает JSON-объект из ответа модели."""
+        resp = self.transport.chat(model=self.model, messages=self._messages(system, content))
+
+        txt = resp.choices[0].message.content.strip()
+        start, end = txt.find("{"), txt.rfind("}")
+        if start != -1 and end != -1:
+            txt = txt[start:end+1]
+
+        return json.loads(txt)
+
     def verify_text(self, image_b64: str, candidate_text: str):
         try:
             content = [
@@ -33,46 +72,97 @@ class OpenRouterLLM:
                 },
                 {"type": "image_url", "image_url": {"url": image_b64}},
             ]
+            return self._complete_json("You are a precise OCR verifier. JSON only.", content)
+        except Exception as e:
+            return {"corrected": candidate_text, "confidence": 0.0, "error": str(e)}
 
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a precise OCR verifier. JSON only."},
-                    {"role": "user", "content": content},
-                ],
-            )
-
-            txt = resp.choices[0].message.content.strip()
-            start, end = txt.find("{"), txt.rfind("}")
-            if start != -1 and end != -1:
-                txt = txt[start:end+1]
+    def verify_batch(self, items):
+        """Проверка нескольких кропов одним запросом; ответы в порядке items."""
+        try:
+            content = [
+                {
+                    "type": "text",
+                    "text": (
+                        "Ты — помощник OCR. Ниже пронумерованные фрагменты изображения "
+                        "с распознанным текстом на русском языке. Проверь и исправь каждый. "
+                        "Верни строго JSON:\n"
+                        '{"results": [{"index": <номер>, "corrected": "<только сам исправленный текст>", '
+                        '"confidence": <0..1>}, ...]}.'
+                    ),
+                },
+            ]
+            for num, (image_b64, candidate_text) in enumerate(items, 1):
+                content.append({"type": "text", "text": f"Фрагмент {num}. Возможный кандидат: {candidate_text}"})
+                content.append({"type": "image_url", "image_url": {"url": image_b64}})
 
-            return json.loads(txt)
+            data = self._complete_json("You are a precise OCR verifier. JSON only.", content)
+            by_index = {int(r.get("index", 0)): r for r in data.get("results", [])}
         except Exception as e:
-            return {"corrected": candidate_text, "confidence": 0.0, "error": str(e)}
+            return [
+                {"corrected": text, "confidence": 0.0, "error": str(e)}
+                for _, text in items
+            ]
 
-    def extract_fields(self, pages, prompt: str):
+        out = []
+        for num, (_, candidate_text) in enumerate(items, 1):
+            r = by_index.get(num)
+            if r is None:
+                out.append({"corrected": candidate_text, "confidence": 0.0, "error": "missing in batch response"})
+            else:
+                out.append({"corrected": r.get("corrected", ""), "confidence": r.get("confidence", 0.0)})
+        return out
+
+    def _extract_content(self, pages, prompt: str):
+        content = [{"type": "text", "text": prompt}]
+        for page in pages:
+            num = page.get("page", 0)
+            content.append({"type": "text", "text": f"Страница {num}"})
+            if page.get("image_b64"):
+                content.append({"type": "image_url", "image_url": {"url": page["image_b64"]}})
+            content.append({"type": "text", "text": page.get("text", "")})
+        return content
+
+    def _extract_once(self, pages, prompt: str):
+        return self._complete_json(EXTRACT_SYSTEM, self._extract_content(pages, prompt))
+
+    def extract_fields(
+        self,
+        pages,
+        prompt: str,
+        chunk_tokens: int = None,
+        chunk_bytes: int = None,
+        image_mode: str = "png",
+        image_max_side: int = None,
+        max_workers: int = 4,
+    ):
+        """
+        Извлечение полей договора.
+        Без chunk_tokens/chunk_bytes все страницы уходят одним запросом.
+        Иначе страницы группируются в чанки с бюджетом токенов/байтов, чанки
+        обрабатываются параллельно, а частичные ответы сливаются по схеме из промпта.
+        image_mode ("png" | "jpeg" | "none") и image_max_side уменьшают объём запроса.
+        """
         try:
-            content = [{"type": "text", "text": prompt}]
+            prepared = []
             for page in pages:
-                num = page.get("page", 0)
-                content.append({"type": "text", "text": f"Страница {num}"})
-                content.append({"type": "image_url", "image_url": {"url": page.get("image_b64", "")}})
-                content.append({"type": "text", "text": page.get("text", "")})
-
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a contract parser. JSON only."},
-                    {"role": "user", "content": content},
-                ],
-            )
-
-            txt = resp.choices[0].message.content.strip()
-            start, end = txt.find("{"), txt.rfind("}")
-            if start != -1 and end != -1:
-                txt = txt[start:end+1]
-
-            return json.loads(txt)
+                url, size = prepare_image(page.get("image_b64", ""), image_mode, image_max_side)
+                prepared.append({**page, "image_b64": url, "image_size": size})
+
+            chunks = plan_chunks(prepared, chunk_tokens, chunk_bytes)
+            if len(chunks) <= 1:
+                return self._extract_once(prepared, prompt)
+
+            @tracing.propagate
+            def run(chunk):
+                first, last = chunk[0].get("page", 0), chunk[-1].get("page", 0)
+                chunk_prompt = part_prompt(prompt, [page.get("page", 0) for page in chunk])
+                try:
+                    return self._extract_once(chunk, chunk_prompt)
+                except Exception as e:
+                    return {"error": f"страницы {first}–{last}: {e}"}
+
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+                partials = list(pool.map(run, chunks))
+            return merge_partials(partials, schema_fields(prompt))
         except Exception as e:
             return {"error": str(e), "contract_number": "", "date": "", "parties": [], "amount": ""}
@@ -1,31 +1,102 @@
 # llm/router.py
-from typing import Dict, Any, List
-from .openrouter_llm import OpenRouterLLM
-from .local_llm import LocalLLM
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from .cache import ResponseCache, content_hash
 
 class LLMRouter:
     """
     Универсальный роутер для работы с LLM.
     Поддерживает разные бэкенды (локальные и облачные).
+    Бэкенд импортируется только при выборе (openai/httpx не грузятся заранее).
+    Если передан cache (ResponseCache), ответы verify_text/extract_fields
+    кэшируются по бэкенду, модели, промпту и хэшу содержимого.
     """
 
-    def __init__(self, backend: str = "openrouter", **kwargs):
+    def __init__(self, backend: str = "openrouter", cache: Optional[ResponseCache] = None, **kwargs):
         self.backend_name = backend.lower()
+        self.cache = cache
 
         if self.backend_name == "openrouter":
+            from .openrouter_llm import OpenRouterLLM
+
             self.backend = OpenRouterLLM(**kwargs)
         elif self.backend_name == "local":
+            from .local_llm import LocalLLM
+
             self.backend = LocalLLM(**kwargs)
         else:
             raise ValueError(f"Неизвестный backend LLM: {backend}")
 
+    def _key(self, method: str, *parts: Any) -> str:
+        model = getattr(self.backend, "model", None)
+        return ResponseCache.make_key(self.backend_name, model, method, *parts)
+
+    def _verify_key(self, image_b64: str, candidate_text: str) -> str:
+        return self._key("verify_text", candidate_text, content_hash(image_b64))
+
     def verify_text(self, image_b64: str, candidate_text: str) -> Dict[str, Any]:
         """
         Проверка OCR результата через выбранную LLM.
         Возвращает словарь {"corrected": str, "confidence": float}
         """
-        return self.backend.verify_text(image_b64, candidate_text)
+        if self.cache is None:
+            return self.backend.verify_text(image_b64, candidate_text)
+        key = self._verify_key(image_b64, candidate_text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        resp = self.backend.verify_text(image_b64, candidate_text)
+        self.cache.put(key, resp)
+        return resp
+
+    def verify_batch(self, items: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Проверка нескольких кропов одним запросом.
+        Принимает пары (image_b64, candidate_text), возвращает ответы в том же порядке.
+        Если бэкенд не поддерживает пакетную проверку — кропы проверяются по одному.
+        При включённом кэше в запрос уходят только отсутствующие в кэше кропы.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        keys: List[Optional[str]] = [None] * len(items)
+        if self.cache is not None:
+            for i, (image_b64, text) in enumerate(items):
+                keys[i] = self._verify_key(image_b64, text)
+                results[i] = self.cache.get(keys[i])
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            batch = [items[i] for i in missing]
+            if hasattr(self.backend, "verify_batch"):
+                fresh = self.backend.verify_batch(batch)
+            else:
+                fresh = [self.backend.verify_text(image_b64, text) for image_b64, text in batch]
+            for i, resp in zip(missing, fresh):
+                results[i] = resp
+                if self.cache is not None:
+                    self.cache.put(keys[i], resp)
+        return results
+
+    def extract_fields(self, pages: List[Dict[str, str]], prompt: str, **options: Any) -> Dict[str, Any]:
+        """
+        Выделение ключевых полей из документа.
+        options (chunk_tokens, chunk_bytes, image_mode, image_max_side, max_workers)
+        передаются бэкенду — см. OpenRouterLLM.extract_fields.
+        """
+        if self.cache is None:
+            return self.backend.extract_fields(pages, prompt, **options)
+        key = self._key(
+            "extract_fields",
+            prompt,
+            options,
+            [
+                (page.get("page"), content_hash(page.get("text", "")), content_hash(page.get("image_b64", "")))
+                for page in pages
+            ],
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        fields = self.backend.extract_fields(pages, prompt, **options)
+        self.cache.put(key, fields)
+        return fields
 
-    def extract_fields(self, pages: List[Dict[str, str]], prompt: str) -> Dict[str, Any]:
-        """Выделение ключевых полей из документа."""
-        return self.backend.extract_fields(pages, prompt)
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.cache.stats() if self.cache is not None else None
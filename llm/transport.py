@@ -0,0 +1,201 @@
+# llm/transport.py
+"""
+Общий HTTP-транспорт для OpenAI-совместимых бэкендов.
+
+Один пул соединений (keep-alive) на пару (base_url, api_key) на процесс,
+ограничитель частоты запросов (token bucket), повтор временных ошибок
+(429, 5xx, обрывы соединения) с экспоненциальной задержкой и jitter,
+таймаут на каждый вызов.
+"""
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+import openai
+from openai import OpenAI
+
+import tracing
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket: rate запросов в секунду, всплеск до capacity."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Забрать один токен, при необходимости подождав. Возвращает время ожидания."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):  # включая APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return False
+
+
+class Transport:
+    """
+    Клиент OpenAI с общим пулом соединений, лимитом частоты и повторами.
+    Экземпляры следует получать через get_transport(), чтобы они переиспользовались.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float = 60.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        rate_limit: Optional[float] = None,
+        max_connections: int = 32,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+        self.http = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        # Повторы выполняем сами, чтобы учитывать лимит частоты и jitter
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=self.http, max_retries=0)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Задержка перед повтором: Retry-After либо экспонента с полным jitter."""
+        hinted = _retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def chat(self, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """chat.completions.create с лимитом частоты, таймаутом и повторами."""
+        with tracing.span("llm.chat", model=kwargs.get("model")) as s:
+            if tracing.enabled():
+                s.set(bytes_sent=len(json.dumps(kwargs.get("messages", []), ensure_ascii=False).encode("utf-8")))
+            resp = self._chat(timeout, s, **kwargs)
+            usage = getattr(resp, "usage", None)
+            if usage is not None:
+                s.set(
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                    completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                )
+            return resp
+
+    def _chat(self, timeout: Optional[float], span: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                self._count("throttled_seconds", self.bucket.acquire())
+            self._count("requests")
+            span.set(attempts=attempt + 1)
+            try:
+                return self.client.chat.completions.create(timeout=timeout or self.timeout, **kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                time.sleep(self.backoff(attempt, e))
+                attempt += 1
+
+    @contextmanager
+    def stream(self, timeout: Optional[float] = None, **kwargs: Any) -> Iterator[Iterator[str]]:
+        """
+        Потоковый chat.completions (stream=True): отдаёт итератор фрагментов текста.
+        Повторы — только до начала ответа; при выходе из with поток закрывается,
+        так что прервать генерацию можно, просто перестав читать.
+        """
+        with tracing.span("llm.stream", model=kwargs.get("model")) as s:
+            if tracing.enabled():
+                s.set(bytes_sent=len(json.dumps(kwargs.get("messages", []), ensure_ascii=False).encode("utf-8")))
+            response = self._chat(timeout, s, stream=True, **kwargs)
+            try:
+                yield self._deltas(response, s)
+            finally:
+                response.close()
+
+    @staticmethod
+    def _deltas(response: Any, span: Any) -> Iterator[str]:
+        chunks = received = 0
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks += 1
+                received += len(delta)
+                span.set(chunks=chunks, chars_received=received)
+                yield delta
+
+    def close(self) -> None:
+        self.http.close()
+
+
+_transports: Dict[Tuple[str, str], Transport] = {}
+_lock = threading.Lock()
+
+
+def get_transport(base_url: str, api_key: str, **options: Any) -> Transport:
+    """
+    Общий транспорт для (base_url, api_key).
+    options применяются только при первом создании транспорта.
+    """
+    key = (base_url, api_key)
+    with _lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = Transport(base_url, api_key, **options)
+    return transport
+
+
+def close_transports() -> None:
+    """Закрыть все пулы соединений (например, при завершении сервиса)."""
+    with _lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
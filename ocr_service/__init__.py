@@ -0,0 +1,241 @@
+"""Local HTTP service exposing OCR and document parsing with warm models.
+
+One long-lived process keeps EasyOCR readers resident and routes every
+recognition call (single images and document pages alike) through a
+micro-batcher, so concurrent clients share batched ``readtext`` calls instead
+of each loading and running their own models.  Documents parsed with
+``workers > 1`` recognise pages in worker processes, outside the batcher.
+
+Endpoints
+---------
+``POST /process_image``
+    Body: raw image bytes, or JSON ``{"image_b64": ..., **options}``.  Query
+    string parameters are passed to :func:`text_recognition.process_image`.
+``POST /parse_document``
+    Body: raw PDF bytes, or JSON ``{"pdf_b64": ..., "prompt": ..., **options}``.
+``GET /health``
+    Liveness, resident readers and current queue depth.
+``GET /metrics``
+    Request, rejection, latency and batching counters.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+import base64
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from PIL import Image
+
+from text_recognition import process_image, reader_stats, warm_up
+from text_recognition.readers import QueueFullError, enable_batching
+from text_recognition.utils import load_image, np_convert
+
+# Query/JSON options that must be parsed as numbers or booleans
+_FLOAT_OPTIONS = {"conf_min", "llm_check_max", "llm_timeout", "refine_conf", "min_confidence"}
+_INT_OPTIONS = {"label_max_chars", "font_size", "llm_workers", "llm_batch_size", "dpi", "refine_dpi", "workers", "batch_size", "group_size", "detect_dpi"}
+_BOOL_OPTIONS = {"use_llm", "text_layer", "layout", "schedule"}
+
+
+def _coerce(options: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for key, value in options.items():
+        if key in _FLOAT_OPTIONS:
+            value = float(value)
+        elif key in _INT_OPTIONS:
+            value = int(value)
+        elif key in _BOOL_OPTIONS and isinstance(value, str):
+            value = value.lower() in ("1", "true", "yes")
+        elif key == "languages" and isinstance(value, str):
+            value = value.split(",")
+        out[key] = value
+    return out
+
+
+class Metrics:
+    """Thread-safe counters and latency totals per endpoint."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.endpoints: Dict[str, Dict[str, float]] = {}
+
+    def observe(self, endpoint: str, status: int, seconds: float) -> None:
+        with self.lock:
+            m = self.endpoints.setdefault(
+                endpoint, {"requests": 0, "errors": 0, "rejected": 0, "seconds_total": 0.0, "seconds_max": 0.0}
+            )
+            m["requests"] += 1
+            m["seconds_total"] += seconds
+            m["seconds_max"] = max(m["seconds_max"], seconds)
+            if status == 503:
+                m["rejected"] += 1
+            elif status >= 400:
+                m["errors"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            endpoints = {
+                name: {**m, "seconds_avg": m["seconds_total"] / m["requests"] if m["requests"] else 0.0}
+                for name, m in self.endpoints.items()
+            }
+        return {"uptime_seconds": time.time() - self.started, "endpoints": endpoints}
+
+
+class OCRService:
+    """Request handling independent of the HTTP layer."""
+
+    def __init__(
+        self,
+        max_inflight: int = 16,
+        max_documents: int = 2,
+        max_batch: int = 8,
+        batch_window: float = 0.02,
+        max_queue: int = 64,
+        llm_backend: str = "openrouter",
+    ) -> None:
+        self.batcher = enable_batching(max_batch=max_batch, window=batch_window, max_queue=max_queue)
+        self.inflight = threading.BoundedSemaphore(max_inflight)
+        self.documents = threading.BoundedSemaphore(max_documents)
+        self.llm_backend = llm_backend
+        self.metrics = Metrics()
+
+    def health(self) -> Dict[str, Any]:
+        return {"status": "ok", "readers": reader_stats(), "queue_depth": self.batcher.depth()}
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {**self.metrics.snapshot(), "batcher": dict(self.batcher.stats), "queue_depth": self.batcher.depth()}
+
+    def process_image(self, body: bytes, options: Dict[str, Any]) -> Dict[str, Any]:
+        if "image_b64" in options:
+            data = options.pop("image_b64")
+            body = base64.b64decode(data.split(",", 1)[-1])
+        pixels = load_image(Image.open(io.BytesIO(body)))
+        options.setdefault("render", "text")
+        options.setdefault("llm_backend", self.llm_backend)
+        info = process_image(pixels, **_coerce(options))
+        info.pop("overlay", None)
+        return info
+
+    def parse_document(self, body: bytes, options: Dict[str, Any]) -> Dict[str, Any]:
+        from document_parser import parse_document
+
+        if "pdf_b64" in options:
+            body = base64.b64decode(options.pop("pdf_b64"))
+        if not self.documents.acquire(blocking=False):
+            raise QueueFullError("too many documents in progress")
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            options.setdefault("render", "text")
+            options.setdefault("llm_backend", self.llm_backend)
+            result = parse_document(pdf_path, log_path=os.devnull, **_coerce(options))
+        finally:
+            os.unlink(pdf_path)
+            self.documents.release()
+        return {
+            "fields": result["fields"],
+            "stats": result.get("stats", {}),
+            "trace": result.get("trace", {}),
+            "pages": [
+                {"page": p["page"], "path": p["info"].get("path"), "verified_lines": p["info"]["verified_lines"]}
+                for p in result["pages"]
+            ],
+        }
+
+
+def _make_handler(service: OCRService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt: str, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(payload, ensure_ascii=False, default=np_convert).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            path = urlparse(self.path).path
+            if path == "/health":
+                self._send(200, service.health())
+            elif path == "/metrics":
+                self._send(200, service.metrics_snapshot())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _read(self) -> Tuple[bytes, Dict[str, Any]]:
+            url = urlparse(self.path)
+            options: Dict[str, Any] = dict(parse_qsl(url.query))
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                options.update(json.loads(body or b"{}"))
+                body = b""
+            return body, options
+
+        def do_POST(self) -> None:
+            path = urlparse(self.path).path
+            handlers = {"/process_image": service.process_image, "/parse_document": service.parse_document}
+            handler = handlers.get(path)
+            if handler is None:
+                self._send(404, {"error": "not found"})
+                return
+            start = time.perf_counter()
+            status = 200
+            body, options = self._read()
+            if not service.inflight.acquire(blocking=False):
+                status = 503
+                self._send(status, {"error": "server busy"}, {"Retry-After": "1"})
+            else:
+                try:
+                    self._send(status, handler(body, options))
+                except QueueFullError as e:
+                    status = 503
+                    self._send(status, {"error": str(e)}, {"Retry-After": "1"})
+                except SystemExit as e:  # process_image signals "no text found" this way
+                    status = 422
+                    self._send(status, {"error": str(e)})
+                except (ValueError, TypeError, OSError) as e:
+                    status = 400
+                    self._send(status, {"error": str(e)})
+                except Exception as e:
+                    status = 500
+                    self._send(status, {"error": str(e)})
+                finally:
+                    service.inflight.release()
+            service.metrics.observe(path, status, time.perf_counter() - start)
+
+    return Handler
+
+
+def create_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    warm: bool = True,
+    languages: Optional[list] = None,
+    gpu: bool = False,
+    **service_options: Any,
+) -> ThreadingHTTPServer:
+    """Build the HTTP server; readers are loaded up front when ``warm`` is set."""
+    if warm:
+        warm_up(languages, gpu)
+    service = OCRService(**service_options)
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    server.service = service  # type: ignore[attr-defined]
+    return server
+
+
+__all__ = ["create_server", "OCRService"]
@@ -0,0 +1,59 @@
+"""Command line entry point: ``python -m ocr_service``."""
+
+import argparse
+import sys
+from pathlib import Path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the local OCR/parse HTTP service")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--backend", default="openrouter", help="Default LLM backend name")
+    parser.add_argument(
+        "--languages",
+        default="ru,en",
+        help="Comma-separated EasyOCR language codes to keep warm",
+    )
+    parser.add_argument("--gpu", action="store_true", help="Run EasyOCR on GPU")
+    parser.add_argument("--max-batch", type=int, default=8, help="Images per shared recognition call")
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=0.02,
+        help="Seconds to wait for more requests before running a batch",
+    )
+    parser.add_argument("--max-queue", type=int, default=64, help="OCR queue depth limit")
+    parser.add_argument("--max-inflight", type=int, default=16, help="Concurrent request limit")
+    parser.add_argument("--max-documents", type=int, default=2, help="Concurrent parse_document limit")
+    args = parser.parse_args()
+
+    try:  # pragma: no cover - import shim for direct execution
+        from . import create_server
+    except ImportError:  # executed as a standalone script
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+        from ocr_service import create_server  # type: ignore
+
+    server = create_server(
+        host=args.host,
+        port=args.port,
+        languages=args.languages.split(","),
+        gpu=args.gpu,
+        max_inflight=args.max_inflight,
+        max_documents=args.max_documents,
+        max_batch=args.max_batch,
+        batch_window=args.batch_window,
+        max_queue=args.max_queue,
+        llm_backend=args.backend,
+    )
+    print(f"OCR service: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
+import base64
+import hashlib
 import io
 import os
 import tempfile
-from typing import Dict, Any
+from typing import Any, Dict, Iterator, List
 
-import pandas as pd
 import streamlit as st
+from PIL import Image
 
-from document_parser import parse_document, BASE_PROMPT
+from document_parser import BASE_PROMPT, extract_document_fields, iter_pages
+from llm.cache import ResponseCache
+from text_recognition import OCRCache, warm_up
+
+# Сколько последних результатов хранить в сессии
+MAX_CACHED_RESULTS = 4
 
 # Настройки страницы
 st.set_page_config(page_title="OCR Demo")
@@ -16,8 +23,85 @@ st.title("OCR-MVP Demo")
 uploaded = st.file_uploader("Загрузите PDF", type=["pdf"])
 prompt_text = st.text_area("Prompt", value=BASE_PROMPT, height=300)
 
+# Streamlit перезапускает скрипт при каждом действии (в том числе при скачивании Excel),
+# поэтому результаты хранятся в сессии по хэшу файла и промпта и не пересчитываются
+results: Dict[str, Dict[str, Any]] = st.session_state.setdefault("results", {})
+result_key = None
+if uploaded:
+    digest = hashlib.sha256(uploaded.getvalue())
+    digest.update(prompt_text.encode("utf-8"))
+    result_key = digest.hexdigest()
+
+
+@st.cache_resource(show_spinner="Загрузка модели OCR...")
+def load_ocr_model() -> float:
+    # Модель EasyOCR загружается один раз на процесс и только для документов, где нужен OCR
+    return warm_up()
+
+
+def needs_ocr(pdf_path: str) -> bool:
+    """Есть ли в PDF страницы без текстового слоя (их распознаёт EasyOCR)."""
+    import fitz
+
+    from document_parser.text_layer import has_text_layer, text_layer_lines
+
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            lines = text_layer_lines(page, page.rotation_matrix)
+            if not (lines and has_text_layer(page, lines)):
+                return True
+    return False
+
+
+def page_record(page: Dict[str, Any]) -> Dict[str, Any]:
+    """Компактная копия страницы для показа: оверлей в JPEG и рамки блоков с текстом."""
+    info = page["info"]
+    buf = io.BytesIO()
+    info["overlay"].save(buf, format="JPEG", quality=85)
+    blocks = info["blocks"]
+    return {
+        "page": page["page"],
+        "path": page["path"],
+        "overlay": buf.getvalue(),
+        "image_b64": page["image_b64"],
+        "blocks": [(blocks.bbox(pos), blocks.final_text[pos]) for pos in range(len(blocks))],
+    }
+
+
+def show_page(page: Dict[str, Any]) -> None:
+    path = "текстовый слой" if page["path"] == "text_layer" else "OCR"
+    st.image(page["overlay"], caption=f"Страница {page['page']} ({path})")
+    # Кропы вырезаются только по запросу из изображения страницы, которое и так хранится для LLM
+    if st.checkbox(f"Блоки страницы {page['page']}", key=f"blocks-{page['page']}"):
+        image = Image.open(io.BytesIO(base64.b64decode(page["image_b64"].split(",", 1)[-1])))
+        for bbox, text in page["blocks"]:
+            st.image(image.crop(bbox), caption=text)
+
+
+def show_fields(fields: Dict[str, Any]) -> None:
+    import pandas as pd
+
+    st.subheader("Распознанные поля")
+    st.json(fields)
+
+    # Выгрузка в Excel
+    df = pd.DataFrame([
+        {"field": k, "value": v.get("value"), "location": v.get("location")}
+        for k, v in fields.items()
+        if isinstance(v, dict)
+    ])
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    st.download_button(
+        "Скачать как Excel",
+        data=buf.getvalue(),
+        file_name="fields.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
 # Запуск обработки
-if uploaded and st.button("Запустить"):
+if result_key and result_key not in results and st.button("Запустить"):
     st.info("⚠️ Обработка документа может занять некоторое время. Пожалуйста, дождитесь завершения.")
 
     # Временный файл
@@ -25,6 +109,9 @@ if uploaded and st.button("Запустить"):
         tmp.write(uploaded.getvalue())
         pdf_path = tmp.name
 
+    if needs_ocr(pdf_path):
+        load_ocr_model()
+
     progress_text = st.empty()
     progress_bar = st.progress(0)
 
@@ -33,38 +120,39 @@ if uploaded and st.button("Запустить"):
         progress_bar.progress(int(progress * 100))
         progress_text.text(desc)
 
+    # Поля выводятся над страницами, когда завершится извлечение
+    fields_area = st.container()
+
+    # OCR-страницы отображаются по мере готовности
+    st.subheader("OCR страницы")
+    shown: List[Dict[str, Any]] = []
+
+    def pages_stream() -> Iterator[Dict[str, Any]]:
+        # Оверлей нужен только для показа; после него info с копией страницы отпускается
+        for page in iter_pages(pdf_path, progress_cb=cb, cache=OCRCache(), render="lazy"):
+            shown.append(page_record(page))
+            show_page(shown[-1])
+            yield page
+        cb(0.99, "Извлечение полей LLM")
+
     # Запуск парсинга
-    result: Dict[str, Any] = parse_document(
-        pdf_path=pdf_path,
-        use_llm=False,
-        prompt=prompt_text,
-        progress_cb=cb,
-    )
+    fields = extract_document_fields(pages_stream(), prompt=prompt_text, llm_cache=ResponseCache())
+    cb(1.0, "Готово")
 
     os.unlink(pdf_path)
 
-    # Отображение результатов
-    st.subheader("Распознанные поля")
-    st.json(result["fields"])
+    results[result_key] = {"pages": shown, "fields": fields}
+    while len(results) > MAX_CACHED_RESULTS:
+        results.pop(next(iter(results)))
 
-    # Выгрузка в Excel
-    df = pd.DataFrame([
-        {"field": k, "value": v.get("value"), "location": v.get("location")}
-        for k, v in result["fields"].items()
-    ])
-    buf = io.BytesIO()
-    df.to_excel(buf, index=False)
-    st.download_button(
-        "Скачать как Excel",
-        data=buf.getvalue(),
-        file_name="fields.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    # Отображение результатов
+    with fields_area:
+        show_fields(fields)
 
-    # OCR-страницы
+elif result_key in results:
+    # Повторный запуск скрипта: показываем сохранённый результат без OCR и LLM
+    cached = results[result_key]
+    show_fields(cached["fields"])
     st.subheader("OCR страницы")
-    for page in result["pages"]:
-        st.image(page["info"]["overlay"], caption=f"Страница {page['page']}")
-        with st.expander(f"Блоки страницы {page['page']}"):
-            for block in page["info"]["blocks"]:
-                st.image(block["crop_data"], caption=block["final"]["text"])
+    for page in cached["pages"]:
+        show_page(page)
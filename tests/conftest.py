@@ -0,0 +1,19 @@
+import pytest
+
+from llm.mock_server import start_mock_server
+
+
+@pytest.fixture
+def mock_server():
+    """Start mock servers with the given options; all are shut down after the test."""
+    servers = []
+
+    def start(**options):
+        server, base_url = start_mock_server(**options)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
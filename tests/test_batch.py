@@ -0,0 +1,73 @@
+"""Batch runs: checkpoint, resume and per-document options."""
+
+import json
+import os
+
+import pytest
+
+import document_parser
+from document_parser.batch import CHECKPOINT_NAME, doc_id, run_batch
+
+
+@pytest.fixture
+def fake_parse(monkeypatch):
+    """parse_document stand-in that fails for paths listed in ``broken``."""
+    calls = []
+    broken = set()
+
+    def parse_document(pdf_path, log_path, **kwargs):
+        calls.append((pdf_path, kwargs))
+        if pdf_path in broken:
+            raise RuntimeError("damaged PDF")
+        return {
+            "fields": {"номер": {"value": "1", "location": "страница 1"}},
+            "stats": {},
+            "pages": [{"page": 1, "info": {"verified_lines": ["строка"]}}],
+        }
+
+    monkeypatch.setattr(document_parser, "parse_document", parse_document)
+    return calls, broken
+
+
+def _checkpoint(out):
+    with open(os.path.join(out, CHECKPOINT_NAME), encoding="utf-8") as f:
+        return json.load(f)["documents"]
+
+
+def test_resume_skips_finished_and_retries_failed(tmp_path, fake_parse):
+    calls, broken = fake_parse
+    inputs = [str(tmp_path / f"doc{i}.pdf") for i in range(3)]
+    out = str(tmp_path / "out")
+    broken.add(inputs[1])
+
+    summary = run_batch(inputs, out, jobs=2)
+    assert (summary["documents"], summary["failed"], summary["skipped"]) == (2, 1, 0)
+    statuses = {entry["path"]: entry["status"] for entry in _checkpoint(out).values()}
+    assert statuses == {inputs[0]: "ok", inputs[1]: "error", inputs[2]: "ok"}
+    assert os.path.exists(os.path.join(out, f"{doc_id(inputs[0])}.json"))
+    assert not os.path.exists(os.path.join(out, f"{doc_id(inputs[1])}.json"))
+
+    calls.clear()
+    broken.clear()
+    summary = run_batch(inputs, out, jobs=2)
+    assert [path for path, _ in calls] == [inputs[1]]
+    assert (summary["documents"], summary["failed"], summary["skipped"]) == (1, 0, 2)
+    assert all(entry["status"] == "ok" for entry in _checkpoint(out).values())
+
+    calls.clear()
+    run_batch(inputs, out, jobs=1, resume=False)
+    assert sorted(path for path, _ in calls) == sorted(inputs)
+
+
+def test_version_dir_is_per_document(tmp_path, fake_parse):
+    calls, _ = fake_parse
+    inputs = [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+    store = str(tmp_path / "versions")
+    run_batch(inputs, str(tmp_path / "out"), jobs=1, version_dir=store, schedule=True)
+    assert {kwargs["version_dir"] for _, kwargs in calls} == {os.path.join(store, doc_id(p)) for p in inputs}
+    assert all(kwargs["schedule"] for _, kwargs in calls)
+
+
+def test_process_pool_per_document_is_rejected(tmp_path, fake_parse):
+    with pytest.raises(ValueError):
+        run_batch([str(tmp_path / "a.pdf")], str(tmp_path / "out"), workers=2)
@@ -0,0 +1,30 @@
+"""Page image preparation for extraction requests."""
+
+import base64
+import io
+
+from PIL import Image
+
+from llm.chunking import prepare_image
+
+
+def _png_url(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buf, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def test_png_within_limit_is_passed_through_with_its_size():
+    url = _png_url(300, 120)
+    assert prepare_image(url, max_side=400) == (url, (300, 120))
+
+
+def test_large_png_is_downscaled():
+    url, size = prepare_image(_png_url(800, 200), max_side=400)
+    assert size == (400, 100)
+    assert url.startswith("data:image/png;base64,")
+
+
+def test_jpeg_mode_reencodes():
+    url, size = prepare_image(_png_url(50, 40), image_mode="jpeg")
+    assert url.startswith("data:image/jpeg;base64,") and size == (50, 40)
@@ -0,0 +1,70 @@
+"""Reading order of multi-column pages and paragraph splitting."""
+
+from text_recognition.layout import layout_text, reconstruct_layout
+from text_recognition.result import BlockTable
+
+LINE = 10  # box height in pixels
+PITCH = 14  # distance between line tops
+
+
+def _table(boxes):
+    """``boxes`` is a list of ``(x0, y0, x1, text)``; every box is one line high."""
+    return BlockTable(
+        index=list(range(1, len(boxes) + 1)),
+        coords=[[x0, y0, x1, y0, x1, y0 + LINE, x0, y0 + LINE] for x0, y0, x1, _ in boxes],
+        easy_text=[b[3] for b in boxes],
+        easy_conf=[0.9] * len(boxes),
+        final_text=[b[3] for b in boxes],
+        final_conf=[0.9] * len(boxes),
+        sources=["EASY"] * len(boxes),
+    )
+
+
+def _column(x0, x1, y0, prefix, lines=4):
+    return [(x0, y0 + i * PITCH, x1, f"{prefix} {i + 1}") for i in range(lines)]
+
+
+def test_two_columns_read_left_then_right():
+    # an 18 px gutter, 1.8 median line heights: narrower than the old 2.0 threshold
+    boxes = _column(208, 400, 0, "правая") + _column(0, 190, 0, "левая")
+    paragraphs = reconstruct_layout(_table(boxes))
+    assert [p.text for p in paragraphs] == [
+        "левая 1 левая 2 левая 3 левая 4",
+        "правая 1 правая 2 правая 3 правая 4",
+    ]
+    assert [p.column for p in paragraphs] == [0, 1]
+
+
+def test_title_and_footer_span_both_columns():
+    boxes = (
+        [(0, 200, 400, "Подписи сторон")]
+        + _column(208, 400, 40, "правая")
+        + _column(0, 190, 40, "левая")
+        + [(40, 0, 360, "ДОГОВОР ПОСТАВКИ № 15")]
+    )
+    paragraphs = reconstruct_layout(_table(boxes))
+    assert [p.text for p in paragraphs] == [
+        "ДОГОВОР ПОСТАВКИ № 15",
+        "левая 1 левая 2 левая 3 левая 4",
+        "правая 1 правая 2 правая 3 правая 4",
+        "Подписи сторон",
+    ]
+    assert paragraphs[0].column == paragraphs[-1].column == -1
+
+
+def test_clause_numbers_start_paragraphs():
+    lines = [
+        "1. Предмет договора",
+        "Продавец обязуется передать",
+        "товар Покупателю.",
+        "2. Цена",
+        "2.1) Цена указана в рублях",
+    ]
+    boxes = [(0, i * PITCH, 300, text) for i, text in enumerate(lines)]
+    paragraphs = reconstruct_layout(_table(boxes))
+    assert layout_text(paragraphs).splitlines() == [
+        "[1] 1. Предмет договора Продавец обязуется передать товар Покупателю.",
+        "[2] 2. Цена",
+        "[3] 2.1) Цена указана в рублях",
+    ]
+    assert paragraphs[0].blocks == [0, 1, 2]
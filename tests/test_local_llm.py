@@ -0,0 +1,79 @@
+"""LocalLLM verify batching, streaming early stop and the verify timeout fallback."""
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from llm.local_llm import LocalLLM, verify_batch_stats
+from text_recognition.verify import verify_crops
+
+IMAGE = "data:image/png;base64,AAAA"
+PROMPT = '{"contract_number": {"value": "...", "location": "..."}, "date": {"value": "...", "location": "..."}}'
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_concurrent_verify_is_batched(mock_server):
+    server, base_url = mock_server()
+    llm = LocalLLM(base_url=base_url, model="mock", batch_size=4, batch_window=0.5)
+    candidates = [f"строка {i}" for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda text: llm.verify_text(IMAGE, text), candidates))
+    assert [r["corrected"] for r in results] == candidates
+    assert server.state.requests == 1
+    assert server.state.batched_items == 4
+    stats = [s for s in verify_batch_stats() if s["base_url"] == base_url]
+    assert stats == [
+        {"base_url": base_url, "model": "mock", "batch_size": 4, "window": 0.5, "requests": 4, "batches": 1}
+    ]
+
+
+def test_batchers_are_keyed_by_batch_settings(mock_server):
+    _, base_url = mock_server()
+    small = LocalLLM(base_url=base_url, model="mock", batch_size=2, batch_window=0.01)
+    large = LocalLLM(base_url=base_url, model="mock", batch_size=8, batch_window=0.01)
+    assert small._batcher() is not large._batcher()
+    assert small._batcher().max_batch == 2
+    assert LocalLLM(base_url=base_url, model="mock", batch_size=2, batch_window=0.01)._batcher() is small._batcher()
+
+
+def test_stream_stops_after_first_json_object(mock_server):
+    server, base_url = mock_server(stream_tail=200, chunk_delay=0.005)
+    llm = LocalLLM(base_url=base_url, model="mock", stream=True)
+    start = time.monotonic()
+    fields = llm.extract_fields([{"page": 1, "text": "Договор № 1"}], PROMPT)
+    elapsed = time.monotonic() - start
+    assert set(fields) == {"contract_number", "date"}
+    assert _wait_for(lambda: server.state.streams_aborted == 1)
+    assert elapsed < 0.8  # reading the ~225 tail chunks would take over a second
+
+
+def test_verify_timeout_falls_back_to_candidate(mock_server):
+    _, base_url = mock_server(latency=2.0)
+    llm = LocalLLM(base_url=base_url, model="mock", max_retries=0, batch_size=1)
+    items = [(IMAGE, "первая"), (IMAGE, "вторая")]
+    start = time.monotonic()
+    results = verify_crops(llm, items, max_workers=2, timeout=0.2)
+    assert time.monotonic() - start < 1.5
+    assert [r["corrected"] for r in results] == ["первая", "вторая"]
+    assert all(r["confidence"] == 0.0 and r["error"] == "timeout" for r in results)
+
+
+def test_verify_does_not_block_when_every_slot_hangs():
+    class HangingLLM:
+        def verify_text(self, image_b64, candidate_text):
+            time.sleep(2.0)
+            return {"corrected": "поздно", "confidence": 1.0}
+
+    items = [(IMAGE, f"строка {i}") for i in range(3)]
+    start = time.monotonic()
+    results = verify_crops(HangingLLM(), items, max_workers=1, timeout=0.2)
+    assert time.monotonic() - start < 1.0
+    assert [r["corrected"] for r in results] == [text for _, text in items]
+    assert all(r["error"] == "timeout" for r in results)
@@ -0,0 +1,52 @@
+"""Image slicing of batched EasyOCR calls, with and without the micro-batcher (fake reader)."""
+
+import numpy as np
+import pytest
+
+from text_recognition import readers
+
+
+class FakeReader:
+    def __init__(self):
+        self.calls = []
+
+    def readtext(self, image, **kwargs):
+        self.calls.append((1, kwargs))
+        return [("box", "text", 1.0)]
+
+    def readtext_batched(self, images, **kwargs):
+        self.calls.append((len(images), kwargs))
+        return [[("box", "text", 1.0)] for _ in images]
+
+
+@pytest.fixture
+def fake_reader(monkeypatch):
+    reader = FakeReader()
+    entry = readers._Entry(reader, 0.0)
+    monkeypatch.setattr(readers, "_entry", lambda *a, **k: entry)
+    yield reader
+    readers.disable_batching()
+
+
+def _images(n):
+    return [np.zeros((8, 8, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def test_image_slices_do_not_set_the_crop_batch(fake_reader):
+    results = readers.readtext_batch(_images(5), max_images=2, detail=1)
+    assert len(results) == 5
+    assert [n for n, _ in fake_reader.calls] == [2, 2, 1]
+    assert all("batch_size" not in kwargs for _, kwargs in fake_reader.calls)
+
+
+def test_crop_batch_size_is_passed_through(fake_reader):
+    readers.readtext_batch(_images(3), max_images=4, batch_size=16)
+    assert fake_reader.calls == [(3, {"batch_size": 16})]
+
+
+def test_batcher_keeps_the_callers_crop_batch(fake_reader):
+    readers.enable_batching(max_batch=4, window=0.05)
+    results = readers.readtext_batch(_images(6), batch_size=32)
+    assert len(results) == 6
+    assert [n for n, _ in fake_reader.calls] == [4, 2]
+    assert all(kwargs == {"batch_size": 32} for _, kwargs in fake_reader.calls)
@@ -0,0 +1,59 @@
+"""Region-of-interest re-OCR on rotated pages."""
+
+import fitz
+import numpy as np
+import pytest
+
+from document_parser import refine
+from document_parser.raster import render_page
+from text_recognition.result import BlockTable
+
+
+def _dark_share(pixels):
+    return float((pixels[..., 0] < 128).mean())
+
+
+@pytest.fixture
+def fake_readtext(monkeypatch):
+    """readtext stand-in: reads "ТЕКСТ" from mostly dark crops, plus an empty detection."""
+    shares = []
+
+    def readtext(pixels, **kwargs):
+        shares.append(_dark_share(pixels))
+        box = [[0, 0], [1, 0], [1, 1], [0, 1]]
+        if shares[-1] < 0.5:
+            return [(box, "", 0.0)]
+        return [(box, "ТЕКСТ", 0.8), (box, " ", 0.0)]
+
+    monkeypatch.setattr(refine, "readtext", readtext)
+    return shares
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+def test_refine_clips_the_block_on_rotated_pages(fake_readtext, rotation):
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=500)
+    page.draw_rect(fitz.Rect(20, 30, 120, 60), fill=(0, 0, 0))
+    page.set_rotation(rotation)
+
+    _, pixels, zoom = render_page(page, 144)
+    ys, xs = np.nonzero(pixels[..., 0] < 128)
+    x0, y0, x1, y1 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+    blocks = BlockTable(
+        index=[1],
+        coords=[[x0, y0, x1, y0, x1, y1, x0, y1]],
+        easy_text=["TEKCT"],
+        easy_conf=[0.2],
+        final_text=["TEKCT"],
+        final_conf=[0.2],
+        sources=["EASY"],
+    )
+    info = {"blocks": blocks, "verified_lines": ["TEKCT"]}
+
+    improved = refine.refine_low_confidence(page, info, fitz.Matrix(zoom, zoom), refine_dpi=288)
+
+    assert fake_readtext[0] > 0.5  # the clip covers the block, not another part of the page
+    assert improved == 1
+    # the empty detection does not halve the confidence
+    assert blocks[0]["final"] == {"text": "ТЕКСТ", "confidence": 0.8, "source": "EASY"}
+    assert info["verified_lines"] == ["ТЕКСТ"]
@@ -0,0 +1,66 @@
+"""BlockTable columns: pending text edits, npz round trip and lazy crop keys."""
+
+import numpy as np
+
+from text_recognition.result import BlockTable, TextColumn
+
+
+def _table(**kwargs):
+    return BlockTable(
+        index=[1, 2, 3],
+        coords=[[0, 0, 10, 0, 10, 5, 0, 5], [0, 10, 20, 10, 20, 15, 0, 15], [5, 20, 9, 20, 9, 30, 5, 30]],
+        easy_text=["Договор", "№ 15", "от"],
+        easy_conf=[0.9, 0.4, 0.8],
+        final_text=["Договор", "№ 15", "от"],
+        final_conf=[0.9, 0.4, 0.8],
+        sources=["EASY", "EASY", "EASY"],
+        **kwargs,
+    )
+
+
+def test_text_column_repacks_pending_edits():
+    column = TextColumn(["а", "бб", "ввв"])
+    column.replace(1, "длинная правка")
+    column.replace(-1, "")
+    assert list(column) == ["а", "длинная правка", ""]
+    data, offsets = column.to_arrays()
+    assert column._edits == {}
+    assert list(TextColumn.from_arrays(data, offsets)) == ["а", "длинная правка", ""]
+
+
+def test_npz_round_trip_with_pending_edits(tmp_path):
+    table = _table()
+    table.set_final(1, "№ 15-А/2024", 0.97, "LLM")
+    table[2]["refined"] = True
+    table.llm[1] = {"corrected": "№ 15-А/2024", "confidence": 0.97}
+    assert table.final_text._edits  # not packed until saved
+
+    path = str(tmp_path / "blocks.npz")
+    table.save_npz(path)
+    loaded = BlockTable.load(path)
+
+    assert loaded.to_list() == table.to_list()
+    assert list(loaded.final_text) == ["Договор", "№ 15-А/2024", "от"]
+    assert loaded[1]["final"] == {"text": "№ 15-А/2024", "confidence": 0.97, "source": "LLM"}
+    assert np.array_equal(loaded.coords, table.coords)
+
+
+def test_lazy_crop_keys_match_membership():
+    built = []
+
+    def crop(image, bbox):
+        built.append(bbox)
+        return f"data:image/png;base64,{bbox}"
+
+    lazy = _table(image=object(), crop_func=crop)
+    view = lazy[0]
+    assert "crop_data" in view
+    assert "crop_data" in list(view) and len(view) == len(list(view))
+    assert built == []  # neither membership nor keys build the crop
+    assert all("crop_data" not in block for block in lazy.to_list())
+    assert view["crop_data"].startswith("data:image/png")
+    assert "crop_data" in lazy.to_list()[0]
+
+    plain = _table()
+    assert "crop_data" not in plain[0]
+    assert "crop_data" not in list(plain[0])
@@ -0,0 +1,96 @@
+"""Page priority and the early stop of scheduled parsing (text-layer PDF, stubbed LLM)."""
+
+import os
+
+import pytest
+
+import llm.router
+from benchmarks.synthetic import make_text_pdf
+from document_parser.scheduler import merge_fields, page_priority, parse_scheduled
+
+PROMPT = '{"номер": {"value": "...", "location": "..."}, "стороны": {"value": "...", "location": "..."}}'
+
+
+class FakeRouter:
+    """Fills every field from the first page of each group it is sent."""
+
+    calls = []
+
+    def __init__(self, backend="openrouter", cache=None, **kwargs):
+        pass
+
+    def extract_fields(self, pages, prompt, **options):
+        FakeRouter.calls.append([p["page"] for p in pages])
+        page = pages[0]["page"]
+        return {
+            "номер": {"value": f"№ {page}", "location": f"страница {page}"},
+            "стороны": {"value": ["..."], "location": ""},
+        }
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    FakeRouter.calls = []
+    monkeypatch.setattr(llm.router, "LLMRouter", FakeRouter)
+    return FakeRouter.calls
+
+
+def _survey(page, text_layer=True, hits=None, boxes=0, header=0.0):
+    return {"page": page, "text_layer": text_layer, "hits": hits or {}, "boxes": boxes, "header": header}
+
+
+def test_page_priority_order():
+    surveys = [
+        _survey(1),
+        _survey(2, hits={"номер": 2, "дата": 1}),
+        _survey(3, text_layer=False, boxes=0),
+        _survey(4, text_layer=False, boxes=12, header=0.2),
+        _survey(5),
+    ]
+    scores = {s["page"]: page_priority(s, len(surveys)) for s in surveys}
+    order = sorted(scores, key=lambda p: (-scores[p], p))
+    # keyword hits beat position, first page beats last, blank pages come last
+    assert order == [2, 1, 5, 4, 3]
+    assert scores[3] < 0
+
+
+def test_stops_once_fields_are_confident(tmp_path, fake_llm):
+    pdf = make_text_pdf(str(tmp_path / "doc.pdf"), pages=4, seed=0)
+    result = parse_scheduled(pdf, prompt=PROMPT, log_path=os.devnull, group_size=1, min_confidence=0.6)
+    # "стороны" only ever gets the placeholder, so it never counts as found
+    assert len(fake_llm) == 4
+
+    fake_llm.clear()
+    prompt = '{"номер": {"value": "...", "location": "..."}}'
+    result = parse_scheduled(pdf, prompt=prompt, log_path=os.devnull, group_size=1, min_confidence=0.6)
+    assert len(fake_llm) == 1
+    assert result["stats"]["stopped_early"]
+    assert result["stats"]["skipped_pages"] == 3
+    assert result["fields"]["номер"]["value"] == f"№ {fake_llm[0][0]}"
+
+
+def test_min_confidence_above_any_page_processes_everything(tmp_path, fake_llm):
+    pdf = make_text_pdf(str(tmp_path / "doc.pdf"), pages=3, seed=0)
+    prompt = '{"номер": {"value": "...", "location": "..."}}'
+    result = parse_scheduled(pdf, prompt=prompt, log_path=os.devnull, group_size=1, min_confidence=1.5)
+    assert len(fake_llm) == 3
+    assert not result["stats"]["stopped_early"]
+
+
+def test_workers_are_rejected(tmp_path, fake_llm):
+    pdf = make_text_pdf(str(tmp_path / "doc.pdf"), pages=2, seed=0)
+    with pytest.raises(ValueError):
+        parse_scheduled(pdf, prompt=PROMPT, log_path=os.devnull, workers=2)
+
+
+def test_merge_fields_prefers_confident_pages_and_unites_lists():
+    fields, confidence = {}, {}
+    merge_fields(fields, confidence, {"номер": {"value": "1", "location": "страница 2"}}, {2: 0.4})
+    assert merge_fields(fields, confidence, {"номер": {"value": "...", "location": "страница 3"}}, {3: 0.9}) == []
+    merge_fields(fields, confidence, {"номер": {"value": "7", "location": "страница 3"}}, {3: 0.9})
+    assert fields["номер"]["value"] == "7" and confidence["номер"] == 0.9
+
+    merge_fields(fields, confidence, {"стороны": {"value": ["А"], "location": "страница 1"}}, {1: 0.5})
+    changed = merge_fields(fields, confidence, {"стороны": {"value": ["А", "Б"], "location": "страница 4"}}, {4: 0.8})
+    assert changed == ["стороны"]
+    assert fields["стороны"]["value"] == ["А", "Б"] and confidence["стороны"] == 0.8
@@ -0,0 +1,62 @@
+"""Retries and backoff of llm.transport against the mock server."""
+
+import openai
+import pytest
+
+from llm.transport import Transport
+
+
+def _transport(base_url, **options):
+    options.setdefault("backoff_base", 0.01)
+    return Transport(base_url, "test", timeout=5.0, **options)
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_transient_error_is_retried(mock_server, status):
+    server, base_url = mock_server(fail_every=2, fail_status=status)
+    transport = _transport(base_url)
+    try:
+        for _ in range(2):  # the second call hits the failing request and is retried
+            resp = transport.chat(model="mock", messages=[{"role": "user", "content": "{}"}])
+            assert resp.choices[0].message.content
+    finally:
+        transport.close()
+    assert server.state.requests == 3
+    assert transport.stats["retries"] == 1
+    assert transport.stats["failures"] == 0
+
+
+def test_retries_are_bounded(mock_server):
+    server, base_url = mock_server(fail_every=1, fail_status=503)
+    transport = _transport(base_url, max_retries=2)
+    try:
+        with pytest.raises(openai.APIStatusError) as excinfo:
+            transport.chat(model="mock", messages=[{"role": "user", "content": "{}"}])
+    finally:
+        transport.close()
+    assert excinfo.value.status_code == 503
+    assert server.state.requests == 3
+    assert transport.stats["retries"] == 2
+    assert transport.stats["failures"] == 1
+
+
+def test_client_errors_are_not_retried(mock_server):
+    server, base_url = mock_server(fail_every=1, fail_status=400)
+    transport = _transport(base_url)
+    try:
+        with pytest.raises(openai.BadRequestError):
+            transport.chat(model="mock", messages=[{"role": "user", "content": "{}"}])
+    finally:
+        transport.close()
+    assert server.state.requests == 1
+    assert transport.stats["retries"] == 0
+
+
+def test_backoff_is_capped_exponential():
+    transport = Transport("http://127.0.0.1:9/v1", "test", backoff_base=0.5, backoff_max=3.0)
+    try:
+        error = RuntimeError("boom")  # no response, so no Retry-After hint
+        for attempt in range(6):
+            assert 0.0 <= transport.backoff(attempt, error) <= min(3.0, 0.5 * 2 ** attempt)
+    finally:
+        transport.close()
@@ -0,0 +1,179 @@
+"""Incremental re-parsing against a stored version (text-layer PDFs, stubbed LLM)."""
+
+import os
+
+import fitz
+import pytest
+
+import llm.router
+from benchmarks.synthetic import make_text_pdf
+from document_parser.versioning import (
+    MANIFEST,
+    _renumber,
+    load_version,
+    match_pages,
+    parse_revision,
+    stale_fields,
+)
+
+PROMPT = '{"номер": {"value": "...", "location": "..."}, "подписи": {"value": "...", "location": "..."}}'
+# Page of the base document each field is found on
+FIELD_PAGES = {"номер": 1, "подписи": 3}
+
+
+class FakeRouter:
+    """Answers each field from its page in FIELD_PAGES if that page was sent."""
+
+    calls = []
+
+    def __init__(self, backend="openrouter", cache=None, **kwargs):
+        pass
+
+    def extract_fields(self, pages, prompt, **options):
+        FakeRouter.calls.append([p["page"] for p in pages])
+        by_number = {p["page"]: p["text"] for p in pages}
+        out = {}
+        for name, page in FIELD_PAGES.items():
+            text = by_number.get(page)
+            if text:
+                out[name] = {"value": text[:20], "location": f"страница {page}"}
+            else:
+                out[name] = {"value": "", "location": ""}
+        return out
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    FakeRouter.calls = []
+    monkeypatch.setattr(llm.router, "LLMRouter", FakeRouter)
+    return FakeRouter.calls
+
+
+@pytest.fixture
+def base_pdf(tmp_path):
+    return make_text_pdf(str(tmp_path / "v1.pdf"), pages=4, seed=0)
+
+
+def _revise(base, path, edit):
+    with fitz.open(base) as doc:
+        edit(doc)
+        doc.save(path)
+    return path
+
+
+def _extra_page(tmp_path):
+    return make_text_pdf(str(tmp_path / "extra.pdf"), pages=1, seed=7)
+
+
+def _parse(pdf, tmp_path):
+    return parse_revision(pdf, str(tmp_path / "store"), prompt=PROMPT, log_path=os.devnull)
+
+
+def _stored_files(tmp_path):
+    store = tmp_path / "store"
+    manifest = load_version(str(store))
+    referenced = {entry["blocks"] for entry in manifest["pages"]}
+    on_disk = {name for name in os.listdir(store) if name != MANIFEST}
+    return referenced, on_disk
+
+
+def test_unchanged_rerun_reuses_everything(tmp_path, base_pdf, fake_llm):
+    first = _parse(base_pdf, tmp_path)
+    assert first["recomputed"]["pages"] == [1, 2, 3, 4]
+    assert fake_llm == [[1, 2, 3, 4]]
+
+    second = _parse(base_pdf, tmp_path)
+    assert second["recomputed"] == {"pages": [], "fields": [], "reused": {1: 1, 2: 2, 3: 3, 4: 4}}
+    assert fake_llm == [[1, 2, 3, 4]]  # no new extraction call
+    assert second["fields"] == first["fields"]
+    assert [p["info"]["verified_lines"] for p in second["pages"]] == [
+        p["info"]["verified_lines"] for p in first["pages"]
+    ]
+    referenced, on_disk = _stored_files(tmp_path)
+    assert referenced == on_disk and len(referenced) == 4
+
+
+def test_edited_page_is_recomputed_alone(tmp_path, base_pdf, fake_llm):
+    first = _parse(base_pdf, tmp_path)
+    extra = _extra_page(tmp_path)
+
+    def replace_page_3(doc):
+        with fitz.open(extra) as src:
+            doc.delete_page(2)
+            doc.insert_pdf(src, start_at=2)
+
+    revised = _revise(base_pdf, str(tmp_path / "v2.pdf"), replace_page_3)
+    second = _parse(revised, tmp_path)
+
+    assert second["recomputed"]["pages"] == [3]
+    assert second["recomputed"]["fields"] == ["подписи"]
+    assert fake_llm[-1] == [3]  # only the changed page is sent
+    assert second["fields"]["номер"] == first["fields"]["номер"]
+    assert second["fields"]["подписи"]["value"] != first["fields"]["подписи"]["value"]
+    referenced, on_disk = _stored_files(tmp_path)
+    assert referenced == on_disk and len(referenced) == 4
+
+
+def test_inserted_page_renumbers_reused_pages(tmp_path, base_pdf, fake_llm):
+    first = _parse(base_pdf, tmp_path)
+    extra = _extra_page(tmp_path)
+
+    def insert_front(doc):
+        with fitz.open(extra) as src:
+            doc.insert_pdf(src, start_at=0)
+
+    revised = _revise(base_pdf, str(tmp_path / "v2.pdf"), insert_front)
+    second = _parse(revised, tmp_path)
+
+    assert second["recomputed"]["pages"] == [1]
+    assert second["recomputed"]["reused"] == {2: 1, 3: 2, 4: 3, 5: 4}
+    assert second["recomputed"]["fields"] == []
+    assert len(fake_llm) == 1
+    assert second["fields"]["номер"] == {**first["fields"]["номер"], "location": "страница 2"}
+    assert second["fields"]["подписи"]["location"] == "страница 4"
+    assert [p["info"].get("reused_from") for p in second["pages"]] == [None, 1, 2, 3, 4]
+    assert second["pages"][1]["info"]["verified_lines"] == first["pages"][0]["info"]["verified_lines"]
+
+    third = _parse(revised, tmp_path)  # the renumbered version was stored
+    assert third["recomputed"]["pages"] == []
+    assert third["fields"] == second["fields"]
+
+
+def test_deleted_page_drops_its_fields(tmp_path, base_pdf, fake_llm):
+    first = _parse(base_pdf, tmp_path)
+    revised = _revise(base_pdf, str(tmp_path / "v2.pdf"), lambda doc: doc.delete_page(2))
+    second = _parse(revised, tmp_path)
+
+    assert second["recomputed"]["pages"] == []
+    assert second["recomputed"]["reused"] == {1: 1, 2: 2, 3: 4}
+    assert len(fake_llm) == 1  # nothing changed that could hold the stale field
+    assert second["fields"]["номер"] == first["fields"]["номер"]
+    assert second["fields"]["подписи"] == {"value": "", "location": ""}
+    referenced, on_disk = _stored_files(tmp_path)
+    assert referenced == on_disk and len(referenced) == 3
+
+
+def test_match_pages_finds_moved_pages():
+    previous = [
+        {"page": 1, "fingerprint": {"pixels": "a", "text": "x"}},
+        {"page": 2, "fingerprint": {"pixels": "b", "text": "y"}},
+    ]
+    fingerprints = [{"pixels": "c", "text": "z"}, {"pixels": "a", "text": "x"}, {"pixels": "b", "text": "changed"}]
+    assert match_pages(fingerprints, previous) == {2: 1}
+
+
+def test_stale_fields_treats_placeholders_as_empty():
+    previous = {
+        "kept": {"value": "12", "location": "страница 1"},
+        "moved_away": {"value": "A", "location": "страница 2"},
+        "placeholder": {"value": "...", "location": "страница 1"},
+        "empty_list": {"value": ["", ""], "location": "страница 1"},
+        "no_page": {"value": "B", "location": "преамбула"},
+    }
+    stale = stale_fields(previous, list(previous) + ["missing"], moved={1: 1})
+    assert stale == ["moved_away", "placeholder", "empty_list", "no_page", "missing"]
+
+
+def test_renumber_rewrites_every_page_reference():
+    entry = {"value": "x", "location": "страница 1, п. 2; стр. 3"}
+    assert _renumber(entry, {1: 2, 3: 5})["location"] == "страница 2, п. 2; стр. 5"
@@ -1,7 +1,41 @@
+from .cache import OCRCache
+from .result import BlockTable
+
+
 def process_image(*args, **kwargs):
     from .pipeline import process_image as _process_image
 
     return _process_image(*args, **kwargs)
 
 
-__all__ = ["process_image"]
+def process_images(*args, **kwargs):
+    from .pipeline import process_images as _process_images
+
+    return _process_images(*args, **kwargs)
+
+
+def build_result(*args, **kwargs):
+    from .pipeline import build_result as _build_result
+
+    return _build_result(*args, **kwargs)
+
+
+def warm_up(*args, **kwargs):
+    from .readers import warm_up as _warm_up
+
+    return _warm_up(*args, **kwargs)
+
+
+def release_readers(*args, **kwargs):
+    from .readers import release_readers as _release_readers
+
+    return _release_readers(*args, **kwargs)
+
+
+def reader_stats():
+    from .readers import reader_stats as _reader_stats
+
+    return _reader_stats()
+
+
+__all__ = ["OCRCache", "BlockTable", "process_image", "process_images", "build_result", "warm_up", "release_readers", "reader_stats"]
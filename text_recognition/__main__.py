@@ -19,10 +19,10 @@ from pathlib import Path
 from PIL import Image
 
 try:  # pragma: no cover - simple import shim
-    from . import process_image
+    from . import process_image, reader_stats
 except ImportError:  # running as a script
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-    from text_recognition import process_image  # type: ignore
+    from text_recognition import process_image, reader_stats  # type: ignore
 
 
 def main():
@@ -42,12 +42,30 @@ def main():
         default="openrouter",
         help="LLM backend name",
     )
+    parser.add_argument(
+        "--languages",
+        default="ru,en",
+        help="Comma-separated EasyOCR language codes",
+    )
+    parser.add_argument(
+        "--gpu",
+        action="store_true",
+        help="Run EasyOCR on GPU",
+    )
+    parser.add_argument(
+        "--text-only",
+        action="store_true",
+        help="Write only recognized text and blocks, skip overlay and crops",
+    )
     args = parser.parse_args()
 
     info = process_image(
         image_path=args.image,
         use_llm=False,
         llm_backend=args.backend,
+        languages=args.languages.split(","),
+        gpu=args.gpu,
+        render="text" if args.text_only else "full",
     )
 
     output_dir = args.output
@@ -56,29 +74,35 @@ def main():
     easy_txt = os.path.join(output_dir, "easy_results.txt")
     verified_txt = os.path.join(output_dir, "verified_results.txt")
     blocks_json = os.path.join(output_dir, "blocks.json")
+    blocks_npz = os.path.join(output_dir, "blocks.npz")
     crops_dir = os.path.join(output_dir, "crops")
-    os.makedirs(crops_dir, exist_ok=True)
 
-    info["overlay"].save(overlay_path)
     with open(easy_txt, "w", encoding="utf-8") as f:
         f.write("\n".join(info["easy_lines"]))
     with open(verified_txt, "w", encoding="utf-8") as f:
         f.write("\n".join(info["verified_lines"]))
     with open(blocks_json, "w", encoding="utf-8") as f:
-        json.dump(info["blocks"], f, ensure_ascii=False, indent=2)
+        json.dump(info["blocks"].to_list(), f, ensure_ascii=False, indent=2)
+    info["blocks"].save_npz(blocks_npz)
 
-    for block in info["blocks"]:
-        data = block["crop_data"].split(",", 1)[1]
-        Image.open(io.BytesIO(base64.b64decode(data))).save(
-            os.path.join(crops_dir, f"block_{block['index']}.png")
-        )
 
     print(f"✅ Принято {info['kept']} блоков")
-    print(f"🖼 Оверлей: {overlay_path}")
+    if not args.text_only:
+        os.makedirs(crops_dir, exist_ok=True)
+        info["overlay"].save(overlay_path)
+        for block in info["blocks"]:
+            data = block["crop_data"].split(",", 1)[1]
+            Image.open(io.BytesIO(base64.b64decode(data))).save(
+                os.path.join(crops_dir, f"block_{block['index']}.png")
+            )
+        print(f"🖼 Оверлей: {overlay_path}")
     print(f"📄 Easy (сырое): {easy_txt}")
     print(f"📄 Итог: {verified_txt}")
-    print(f"🧾 Лог блоков: {blocks_json}")
-    print(f"🖼 Кропы: {crops_dir}")
+    print(f"🧾 Лог блоков: {blocks_json} (бинарный: {blocks_npz})")
+    if not args.text_only:
+        print(f"🖼 Кропы: {crops_dir}")
+    for name, stats in reader_stats().items():
+        print(f"⏱ Загрузка модели {name}: {stats['load_seconds']:.2f} с")
 
 
 if __name__ == "__main__":
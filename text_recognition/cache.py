@@ -0,0 +1,59 @@
+"""Content-addressed on-disk cache for OCR results.
+
+Entries are keyed by a hash of the page pixels plus every parameter that
+affects recognition, so re-parsing an unchanged document (e.g. after editing
+only the extraction prompt) skips EasyOCR entirely.  The cache directory is
+bounded in size and evicts the least recently used entries first.
+"""
+
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import pickle
+
+from disk_cache import DiskLRUCache
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ocr-mvp", "ocr")
+
+
+class OCRCache(DiskLRUCache):
+    """Size-bounded LRU cache of :func:`text_recognition.process_image` results.
+
+    Hit and miss counters are kept per process.
+    """
+
+    SUFFIX = ".pkl"
+    # Version of the cached result shape, part of every key: bump it whenever
+    # the result dict changes (2: ``blocks`` is a BlockTable, not a list)
+    FORMAT = 2
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024) -> None:
+        super().__init__(directory or os.environ.get("OCR_CACHE_DIR", DEFAULT_CACHE_DIR), max_bytes)
+
+    @staticmethod
+    def make_key(pixels: Any, params: Dict[str, Any]) -> str:
+        """Hash the image array together with the OCR parameters."""
+        digest = hashlib.sha256()
+        digest.update(f"{pixels.shape}|{pixels.dtype}|".encode())
+        digest.update(memoryview(pixels if pixels.flags.c_contiguous else pixels.copy()).cast("B"))
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self._count("misses")
+            return None
+        self._touch(path)  # bump recency for LRU eviction
+        self._count("hits")
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self._write(key, lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL), binary=True)
+
+
+__all__ = ["OCRCache", "DEFAULT_CACHE_DIR"]
@@ -0,0 +1,174 @@
+"""Reading order, line and paragraph reconstruction for OCR blocks.
+
+EasyOCR returns boxes in detection order, which on multi-column pages or
+pages with stamps and marginalia is not the order a person reads them in.
+:func:`reconstruct_layout` restores that order in ``O(n log n)``:
+
+* columns are found from gutters in the horizontal projection of the boxes;
+  boxes that cross a gutter (titles, full-width clauses) split the page into
+  bands that are read before/after the columns they separate;
+* inside each column, boxes are swept top to bottom by their vertical centre
+  and merged into lines, then sorted left to right;
+* consecutive lines form paragraphs until a vertical gap, a first-line
+  indent or a clause number (``1.``, ``2.3)``, ``•``) starts a new one.
+
+Paragraphs are numbered per page; :func:`layout_text` renders them as
+``[N] text`` so extraction prompts can cite a paragraph by its number.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import re
+
+import numpy as np
+
+from .result import BlockTable
+
+# A line that starts a numbered clause or a bullet always opens a new paragraph
+_CLAUSE_START = re.compile(r"^\s*(?:\d+(?:\.\d+)*[.)]|[•\-–—]\s)")
+
+
+class Paragraph:
+    """An ordered run of lines; ``blocks`` are positions in the block table."""
+
+    __slots__ = ("number", "column", "lines", "blocks", "bbox")
+
+    def __init__(
+        self,
+        number: int,
+        column: int,
+        lines: List[str],
+        blocks: List[int],
+        bbox: Tuple[float, float, float, float],
+    ) -> None:
+        self.number = number
+        self.column = column
+        self.lines = lines
+        self.blocks = blocks
+        self.bbox = bbox
+
+    @property
+    def text(self) -> str:
+        out = ""
+        for line in self.lines:
+            if out.endswith("-") and line[:1].islower():
+                out = out[:-1] + line  # rejoin a word hyphenated across lines
+            else:
+                out = f"{out} {line}" if out else line
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "number": self.number,
+            "column": self.column,
+            "blocks": self.blocks,
+            "bbox": [float(v) for v in self.bbox],
+        }
+
+
+def _gutters(bounds: np.ndarray, min_gap: float, min_blocks: int) -> np.ndarray:
+    """X positions of vertical whitespace runs at least ``min_gap`` wide."""
+    lo = int(np.floor(bounds[:, 0].min()))
+    hi = int(np.ceil(bounds[:, 2].max()))
+    cover = np.zeros(hi - lo + 2, dtype=np.int64)
+    np.add.at(cover, (bounds[:, 0] - lo).astype(np.int64), 1)
+    np.add.at(cover, (bounds[:, 2] - lo).astype(np.int64) + 1, -1)
+    occupied = np.concatenate([[True], np.cumsum(cover[:-1]) > 0, [True]])
+    change = np.diff(occupied.astype(np.int8))
+    starts, ends = np.flatnonzero(change == -1), np.flatnonzero(change == 1)
+    wide = (ends - starts) >= min_gap
+    gutters = lo + (starts[wide] + ends[wide]) / 2.0
+    if not len(gutters):
+        return gutters
+    # A gutter is real only if every column it creates holds enough boxes
+    counts = np.bincount(
+        np.searchsorted(gutters, (bounds[:, 0] + bounds[:, 2]) / 2), minlength=len(gutters) + 1
+    )
+    return gutters if counts.min() >= min_blocks else gutters[:0]
+
+
+def reconstruct_layout(
+    blocks: BlockTable,
+    texts: Optional[Sequence[str]] = None,
+    line_tol: float = 0.5,
+    paragraph_gap: float = 0.8,
+    indent: float = 1.5,
+    column_gap: float = 1.5,
+    min_column_blocks: int = 3,
+) -> List[Paragraph]:
+    """Group ``blocks`` into numbered paragraphs in reading order.
+
+    ``texts`` defaults to the blocks' final (verified) text.  Tolerances are
+    multiples of the median box height: boxes whose centres are within
+    ``line_tol`` share a line, a vertical gap above ``paragraph_gap`` or a
+    left shift above ``indent`` starts a paragraph and a gutter must be at
+    least ``column_gap`` wide to separate columns holding at least
+    ``min_column_blocks`` boxes each.
+    """
+    n = len(blocks)
+    if not n:
+        return []
+    texts = list(blocks.final_text) if texts is None else list(texts)
+    points = blocks.coords.reshape(n, 4, 2)
+    bounds = np.concatenate([points.min(axis=1), points.max(axis=1)], axis=1)
+    heights = bounds[:, 3] - bounds[:, 1]
+    unit = float(np.median(heights)) or 1.0
+    cy = (bounds[:, 1] + bounds[:, 3]) / 2
+
+    # Columns from boxes narrower than half the text width; wider ones span
+    span_width = bounds[:, 2].max() - bounds[:, 0].min()
+    narrow = (bounds[:, 2] - bounds[:, 0]) < span_width / 2
+    gutters = _gutters(bounds[narrow], column_gap * unit, min_column_blocks) if narrow.any() else np.zeros(0)
+    column = np.searchsorted(gutters, (bounds[:, 0] + bounds[:, 2]) / 2)
+    spanning = np.searchsorted(gutters, bounds[:, 0]) != np.searchsorted(gutters, bounds[:, 2])
+    column[spanning] = -1
+
+    # Bands: maximal runs of spanning / non-spanning boxes in vertical order
+    order = np.argsort(cy, kind="stable")
+    band = np.empty(n, dtype=np.int64)
+    band[order] = np.cumsum(np.concatenate([[0], np.diff(spanning[order].astype(np.int8)) != 0]))
+
+    paragraphs: List[Paragraph] = []
+    group_order = np.lexsort((cy, column, band))
+    group_key = band[group_order] * (len(gutters) + 2) + column[group_order]
+    groups = np.split(group_order, np.flatnonzero(np.diff(group_key)) + 1)
+    for members in groups:
+        # Sweep by vertical centre: a box joins the current line while it is
+        # within ``line_tol`` of the line's first box
+        lines: List[List[int]] = []
+        anchor = None
+        for pos in members.tolist():
+            if anchor is None or cy[pos] - anchor > line_tol * unit:
+                lines.append([])
+                anchor = cy[pos]
+            lines[-1].append(pos)
+
+        current: Optional[Paragraph] = None
+        prev_bottom = prev_left = 0.0
+        for line in lines:
+            line.sort(key=lambda p: bounds[p, 0])
+            text = " ".join(texts[p] for p in line if texts[p].strip())
+            left = float(bounds[line, 0].min())
+            top, bottom = float(bounds[line, 1].min()), float(bounds[line, 3].max())
+            breaks = (
+                current is None
+                or top - prev_bottom > paragraph_gap * unit
+                or left - prev_left > indent * unit
+                or _CLAUSE_START.match(text) is not None
+            )
+            if breaks:
+                current = Paragraph(len(paragraphs) + 1, int(column[line[0]]), [], [], (left, top, left, bottom))
+                paragraphs.append(current)
+            current.lines.append(text)
+            current.blocks.extend(line)
+            x0, y0, x1, y1 = current.bbox
+            current.bbox = (min(x0, left), min(y0, top), max(x1, float(bounds[line, 2].max())), max(y1, bottom))
+            prev_bottom, prev_left = bottom, left
+    return paragraphs
+
+
+def layout_text(paragraphs: Sequence[Paragraph]) -> str:
+    """Render paragraphs as one ``[N] text`` line each."""
+    return "\n".join(f"[{p.number}] {p.text}" for p in paragraphs)
+
+
+__all__ = ["Paragraph", "reconstruct_layout", "layout_text"]
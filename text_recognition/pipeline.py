@@ -1,134 +1,394 @@
-from typing import Dict, Any, List
+from functools import lru_cache
+import hashlib
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
-from llm.router import LLMRouter
-from .utils import pil_to_data_url
+import tracing
+from llm.cache import ResponseCache
+from .cache import OCRCache
+from .readers import readtext, readtext_batch, recognize
+from .result import COORD_KEYS, BlockTable
+from .utils import ImageInput, LazyDict, load_image, pil_to_data_url
+from .verify import verify_crops
 
 
 def process_image(
-    image_path: str,
+    image_path: ImageInput,
     use_llm: bool = False,
     llm_backend: str = "openrouter",
     conf_min: float = 0.1,
     llm_check_max: float = 0.5,
     label_max_chars: int = 30,
     font_size: int = 8,
+    languages: Optional[Sequence[str]] = None,
+    gpu: bool = False,
+    cache: Optional[OCRCache] = None,
+    llm_workers: int = 4,
+    llm_batch_size: int = 1,
+    llm_timeout: float = 60.0,
+    render: str = "full",
+    llm_cache: Optional[ResponseCache] = None,
 ) -> Dict[str, Any]:
     """Run OCR pipeline with optional LLM verification.
 
     The function performs OCR on ``image_path`` and returns all intermediate
     results without writing anything to disk.  Consumers of this function are
     responsible for persisting any desired outputs.
+
+    ``image_path`` may also be an in-memory PIL image or an RGB NumPy array
+    (for example a view over a PyMuPDF pixmap); paths are decoded once and the
+    same pixels are shared between EasyOCR and the overlay rendering.
+
+    The EasyOCR reader for ``languages``/``gpu`` is taken from the process-wide
+    registry in :mod:`text_recognition.readers`, so weights are loaded only once.
+
+    Blocks with confidence below ``llm_check_max`` are verified concurrently:
+    up to ``llm_workers`` requests are in flight, ``llm_batch_size`` crops are
+    packed into each request and each request is bounded by ``llm_timeout``
+    seconds (see :func:`text_recognition.verify.verify_crops`).  Repeated
+    crops are answered from ``llm_cache`` when one is given.
+
+    ``render`` controls image work: ``"full"`` builds every crop data URL and
+    the overlay eagerly, ``"lazy"`` defers them until the ``crop_data`` /
+    ``overlay`` keys are first read, and ``"text"`` skips them entirely
+    (``overlay`` is ``None`` and blocks carry no ``crop_data``).
+
+    When ``cache`` is given, results are looked up by a hash of the pixels and
+    all recognition parameters before running OCR and stored afterwards.
     """
-    import easyocr
+    if render not in ("full", "lazy", "text"):
+        raise ValueError(f"Unknown render mode: {render}")
+    pixels = load_image(image_path)
+    cache_key = None
+    if cache is not None:
+        cache_key = _cache_key(
+            pixels, use_llm, llm_backend, conf_min, llm_check_max, label_max_chars, font_size, languages, render
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    easy = easyocr.Reader(["ru", "en"], gpu=False)
-    results_easy = easy.readtext(image_path, detail=1)
+    results_easy = readtext(pixels, languages=languages, gpu=gpu, detail=1)
     if not results_easy:
         raise SystemExit("⚠️ EasyOCR не нашёл текста.")
 
-    base = Image.open(image_path).convert("RGBA")
-    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(overlay)
+    result = build_result(
+        pixels,
+        results_easy,
+        use_llm=use_llm,
+        llm_backend=llm_backend,
+        conf_min=conf_min,
+        llm_check_max=llm_check_max,
+        label_max_chars=label_max_chars,
+        font_size=font_size,
+        llm_workers=llm_workers,
+        llm_batch_size=llm_batch_size,
+        llm_timeout=llm_timeout,
+        render=render,
+        llm_cache=llm_cache,
+    )
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
 
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except OSError:
-        try:
-            font = ImageFont.truetype("DejaVuSans.ttf", font_size)
-        except OSError:
-            font = ImageFont.load_default()
 
-    llm = LLMRouter(backend=llm_backend) if use_llm else None
+def process_images(
+    images: Sequence[ImageInput],
+    batch_size: int = 8,
+    use_llm: bool = False,
+    llm_backend: str = "openrouter",
+    conf_min: float = 0.1,
+    llm_check_max: float = 0.5,
+    label_max_chars: int = 30,
+    font_size: int = 8,
+    languages: Optional[Sequence[str]] = None,
+    gpu: bool = False,
+    cache: Optional[OCRCache] = None,
+    llm_workers: int = 4,
+    llm_batch_size: int = 1,
+    llm_timeout: float = 60.0,
+    render: str = "full",
+    llm_cache: Optional[ResponseCache] = None,
+    boxes: Optional[Sequence[Optional[Sequence[Any]]]] = None,
+) -> List[Dict[str, Any]]:
+    """Run the OCR pipeline over many images with batched recognition.
 
-    easy_lines: List[str] = []
-    verified_lines: List[str] = []
-    blocks_log: List[Dict[str, Any]] = []
-    kept = 0
+    Accepts the same options as :func:`process_image` and returns one result
+    per image, in input order and with the same shape.  Images that miss the
+    ``cache`` are recognised together via
+    :func:`text_recognition.readers.readtext_batch`, ``batch_size`` at a time.
 
-    for idx, line in enumerate(results_easy, 1):
-        (x1, y1), (x2, y2), (x3, y3), (x4, y4) = line[0]
-        easy_text, easy_conf = line[1], float(line[2] or 0.0)
+    ``boxes`` may give, per image, text boxes already found by
+    :func:`text_recognition.readers.detect` on the same pixels; those images
+    skip detection and only run the recognizer (``None`` entries are detected
+    as usual).
 
-        if not easy_text.strip() or easy_conf < conf_min:
-            continue
+    Unlike :func:`process_image`, an image without any detected text does not
+    abort the run; its result simply has no blocks.
+    """
+    if render not in ("full", "lazy", "text"):
+        raise ValueError(f"Unknown render mode: {render}")
+    pixels_list = [load_image(image) for image in images]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(pixels_list)
+    keys: List[Optional[str]] = [None] * len(pixels_list)
+    boxes = boxes or [None] * len(pixels_list)
+    if cache is not None:
+        for i, pixels in enumerate(pixels_list):
+            keys[i] = _cache_key(
+                pixels, use_llm, llm_backend, conf_min, llm_check_max, label_max_chars, font_size, languages, render,
+                boxes=boxes[i],
+            )
+            results[i] = cache.get(keys[i])
 
-        xmin, xmax = int(min(x1, x2, x3, x4)), int(max(x1, x2, x3, x4))
-        ymin, ymax = int(min(y1, y2, y3, y4)), int(max(y1, y2, y3, y4))
-        crop = base.crop((xmin, ymin, xmax, ymax)).convert("RGB")
-        crop_data = pil_to_data_url(crop)
+    todo = [i for i, res in enumerate(results) if res is None]
+    detected = [i for i in todo if boxes[i] is None]
+    detections = dict(
+        zip(
+            detected,
+            readtext_batch(
+                [pixels_list[i] for i in detected], languages=languages, gpu=gpu, max_images=batch_size, detail=1
+            ),
+        )
+    )
+    for i in todo:
+        if boxes[i] is None:
+            found = detections[i]
+        else:
+            found = recognize(pixels_list[i], boxes[i], languages=languages, gpu=gpu, detail=1)
+        results[i] = build_result(
+            pixels_list[i],
+            found or [],
+            use_llm=use_llm,
+            llm_backend=llm_backend,
+            conf_min=conf_min,
+            llm_check_max=llm_check_max,
+            label_max_chars=label_max_chars,
+            font_size=font_size,
+            llm_workers=llm_workers,
+            llm_batch_size=llm_batch_size,
+            llm_timeout=llm_timeout,
+            render=render,
+            llm_cache=llm_cache,
+        )
+        if cache is not None:
+            cache.put(keys[i], results[i])
+    return results  # type: ignore[return-value]
 
-        final_text, final_conf, source = easy_text, easy_conf, "EASY"
-        llm_resp = None
 
-        if use_llm and easy_conf < llm_check_max:
-            llm_resp = llm.verify_text(crop_data, easy_text)
-            llm_text = llm_resp.get("corrected", "")
-            llm_conf = llm_resp.get("confidence", 0.0)
-            if llm_text and llm_conf >= final_conf:
-                final_text, final_conf, source = llm_text, llm_conf, "LLM"
+def _cache_key(
+    pixels: Any,
+    use_llm: bool,
+    llm_backend: str,
+    conf_min: float,
+    llm_check_max: float,
+    label_max_chars: int,
+    font_size: int,
+    languages: Optional[Sequence[str]],
+    render: str,
+    boxes: Optional[Sequence[Any]] = None,
+) -> str:
+    # Recognition over supplied boxes may differ from a full detection pass
+    boxes_digest = None
+    if boxes is not None:
+        boxes_digest = hashlib.sha256(np.asarray(boxes, dtype=np.float64).tobytes()).hexdigest()
+    return OCRCache.make_key(
+        pixels,
+        {
+            "format": OCRCache.FORMAT,
+            "boxes": boxes_digest,
+            "use_llm": use_llm,
+            "llm_backend": llm_backend if use_llm else None,
+            "conf_min": conf_min,
+            "llm_check_max": llm_check_max,
+            "label_max_chars": label_max_chars,
+            "font_size": font_size,
+            "languages": list(languages) if languages else None,
+            "render": render,
+        },
+    )
 
-        easy_lines.append(easy_text)
-        verified_lines.append(final_text)
-        kept += 1
 
-        poly = [(int(x1), int(y1)), (int(x2), int(y2)),
-                (int(x3), int(y3)), (int(x4), int(y4))]
-        color = (0, 0, 255) if source == "EASY" else (255, 128, 0)
+def build_result(
+    pixels: Any,
+    detections: Sequence[Any],
+    use_llm: bool = False,
+    llm_backend: str = "openrouter",
+    conf_min: float = 0.1,
+    llm_check_max: float = 0.5,
+    label_max_chars: int = 30,
+    font_size: int = 8,
+    llm_workers: int = 4,
+    llm_batch_size: int = 1,
+    llm_timeout: float = 60.0,
+    render: str = "full",
+    llm_cache: Optional[ResponseCache] = None,
+    source: str = "EASY",
+) -> Dict[str, Any]:
+    """Turn ``(box, text, confidence)`` detections into a result dict.
 
-        draw.polygon(poly, fill=color + (60,))
-        for i in range(4):
-            draw.line([poly[i], poly[(i + 1) % 4]], fill=color + (200,), width=2)
+    ``detections`` use EasyOCR's ``readtext(detail=1)`` layout, so other
+    text sources (such as a PDF text layer) can produce the same ``blocks`` /
+    ``verified_lines`` structure as :func:`process_image`.  ``source`` labels
+    blocks that were not corrected by the LLM.
 
-        short = (
-            final_text[:label_max_chars] + "…"
-            if len(final_text) > label_max_chars
-            else final_text
-        )
-        label = f"{source}: {short} ({final_conf:.2f})"
-        tw, th = draw.textbbox((0, 0), label, font=font)[2:]
-        draw.rectangle(
-            [(poly[0][0], poly[0][1] - th - 4), (poly[0][0] + tw + 4, poly[0][1])],
-            fill=(0, 0, 0, 160),
-        )
-        draw.text(
-            (poly[0][0] + 2, poly[0][1] - th - 2),
-            label,
-            fill=(255, 255, 255, 255),
-            font=font,
-        )
+    ``blocks`` is a :class:`text_recognition.result.BlockTable`; indexing it
+    yields dict-compatible block views and ``blocks.to_list()`` gives plain
+    dicts for JSON.
+    """
+    if render not in ("full", "lazy", "text"):
+        raise ValueError(f"Unknown render mode: {render}")
+    base: Optional[Image.Image] = None
+    if render != "text" or use_llm:
+        base = Image.fromarray(pixels).convert("RGBA")
+
+    llm = None
+    if use_llm:
+        # The LLM clients (openai, httpx) are only imported for LLM runs
+        from llm.router import LLMRouter
+
+        llm = LLMRouter(backend=llm_backend, cache=llm_cache)
+
+    # Filtering, bounds and coordinate serialization run over arrays; only
+    # crops and LLM responses are handled per block.
+    count = len(detections)
+    boxes = np.asarray([line[0] for line in detections], dtype=np.float64).reshape(count, 4, 2)
+    confs = np.fromiter((float(line[2] or 0.0) for line in detections), dtype=np.float64, count=count)
+    has_text = np.fromiter((bool(line[1].strip()) for line in detections), dtype=bool, count=count)
+    keep = np.flatnonzero(has_text & (confs >= conf_min))
+    boxes, confs = boxes[keep], confs[keep]
+    bboxes = np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1).astype(np.int64)
+    needs_llm = (confs < llm_check_max) if use_llm else np.zeros(len(keep), dtype=bool)
+    easy_lines: List[str] = [detections[i][1] for i in keep.tolist()]
 
-        blocks_log.append(
-            {
-                "index": int(idx),
-                "coords": {
-                    "x1": float(x1),
-                    "y1": float(y1),
-                    "x2": float(x2),
-                    "y2": float(y2),
-                    "x3": float(x3),
-                    "y3": float(y3),
-                    "x4": float(x4),
-                    "y4": float(y4),
-                },
-                "easy": {"text": easy_text, "confidence": float(easy_conf)},
-                "llm": llm_resp or {},
-                "final": {
-                    "text": final_text,
-                    "confidence": float(final_conf),
-                    "source": source,
-                },
-                "crop_data": crop_data,
-            }
+    crops: Dict[int, str] = {}
+    with tracing.span("ocr.crop_encode") as s:
+        for pos, (bbox, check) in enumerate(zip(bboxes.tolist(), needs_llm.tolist())):
+            if render == "full" or check:
+                crops[pos] = _crop_data_url(base, tuple(bbox))
+        s.set(crops=len(crops), bytes=sum(len(c) for c in crops.values()))
+
+    to_verify = np.flatnonzero(needs_llm).tolist()
+    llm_resps: Dict[int, Dict[str, Any]] = dict(
+        zip(
+            to_verify,
+            verify_crops(
+                llm,
+                [(crops[i], easy_lines[i]) for i in to_verify],
+                max_workers=llm_workers,
+                batch_size=llm_batch_size,
+                timeout=llm_timeout,
+            ),
         )
+    )
+
+    verified_lines = list(easy_lines)
+    final_conf = confs.copy()
+    sources = [source] * len(keep)
+    for pos, llm_resp in llm_resps.items():
+        llm_text = llm_resp.get("corrected", "")
+        llm_conf = llm_resp.get("confidence", 0.0)
+        if llm_text and llm_conf >= final_conf[pos]:
+            verified_lines[pos], final_conf[pos], sources[pos] = llm_text, llm_conf, "LLM"
+
+    blocks = BlockTable(
+        index=keep + 1,
+        coords=boxes.reshape(-1, 8),
+        easy_text=easy_lines,
+        easy_conf=confs,
+        final_text=verified_lines,
+        final_conf=final_conf,
+        sources=sources,
+        llm=llm_resps,
+        crops=crops,
+        image=base if render == "lazy" else None,
+        crop_func=_crop_data_url,
+    )
+
+    result = LazyDict(
+        {
+            "kept": len(blocks),
+            "easy_lines": easy_lines,
+            "verified_lines": verified_lines,
+            "blocks": blocks,
+        }
+    )
+    if render == "full":
+        result["overlay"] = render_overlay(base, blocks, label_max_chars, font_size)
+    elif render == "lazy":
+        result.defer("overlay", render_overlay, base, blocks, label_max_chars, font_size)
+    else:
+        result["overlay"] = None
+    return result
+
+
+_SOURCE_COLORS = {"EASY": (0, 0, 255), "TEXT": (0, 160, 0)}
+
+
+def _crop_data_url(base: Image.Image, bbox: Tuple[int, int, int, int]) -> str:
+    return pil_to_data_url(base.crop(bbox).convert("RGB"))
+
+
+@lru_cache(maxsize=None)
+def _load_font(font_size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except OSError:
+        try:
+            return ImageFont.truetype("DejaVuSans.ttf", font_size)
+        except OSError:
+            return ImageFont.load_default()
+
+
+def render_overlay(
+    base: Image.Image,
+    blocks: Union[BlockTable, List[Dict[str, Any]]],
+    label_max_chars: int = 30,
+    font_size: int = 8,
+) -> Image.Image:
+    """Draw block polygons and ``SOURCE: text (conf)`` labels over ``base``.
+
+    Polygon vertices and labels are prepared for all blocks up front and then
+    drawn in a single pass; blocks are still painted in order, so overlapping
+    blocks look exactly as if drawn one at a time.
+    """
+    with tracing.span("ocr.overlay", blocks=len(blocks)):
+        return _draw_overlay(base, blocks, label_max_chars, font_size)
 
-    result_img = Image.alpha_composite(base, overlay).convert("RGB")
 
-    return {
-        "kept": kept,
-        "overlay": result_img,
-        "easy_lines": easy_lines,
-        "verified_lines": verified_lines,
-        "blocks": blocks_log,
-    }
+def _draw_overlay(
+    base: Image.Image,
+    blocks: Union[BlockTable, List[Dict[str, Any]]],
+    label_max_chars: int,
+    font_size: int,
+) -> Image.Image:
+    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    font = _load_font(font_size)
+
+    if isinstance(blocks, BlockTable):
+        coords = blocks.coords
+        finals = zip(blocks.final_text, blocks.final_conf.tolist(), map(blocks.source_of, range(len(blocks))))
+    else:
+        coords = np.array([[b["coords"][k] for k in COORD_KEYS] for b in blocks], dtype=np.float64)
+        finals = ((b["final"]["text"], b["final"]["confidence"], b["final"]["source"]) for b in blocks)
+    polys = coords.astype(np.int64).reshape(-1, 4, 2).tolist()
+    labels = []
+    for text, conf, source in finals:
+        short = text[:label_max_chars] + "…" if len(text) > label_max_chars else text
+        labels.append((source, f"{source}: {short} ({conf:.2f})"))
+
+    for poly, (source, label) in zip(polys, labels):
+        poly = [tuple(p) for p in poly]
+        color = _SOURCE_COLORS.get(source, (255, 128, 0))
+        draw.polygon(poly, fill=color + (60,))
+        # A polyline is drawn segment by segment, same as four separate lines
+        draw.line(poly + poly[:1], fill=color + (200,), width=2)
+
+        x, y = poly[0]
+        tw, th = draw.textbbox((0, 0), label, font=font)[2:]
+        draw.rectangle([(x, y - th - 4), (x + tw + 4, y)], fill=(0, 0, 0, 160))
+        draw.text((x + 2, y - th - 2), label, fill=(255, 255, 255, 255), font=font)
+
+    return Image.alpha_composite(base, overlay).convert("RGB")
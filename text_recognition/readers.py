@@ -0,0 +1,396 @@
+"""Process-wide registry of warm EasyOCR readers.
+
+Constructing :class:`easyocr.Reader` loads the detector and recognizer weights
+from disk, which is far more expensive than recognising a single page.  The
+registry below loads each reader lazily on first use and keeps it resident for
+the lifetime of the process, keyed by language set and device.
+"""
+
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import queue
+import threading
+import time
+
+import tracing
+
+DEFAULT_LANGUAGES: Tuple[str, ...] = ("ru", "en")
+
+ReaderKey = Tuple[Tuple[str, ...], bool]
+
+
+class _Entry:
+    """A loaded reader together with its lock and load statistics."""
+
+    __slots__ = ("reader", "lock", "load_seconds", "loaded_at", "uses")
+
+    def __init__(self, reader: Any, load_seconds: float) -> None:
+        self.reader = reader
+        self.lock = threading.Lock()
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.uses = 0
+
+
+_entries: Dict[ReaderKey, _Entry] = {}
+_registry_lock = threading.Lock()
+
+
+def _key(languages: Optional[Iterable[str]], gpu: bool) -> ReaderKey:
+    langs = tuple(languages) if languages else DEFAULT_LANGUAGES
+    return langs, bool(gpu)
+
+
+def _entry(languages: Optional[Iterable[str]] = None, gpu: bool = False) -> _Entry:
+    key = _key(languages, gpu)
+    entry = _entries.get(key)
+    if entry is not None:
+        return entry
+    with _registry_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            import easyocr
+
+            start = time.perf_counter()
+            with tracing.span("ocr.reader_load", languages="+".join(key[0]), gpu=key[1]):
+                reader = easyocr.Reader(list(key[0]), gpu=key[1])
+            entry = _Entry(reader, time.perf_counter() - start)
+            _entries[key] = entry
+    return entry
+
+
+def get_reader(languages: Optional[Iterable[str]] = None, gpu: bool = False) -> Any:
+    """Return the shared reader for ``languages``/``gpu``, loading it if needed."""
+    return _entry(languages, gpu).reader
+
+
+def readtext(
+    image: Any,
+    languages: Optional[Iterable[str]] = None,
+    gpu: bool = False,
+    **kwargs: Any,
+) -> list:
+    """Run ``readtext`` on the shared reader, serialising access across threads.
+
+    When micro-batching is enabled (see :func:`enable_batching`), concurrent
+    calls from different threads are merged into shared batched calls.
+    """
+    batcher = _batcher
+    if batcher is not None and threading.current_thread() is not batcher.thread:
+        return batcher.submit(image, _key(languages, gpu), kwargs).result()
+    entry = _entry(languages, gpu)
+    with entry.lock:
+        entry.uses += 1
+        if tracing.enabled():
+            return _readtext_traced(entry.reader, image, **kwargs)
+        return entry.reader.readtext(image, **kwargs)
+
+
+# ``readtext`` options that belong to the recognition step
+_RECOGNIZE_KWARGS = {
+    "decoder", "beamWidth", "batch_size", "workers", "allowlist", "blocklist", "detail",
+    "rotation_info", "paragraph", "contrast_ths", "adjust_contrast", "filter_ths",
+    "y_ths", "x_ths", "output_format",
+}
+
+
+def _readtext_traced(reader: Any, image: Any, **kwargs: Any) -> list:
+    """``reader.readtext`` split into its detection and recognition spans.
+
+    Mirrors EasyOCR's own ``readtext`` for the default detector settings;
+    calls with detector options fall back to a single ``ocr.readtext`` span.
+    """
+    if set(kwargs) - _RECOGNIZE_KWARGS:
+        with tracing.span("ocr.readtext"):
+            return reader.readtext(image, **kwargs)
+    from easyocr.utils import reformat_input
+
+    img, img_cv_grey = reformat_input(image)
+    with tracing.span("ocr.detect", pixels=int(img.shape[0] * img.shape[1])) as s:
+        horizontal_list, free_list = reader.detect(img, reformat=False)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+        s.set(boxes=len(horizontal_list) + len(free_list))
+    with tracing.span("ocr.recognize", boxes=len(horizontal_list) + len(free_list)):
+        return reader.recognize(img_cv_grey, horizontal_list, free_list, reformat=False, **kwargs)
+
+
+def detect(
+    image: Any,
+    languages: Optional[Iterable[str]] = None,
+    gpu: bool = False,
+    **kwargs: Any,
+) -> List[List[List[float]]]:
+    """Run only the text detector and return boxes as 4-point polygons.
+
+    Detection is a fraction of the cost of a full ``readtext`` and is enough
+    to tell blank pages from dense ones and where on the page text sits.
+    ``kwargs`` are passed to EasyOCR's ``detect``.
+    """
+    entry = _entry(languages, gpu)
+    with entry.lock:
+        entry.uses += 1
+        with tracing.span("ocr.detect") as s:
+            horizontal_list, free_list = entry.reader.detect(image, **kwargs)
+            horizontal_list, free_list = horizontal_list[0], free_list[0]
+            s.set(boxes=len(horizontal_list) + len(free_list))
+    boxes = [
+        [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+        for x_min, x_max, y_min, y_max in horizontal_list
+    ]
+    boxes.extend([[float(x), float(y)] for x, y in box] for box in free_list)
+    return boxes
+
+
+def recognize(
+    image: Any,
+    boxes: Sequence[Sequence[Sequence[float]]],
+    languages: Optional[Iterable[str]] = None,
+    gpu: bool = False,
+    **kwargs: Any,
+) -> list:
+    """Run only the recognizer over ``boxes`` found earlier by :func:`detect`.
+
+    ``boxes`` are 4-point polygons in ``image`` pixels; axis-aligned ones are
+    recognised as EasyOCR's horizontal boxes, the rest as free-form boxes.
+    Returns ``readtext(detail=1)``-style results, so a page detected once (for
+    example by a survey pass) need not be detected again.
+    """
+    from easyocr.utils import reformat_input
+
+    horizontal_list, free_list = [], []
+    for box in boxes:
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = box
+        if y0 == y1 and y2 == y3 and x0 == x3 and x1 == x2:
+            horizontal_list.append([int(round(x0)), int(round(x1)), int(round(y0)), int(round(y2))])
+        else:
+            free_list.append([[int(round(x)), int(round(y))] for x, y in box])
+    if not horizontal_list and not free_list:
+        return []
+    entry = _entry(languages, gpu)
+    img, img_cv_grey = reformat_input(image)
+    with entry.lock:
+        entry.uses += 1
+        with tracing.span("ocr.recognize", boxes=len(horizontal_list) + len(free_list)):
+            return entry.reader.recognize(img_cv_grey, horizontal_list, free_list, reformat=False, **kwargs)
+
+
+def readtext_batch(
+    images: Sequence[Any],
+    languages: Optional[Iterable[str]] = None,
+    gpu: bool = False,
+    max_images: int = 8,
+    **kwargs: Any,
+) -> List[list]:
+    """Run detection and recognition over many images in batched calls.
+
+    EasyOCR's ``readtext_batched`` stacks its inputs, so images are grouped
+    by shape and each group is split into slices of at most ``max_images``
+    images, which bounds the detector's memory; slices of one fall back to
+    plain ``readtext``.  ``kwargs`` go to EasyOCR unchanged, including its
+    own ``batch_size`` (text crops per recognizer step).  Results are
+    returned in input order.
+
+    When micro-batching is enabled, the images are submitted to the shared
+    batcher instead (see :meth:`MicroBatcher.map`), so document pages share
+    batches with concurrent single-image calls.
+    """
+    if not images:
+        return []
+    batcher = _batcher
+    if batcher is not None and threading.current_thread() is not batcher.thread:
+        return batcher.map(images, _key(languages, gpu), kwargs)
+    entry = _entry(languages, gpu)
+    max_images = max(1, max_images)
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    for i, image in enumerate(images):
+        groups.setdefault(tuple(image.shape), []).append(i)
+    slices = [
+        indices[start:start + max_images]
+        for indices in groups.values()
+        for start in range(0, len(indices), max_images)
+    ]
+    results: List[Optional[list]] = [None] * len(images)
+    with entry.lock:
+        for indices in slices:
+            entry.uses += len(indices)
+            if len(indices) == 1:
+                if tracing.enabled():
+                    results[indices[0]] = _readtext_traced(entry.reader, images[indices[0]], **kwargs)
+                else:
+                    results[indices[0]] = entry.reader.readtext(images[indices[0]], **kwargs)
+                continue
+            with tracing.span("ocr.readtext_batched", images=len(indices)):
+                batched = entry.reader.readtext_batched([images[i] for i in indices], **kwargs)
+            for i, res in zip(indices, batched):
+                results[i] = res
+    return results  # type: ignore[return-value]
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the micro-batching queue is at its depth limit."""
+
+
+class _Request:
+    __slots__ = ("image", "key", "kwargs", "future")
+
+    def __init__(self, image: Any, key: ReaderKey, kwargs: Dict[str, Any]) -> None:
+        self.image = image
+        self.key = key
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """Collect concurrent ``readtext`` calls and run them as shared batches.
+
+    A background thread takes the first queued request, waits up to
+    ``window`` seconds for more (at most ``max_batch``), groups them by reader
+    and options and runs :func:`readtext_batch`.  At most ``max_queue``
+    requests may wait; further submissions raise :class:`QueueFullError`.
+    """
+
+    def __init__(self, max_batch: int = 8, window: float = 0.02, max_queue: int = 64) -> None:
+        self.max_batch = max_batch
+        self.window = window
+        self.queue: "queue.Queue[Optional[_Request]]" = queue.Queue(maxsize=max_queue)
+        self.stats = {"requests": 0, "batches": 0, "batched_images": 0, "rejected": 0}
+        self.stats_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+        self.thread.start()
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def submit(self, image: Any, key: ReaderKey, kwargs: Dict[str, Any]) -> Future:
+        request = _Request(image, key, kwargs)
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            self._count("rejected")
+            raise QueueFullError("OCR queue is full") from None
+        self._count("requests")
+        return request.future
+
+    def map(self, images: Sequence[Any], key: ReaderKey, kwargs: Dict[str, Any]) -> List[list]:
+        """Submit ``images`` ``max_batch`` at a time and return results in order.
+
+        Waiting for each window before submitting the next keeps one large
+        document from filling the queue ahead of other clients.
+        """
+        results: List[list] = []
+        for start in range(0, len(images), self.max_batch):
+            futures = [self.submit(image, key, kwargs) for image in images[start:start + self.max_batch]]
+            results.extend(f.result() for f in futures)
+        return results
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[name] += value
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self) -> None:
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+
+            groups: Dict[Any, List[_Request]] = {}
+            for req in batch:
+                groups.setdefault((req.key, tuple(sorted(req.kwargs.items()))), []).append(req)
+            for (key, _), reqs in groups.items():
+                self._count("batches")
+                self._count("batched_images", len(reqs))
+                try:
+                    results = readtext_batch(
+                        [r.image for r in reqs], key[0], key[1], max_images=self.max_batch, **reqs[0].kwargs
+                    )
+                except Exception as e:  # propagate to every waiting caller
+                    for r in reqs:
+                        r.future.set_exception(e)
+                    continue
+                for r, res in zip(reqs, results):
+                    r.future.set_result(res)
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+def enable_batching(max_batch: int = 8, window: float = 0.02, max_queue: int = 64) -> MicroBatcher:
+    """Route every :func:`readtext` call in this process through a micro-batcher."""
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(max_batch, window, max_queue)
+    return _batcher
+
+
+def disable_batching() -> None:
+    global _batcher
+    batcher, _batcher = _batcher, None
+    if batcher is not None:
+        batcher.close()
+
+
+def warm_up(languages: Optional[Iterable[str]] = None, gpu: bool = False) -> float:
+    """Load the reader ahead of time and return its load time in seconds."""
+    return _entry(languages, gpu).load_seconds
+
+
+def release_readers(languages: Optional[Iterable[str]] = None, gpu: Optional[bool] = None) -> int:
+    """Drop cached readers so their weights can be garbage collected.
+
+    Without arguments every reader is released.  Returns the number of readers
+    removed from the registry.
+    """
+    with _registry_lock:
+        keys = [
+            key
+            for key in _entries
+            if (languages is None or key[0] == tuple(languages))
+            and (gpu is None or key[1] == bool(gpu))
+        ]
+        for key in keys:
+            del _entries[key]
+    return len(keys)
+
+
+def reader_stats() -> Dict[str, Dict[str, Any]]:
+    """Return load-time metrics for every resident reader."""
+    return {
+        f"{'+'.join(langs)}@{'gpu' if gpu else 'cpu'}": {
+            "load_seconds": entry.load_seconds,
+            "loaded_at": entry.loaded_at,
+            "uses": entry.uses,
+        }
+        for (langs, gpu), entry in list(_entries.items())
+    }
+
+
+__all__ = [
+    "DEFAULT_LANGUAGES",
+    "get_reader",
+    "readtext",
+    "readtext_batch",
+    "detect",
+    "recognize",
+    "MicroBatcher",
+    "QueueFullError",
+    "enable_batching",
+    "disable_batching",
+    "warm_up",
+    "release_readers",
+    "reader_stats",
+]
@@ -0,0 +1,308 @@
+"""Column-oriented storage of OCR blocks.
+
+A page result used to hold one nested dict per block (eight coordinate
+floats, ``easy``/``llm``/``final`` sub-dicts and a crop data URL).
+:class:`BlockTable` keeps the same information in NumPy columns and two
+string buffers, so hundreds of pages stay small in memory and can be written
+to ``.npz`` without per-block overhead.  Indexing the table returns a
+:class:`BlockView` that behaves like the old block dict.
+"""
+
+from collections.abc import MutableMapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import json
+
+import numpy as np
+
+COORD_KEYS = ("x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4")
+
+# Read-only block keys backed by columns; everything else lives in ``extras``
+_COLUMN_KEYS = ("index", "coords", "easy")
+
+
+class TextColumn(Sequence):
+    """A column of strings stored as one buffer plus character offsets.
+
+    :meth:`replace` records edits in a small dict that reads consult first;
+    the buffer is repacked once, when the column is serialized, instead of on
+    every edit.
+    """
+
+    __slots__ = ("_buffer", "_offsets", "_edits")
+
+    def __init__(self, strings: Iterable[str] = ()) -> None:
+        self._store(list(strings))
+
+    def _store(self, strings: List[str]) -> None:
+        """Replace the buffer and offsets with ``strings`` and drop pending edits."""
+        self._buffer = "".join(strings)
+        lengths = np.fromiter((len(s) for s in strings), dtype=np.int64, count=len(strings))
+        self._offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._offsets[1:])
+        self._edits: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, pos: Union[int, slice]) -> Any:
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if not -len(self) <= pos < len(self):
+            raise IndexError("text index out of range")
+        pos %= len(self)
+        if pos in self._edits:
+            return self._edits[pos]
+        return self._buffer[int(self._offsets[pos]):int(self._offsets[pos + 1])]
+
+    def replace(self, pos: int, text: str) -> None:
+        if not -len(self) <= pos < len(self):
+            raise IndexError("text index out of range")
+        self._edits[pos % len(self)] = text
+
+    def _pack(self) -> None:
+        if self._edits:
+            self._store(list(self))
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(utf8_bytes, offsets)`` for binary serialization."""
+        self._pack()
+        return np.frombuffer(self._buffer.encode("utf-8"), dtype=np.uint8), self._offsets
+
+    @classmethod
+    def from_arrays(cls, data: np.ndarray, offsets: np.ndarray) -> "TextColumn":
+        column = cls.__new__(cls)
+        column._buffer = data.tobytes().decode("utf-8")
+        column._offsets = np.asarray(offsets, dtype=np.int64)
+        column._edits = {}
+        return column
+
+
+class BlockTable(Sequence):
+    """OCR blocks of one page held in columns.
+
+    ``coords`` is an ``(n, 8)`` float array in :data:`COORD_KEYS` order,
+    ``easy_conf``/``final_conf`` are float arrays and ``source`` holds codes
+    into ``source_names``.  LLM responses, extra per-block keys (such as
+    ``refined``) and crop data URLs are sparse dicts keyed by position.
+    When ``image`` is given, crops of the remaining blocks are cut from it on
+    first access, mirroring the deferred ``crop_data`` of the old block dicts.
+    """
+
+    def __init__(
+        self,
+        index: Any,
+        coords: Any,
+        easy_text: Iterable[str],
+        easy_conf: Any,
+        final_text: Iterable[str],
+        final_conf: Any,
+        sources: Iterable[str],
+        llm: Optional[Dict[int, Dict[str, Any]]] = None,
+        crops: Optional[Dict[int, str]] = None,
+        extras: Optional[Dict[int, Dict[str, Any]]] = None,
+        image: Any = None,
+        crop_func: Optional[Callable[[Any, Tuple[int, int, int, int]], str]] = None,
+    ) -> None:
+        self.index = np.asarray(index, dtype=np.int32)
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(len(self.index), 8)
+        self.easy_text = TextColumn(easy_text)
+        self.easy_conf = np.asarray(easy_conf, dtype=np.float64)
+        self.final_text = TextColumn(final_text)
+        self.final_conf = np.array(final_conf, dtype=np.float64)
+        self.source_names: List[str] = []
+        self.source = np.array([self._source_code(s) for s in sources], dtype=np.uint8)
+        self.llm = dict(llm or {})
+        self.crops = dict(crops or {})
+        self.extras = dict(extras or {})
+        self.image = image
+        self.crop_func = crop_func
+
+    def _source_code(self, name: str) -> int:
+        if name not in self.source_names:
+            self.source_names.append(name)
+        return self.source_names.index(name)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, pos: Union[int, slice]) -> Any:
+        if isinstance(pos, slice):
+            return [BlockView(self, i) for i in range(*pos.indices(len(self)))]
+        if not -len(self) <= pos < len(self):
+            raise IndexError("block index out of range")
+        return BlockView(self, pos % len(self))
+
+    def source_of(self, pos: int) -> str:
+        return self.source_names[self.source[pos]]
+
+    def bbox(self, pos: int) -> Tuple[int, int, int, int]:
+        points = self.coords[pos].reshape(4, 2)
+        x1, y1 = points.min(axis=0).astype(np.int64).tolist()
+        x2, y2 = points.max(axis=0).astype(np.int64).tolist()
+        return x1, y1, x2, y2
+
+    def has_crop(self, pos: int) -> bool:
+        """Whether ``crop_data`` is available for ``pos``, built already or on access."""
+        return pos in self.crops or (self.image is not None and self.crop_func is not None)
+
+    def crop_data(self, pos: int) -> str:
+        if pos not in self.crops:
+            if not self.has_crop(pos):
+                raise KeyError("crop_data")
+            self.crops[pos] = self.crop_func(self.image, self.bbox(pos))
+        return self.crops[pos]
+
+    def set_final(self, pos: int, text: str, confidence: float, source: str) -> None:
+        self.final_text.replace(pos, text)
+        self.final_conf[pos] = confidence
+        self.source[pos] = self._source_code(source)
+
+    def keys_of(self, pos: int) -> List[str]:
+        keys = ["index", "coords", "easy", "llm", "final"]
+        if self.has_crop(pos):
+            keys.append("crop_data")
+        keys.extend(self.extras.get(pos, {}))
+        return keys
+
+    def field(self, pos: int, key: str) -> Any:
+        if key == "index":
+            return int(self.index[pos])
+        if key == "coords":
+            return dict(zip(COORD_KEYS, self.coords[pos].tolist()))
+        if key == "easy":
+            return {"text": self.easy_text[pos], "confidence": float(self.easy_conf[pos])}
+        if key == "llm":
+            return self.llm.get(pos, {})
+        if key == "final":
+            return {
+                "text": self.final_text[pos],
+                "confidence": float(self.final_conf[pos]),
+                "source": self.source_of(pos),
+            }
+        if key == "crop_data":
+            return self.crop_data(pos)
+        return self.extras.get(pos, {})[key]
+
+    def set_field(self, pos: int, key: str, value: Any) -> None:
+        if key in _COLUMN_KEYS:
+            raise TypeError(f"block field {key!r} is read-only")
+        if key == "final":
+            self.set_final(pos, value["text"], value["confidence"], value["source"])
+        elif key == "llm":
+            self.llm[pos] = value
+        elif key == "crop_data":
+            self.crops[pos] = value
+        else:
+            self.extras.setdefault(pos, {})[key] = value
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Plain block dicts for JSON; only crops already built are included."""
+        return [
+            {key: self.field(pos, key) for key in self.keys_of(pos) if key != "crop_data" or pos in self.crops}
+            for pos in range(len(self))
+        ]
+
+    @classmethod
+    def from_list(cls, blocks: Iterable[Dict[str, Any]]) -> "BlockTable":
+        """Build a table from block dicts such as a loaded ``blocks.json``."""
+        blocks = list(blocks)
+        known = {"index", "coords", "easy", "llm", "final", "crop_data"}
+        return cls(
+            index=[b["index"] for b in blocks],
+            coords=[[b["coords"][k] for k in COORD_KEYS] for b in blocks],
+            easy_text=[b["easy"]["text"] for b in blocks],
+            easy_conf=[b["easy"]["confidence"] for b in blocks],
+            final_text=[b["final"]["text"] for b in blocks],
+            final_conf=[b["final"]["confidence"] for b in blocks],
+            sources=[b["final"]["source"] for b in blocks],
+            llm={i: b["llm"] for i, b in enumerate(blocks) if b.get("llm")},
+            crops={i: b["crop_data"] for i, b in enumerate(blocks) if "crop_data" in b},
+            extras={
+                i: {k: v for k, v in b.items() if k not in known}
+                for i, b in enumerate(blocks)
+                if set(b) - known
+            },
+        )
+
+    def save_npz(self, path: str) -> None:
+        """Write the columns to a compressed ``.npz`` file (crops are not stored)."""
+        easy_data, easy_offsets = self.easy_text.to_arrays()
+        final_data, final_offsets = self.final_text.to_arrays()
+        sparse = {
+            "llm": {str(k): v for k, v in self.llm.items()},
+            "extras": {str(k): v for k, v in self.extras.items()},
+        }
+        np.savez_compressed(
+            path,
+            index=self.index,
+            coords=self.coords,
+            easy_conf=self.easy_conf,
+            final_conf=self.final_conf,
+            source=self.source,
+            source_names=np.array(self.source_names, dtype=str),
+            easy_data=easy_data,
+            easy_offsets=easy_offsets,
+            final_data=final_data,
+            final_offsets=final_offsets,
+            sparse=np.array(json.dumps(sparse, ensure_ascii=False)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BlockTable":
+        """Read a table written by :meth:`save_npz`."""
+        with np.load(path, allow_pickle=False) as data:
+            table = cls.__new__(cls)
+            table.index = data["index"]
+            table.coords = data["coords"]
+            table.easy_conf = data["easy_conf"]
+            table.final_conf = data["final_conf"]
+            table.source = data["source"]
+            table.source_names = data["source_names"].tolist()
+            table.easy_text = TextColumn.from_arrays(data["easy_data"], data["easy_offsets"])
+            table.final_text = TextColumn.from_arrays(data["final_data"], data["final_offsets"])
+            sparse = json.loads(str(data["sparse"]))
+        table.llm = {int(k): v for k, v in sparse["llm"].items()}
+        table.extras = {int(k): v for k, v in sparse["extras"].items()}
+        table.crops = {}
+        table.image = None
+        table.crop_func = None
+        return table
+
+
+class BlockView(MutableMapping):
+    """Dict-compatible view of one row of a :class:`BlockTable`.
+
+    Reads build the familiar nested dicts; assigning ``final``, ``llm``,
+    ``crop_data`` or a new key writes through to the table.  Nested dicts are
+    copies, so update them by assigning the whole key.
+    """
+
+    __slots__ = ("table", "pos")
+
+    def __init__(self, table: BlockTable, pos: int) -> None:
+        self.table = table
+        self.pos = pos
+
+    def __getitem__(self, key: str) -> Any:
+        return self.table.field(self.pos, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.table.set_field(self.pos, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        del self.table.extras.get(self.pos, {})[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.keys_of(self.pos))
+
+    def __len__(self) -> int:
+        return len(self.table.keys_of(self.pos))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.table.keys_of(self.pos)  # without building a lazy crop
+
+    def __repr__(self) -> str:
+        return repr({key: self[key] for key in self if key != "crop_data" or self.pos in self.table.crops})
+
+
+__all__ = ["BlockTable", "BlockView", "TextColumn", "COORD_KEYS"]
@@ -1,5 +1,8 @@
 import base64
 import io
+import os
+from typing import Any, Callable, Union
+
 from PIL import Image
 
 try:  # optional dependency
@@ -8,6 +11,59 @@ except Exception:  # pragma: no cover - numpy may be unavailable
     np = None
 
 
+ImageInput = Union[str, "os.PathLike[str]", Image.Image, Any]
+
+
+def load_image(image: ImageInput) -> Any:
+    """Return ``image`` as an RGB ``uint8`` NumPy array.
+
+    ``image`` may be a file path, a PIL image or an array.  Arrays that are
+    already RGB (or grayscale) are returned as-is without copying.
+    """
+    if np is None:  # pragma: no cover - numpy is required by EasyOCR anyway
+        raise RuntimeError("numpy is required for in-memory OCR input")
+    if isinstance(image, (str, os.PathLike)):
+        with Image.open(image) as img:
+            return np.asarray(img.convert("RGB"))
+    if isinstance(image, Image.Image):
+        return np.asarray(image if image.mode == "RGB" else image.convert("RGB"))
+    arr = np.asarray(image)
+    if arr.ndim == 3 and arr.shape[2] == 4:
+        arr = np.ascontiguousarray(arr[..., :3])
+    return arr
+
+
+class LazyDict(dict):
+    """Dict whose deferred values are computed on first access.
+
+    Deferred keys are registered with :meth:`defer` and materialized by
+    ``d[key]`` or ``d.get(key)``.  Until then they are absent from iteration
+    and ``json.dump`` output.  Deferred callables and their arguments must be
+    picklable so results can be cached or sent between processes.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._deferred: dict = {}
+
+    def defer(self, key: str, func: Callable[..., Any], *args: Any) -> None:
+        self._deferred[key] = (func, args)
+
+    def __missing__(self, key: str) -> Any:
+        func, args = self._deferred.pop(key)
+        value = self[key] = func(*args)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or key in self._deferred
+
+
 def pil_to_data_url(img: Image.Image) -> str:
     """Convert a PIL image to a data URL."""
     buf = io.BytesIO()
@@ -17,7 +73,9 @@ def pil_to_data_url(img: Image.Image) -> str:
 
 
 def np_convert(obj):
-    """Convert NumPy types for JSON serialization."""
+    """Convert NumPy types and block tables for JSON serialization."""
+    if hasattr(obj, "to_list"):
+        return obj.to_list()
     if np is not None:
         if isinstance(obj, np.integer):
             return int(obj)
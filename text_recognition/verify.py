@@ -0,0 +1,79 @@
+"""Concurrent LLM verification of low-confidence OCR blocks."""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+import tracing
+
+
+def verify_crops(
+    llm: Any,
+    items: Sequence[Tuple[str, str]],
+    max_workers: int = 4,
+    batch_size: int = 1,
+    timeout: float = 60.0,
+) -> List[Dict[str, Any]]:
+    """Verify ``(crop_data, candidate_text)`` pairs through ``llm`` concurrently.
+
+    Items are packed into batches of ``batch_size`` (sent as a single
+    ``verify_batch`` request when ``batch_size > 1``) and at most
+    ``max_workers`` requests are in flight at once; submission waits up to
+    ``timeout`` seconds for a slot to free up.  A batch that gets no slot in
+    time, or a request that does not finish within ``timeout`` seconds of
+    being sent, falls back to the candidate text.  Responses are returned in
+    the order of ``items``.
+    """
+    if not items:
+        return []
+    batch_size = max(1, batch_size)
+    max_workers = max(1, max_workers)
+    slots = threading.BoundedSemaphore(max_workers)
+    pending: List[Tuple[int, Optional[Future], float]] = []
+
+    @tracing.propagate
+    def call(batch: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        try:
+            if len(batch) == 1:
+                return [llm.verify_text(*batch[0])]
+            return llm.verify_batch(batch)
+        finally:
+            slots.release()
+
+    # Not used as a context manager: a timed-out request must not block return.
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    responses: List[Dict[str, Any]] = []
+    try:
+        for start in range(0, len(items), batch_size):
+            if not slots.acquire(timeout=timeout):  # every slot held by hung requests
+                pending.append((start, None, 0.0))
+                continue
+            batch = items[start:start + batch_size]
+            pending.append((start, pool.submit(call, batch), time.monotonic() + timeout))
+
+        for start, future, deadline in pending:
+            batch = items[start:start + batch_size]
+            if future is None:
+                responses.extend(_fallback(text, "timeout") for _, text in batch)
+                continue
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                result = [_fallback(text, "timeout") for _, text in batch]
+            except Exception as e:  # backend errors must not abort the page
+                result = [_fallback(text, str(e)) for _, text in batch]
+            if len(result) != len(batch):
+                result = [_fallback(text, "malformed batch response") for _, text in batch]
+            responses.extend(result)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return responses
+
+
+def _fallback(candidate: str, error: str) -> Dict[str, Any]:
+    return {"corrected": candidate, "confidence": 0.0, "error": error}
+
+
+__all__ = ["verify_crops"]
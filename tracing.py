@@ -0,0 +1,249 @@
+"""Lightweight span tracing for the OCR, parsing and LLM hot paths.
+
+Code under measurement wraps a stage in :func:`span`::
+
+    with tracing.span("pdf.rasterize", dpi=dpi) as s:
+        pix = page.get_pixmap(...)
+        s.set(bytes=len(pix.samples))
+
+When a span ends, a record is handed to every hook.  A hook is any callable
+taking the record dict (``name``, ``start``, ``seconds``, ``parent``,
+``attrs``, ``pid``, ``thread`` and ``error``).  Hooks are registered either
+globally with :func:`add_hook`, for example a :class:`JsonLinesExporter`, or
+for the current context only with :func:`collect`, which produces a
+per-stage :class:`Summary`.  Without any hook, :func:`span` returns a shared
+no-op span and costs one context variable lookup.
+
+Context variables do not flow into thread pools or child processes on their
+own.  Wrap pool callables with :func:`propagate`.  For process pools, run
+the work under :func:`capture` and :func:`replay` the returned records in the
+parent.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+Hook = Callable[[Dict[str, Any]], None]
+
+_hooks: Tuple[Hook, ...] = ()
+_hooks_lock = threading.Lock()
+_local_hooks: ContextVar[Tuple[Hook, ...]] = ContextVar("tracing_local_hooks", default=())
+_current: ContextVar[Optional["Span"]] = ContextVar("tracing_current_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    """An open span; :meth:`set` attaches attributes such as byte or token counts."""
+
+    __slots__ = ("id", "name", "parent", "attrs", "start")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]) -> None:
+        self.id = next(_ids)
+        self.name = name
+        self.parent = parent.id if parent is not None else None
+        self.attrs = attrs
+        self.start = time.time()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def enabled() -> bool:
+    """Whether any hook would receive spans started in the current context."""
+    return bool(_hooks or _local_hooks.get())
+
+
+@contextmanager
+def _noop() -> Iterator[_NoopSpan]:
+    yield _NOOP
+
+
+@contextmanager
+def _span(name: str, attrs: Dict[str, Any]) -> Iterator[Span]:
+    current = Span(name, _current.get(), attrs)
+    token = _current.set(current)
+    error = None
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _current.reset(token)
+        _emit(
+            {
+                "name": name,
+                "id": current.id,
+                "parent": current.parent,
+                "start": current.start,
+                "seconds": seconds,
+                "attrs": current.attrs,
+                "pid": os.getpid(),
+                "thread": threading.current_thread().name,
+                "error": error,
+            }
+        )
+
+
+def span(name: str, **attrs: Any):
+    """Context manager timing the enclosed block as ``name``."""
+    if not (_hooks or _local_hooks.get()):
+        return _noop()
+    return _span(name, attrs)
+
+
+def _emit(record: Dict[str, Any]) -> None:
+    for hook in _hooks + _local_hooks.get():
+        try:
+            hook(record)
+        except Exception:  # a broken exporter must never break the pipeline
+            pass
+
+
+def add_hook(hook: Hook) -> Hook:
+    """Register ``hook`` for spans from every thread and context."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+    return hook
+
+
+def remove_hook(hook: Hook) -> None:
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+@contextmanager
+def local_hook(hook: Hook) -> Iterator[Hook]:
+    """Register ``hook`` for spans started in the current context only."""
+    token = _local_hooks.set(_local_hooks.get() + (hook,))
+    try:
+        yield hook
+    finally:
+        _local_hooks.reset(token)
+
+
+def propagate(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Bind ``func`` to the caller's context so pool threads report spans."""
+    context = copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def capture() -> Iterator[List[Dict[str, Any]]]:
+    """Collect records of spans ended in this context into a list."""
+    records: List[Dict[str, Any]] = []
+    with local_hook(records.append):
+        yield records
+
+
+def replay(records: List[Dict[str, Any]]) -> None:
+    """Deliver records captured elsewhere (e.g. in a worker process) to hooks."""
+    for record in records:
+        _emit(record)
+
+
+class Summary:
+    """Thread-safe per-stage aggregate: count, total/max seconds and numeric attrs.
+
+    Numeric attributes (bytes, tokens, boxes, ...) are summed; the settings in
+    :attr:`LABELS` describe a span rather than measure it and are skipped.
+    """
+
+    LABELS = frozenset({"dpi"})
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        with self.lock:
+            stage = self.stages.setdefault(
+                record["name"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "errors": 0}
+            )
+            stage["count"] += 1
+            stage["seconds"] += record["seconds"]
+            stage["max_seconds"] = max(stage["max_seconds"], record["seconds"])
+            if record.get("error"):
+                stage["errors"] += 1
+            for key, value in record["attrs"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key not in self.LABELS:
+                    stage[key] = stage.get(key, 0) + value
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            return {
+                name: {k: round(v, 4) if isinstance(v, float) else v for k, v in stage.items()}
+                for name, stage in sorted(self.stages.items())
+            }
+
+
+@contextmanager
+def collect() -> Iterator[Summary]:
+    """Summarize spans started in the current context (and propagated work)."""
+    summary = Summary()
+    with local_hook(summary):
+        yield summary
+
+
+class JsonLinesExporter:
+    """Hook writing one JSON object per finished span to ``target``.
+
+    ``target`` is a path (opened for appending) or a text stream.
+    """
+
+    def __init__(self, target: Any) -> None:
+        self._owned = isinstance(target, (str, os.PathLike))
+        self.stream: TextIO = open(target, "a", encoding="utf-8") if self._owned else target
+        self.lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def close(self) -> None:
+        if self._owned:
+            self.stream.close()
+
+
+__all__ = [
+    "Span",
+    "Summary",
+    "JsonLinesExporter",
+    "span",
+    "enabled",
+    "add_hook",
+    "remove_hook",
+    "local_hook",
+    "propagate",
+    "capture",
+    "replay",
+    "collect",
+]